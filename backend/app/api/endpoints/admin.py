@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# File: admin.py
+"""Admin endpoint"""
+
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from dependency_injector.wiring import inject, Provide
+
+from app.core.container import Container
+from app.core.dependencies import get_current_admin, unit_of_work
+from app.schema.user_schema import FindUser, FindUserResult, UserExport, \
+    UserListItem, UserSearch
+from app.services.user_service import UserService
+from app.util.export import MEDIA_TYPES
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(unit_of_work), Depends(get_current_admin)]
+)
+
+
+@router.get("/users", summary="List users, newest first",
+            response_model=FindUserResult)
+@inject
+def list_users(
+    find_query: FindUser = Depends(),
+    service: UserService = Depends(Provide[Container.user_service])
+):
+    """Pass ``next_cursor`` back as ``cursor`` for the following page"""
+    return service.get_list(find_query)
+
+
+@router.get("/users/search", summary="Search users by email or phone",
+            response_model=List[UserListItem])
+@inject
+def search_users(
+    search: UserSearch = Depends(),
+    service: UserService = Depends(Provide[Container.user_service])
+):
+    """Prefix match by default; ``match=contains`` for substrings"""
+    return service.search_users(search)
+
+
+@router.get("/users/export", summary="Export users as NDJSON or CSV",
+            response_class=StreamingResponse)
+@inject
+def export_users(
+    export: UserExport = Depends(),
+    service: UserService = Depends(Provide[Container.user_service])
+):
+    """Streamed in ``(created_at, id)`` order; passwords and OTP secrets
+    are never exported"""
+    return StreamingResponse(
+        service.export_users(export),
+        media_type=MEDIA_TYPES[export.format],
+        headers={"Content-Disposition":
+                 f'attachment; filename="users.{export.format}"'},
+    )
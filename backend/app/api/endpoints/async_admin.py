@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# File: async_admin.py
+"""Async Admin endpoint"""
+
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from dependency_injector.wiring import inject, Provide
+
+from app.core.container import Container
+from app.core.dependencies import get_current_admin_async, \
+    unit_of_work_async
+from app.schema.user_schema import FindUser, FindUserResult, UserExport, \
+    UserListItem, UserSearch
+from app.services.async_user_service import AsyncUserService
+from app.util.export import MEDIA_TYPES
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(unit_of_work_async), Depends(get_current_admin_async)]
+)
+
+
+@router.get("/users", summary="List users, newest first",
+            response_model=FindUserResult)
+@inject
+async def list_users(
+    find_query: FindUser = Depends(),
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service])
+):
+    """Pass ``next_cursor`` back as ``cursor`` for the following page"""
+    return await service.get_list(find_query)
+
+
+@router.get("/users/search", summary="Search users by email or phone",
+            response_model=List[UserListItem])
+@inject
+async def search_users(
+    search: UserSearch = Depends(),
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service])
+):
+    """Prefix match by default; ``match=contains`` for substrings"""
+    return await service.search_users(search)
+
+
+@router.get("/users/export", summary="Export users as NDJSON or CSV",
+            response_class=StreamingResponse)
+@inject
+async def export_users(
+    export: UserExport = Depends(),
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service])
+):
+    """Streamed in ``(created_at, id)`` order; passwords and OTP secrets
+    are never exported"""
+    return StreamingResponse(
+        service.export_users(export),
+        media_type=MEDIA_TYPES[export.format],
+        headers={"Content-Disposition":
+                 f'attachment; filename="users.{export.format}"'},
+    )
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# File: async_auth.py
+"""Async Auth endpoint"""
+
+
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Form, Request, status
+from dependency_injector.wiring import inject, Provide
+from app.core.container import Container
+from app.schema.auth_schema import IntrospectionBatchPayload, IntrospectionBatchResponse, IntrospectionResponse, OTPBatchPayload, OTPBatchResponse, OTPPayload, Payload, SignIn, SignInResponse, SignInResponse2Fa, SignUp
+from app.model.user_records import AuthUser
+from app.schema.responses import introspection_batch_response, \
+    introspection_response, otp_batch_response, otp_verify_response, \
+    sign_in_response, user_response
+from app.schema.user_schema import User
+from app.services.async_auth_service import AsyncAuthService
+from app.util.responses import cache_headers
+from app.core.dependencies import get_current_user_async, \
+    get_introspection_client, get_optional_token_payload, get_otp_gateway, \
+    get_token_payload, unit_of_work_async
+
+
+router = APIRouter(
+    prefix="/auth",
+    tags=["Auth"],
+    dependencies=[Depends(unit_of_work_async)]
+)
+
+
+@router.post("/register",
+             summary="Sign Up",
+             response_model=User,
+             status_code=status.HTTP_201_CREATED)
+@inject
+async def sign_up(
+        user_info: SignUp,
+        service: AsyncAuthService = Depends(
+            Provide[Container.async_auth_service])):
+    """"""
+    user = await service.sign_up(user_info)
+
+    return user_response.response(user, status.HTTP_201_CREATED)
+
+
+@router.post("/login",
+             summary="Login",
+             response_model=Union[SignInResponse, SignInResponse2Fa])
+@inject
+async def login(
+    user_info: SignIn,
+    request: Request,
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service])
+):
+    """"""
+    user = await service.sign_in(
+        user_info, request.headers.get("user-agent"))
+
+    return sign_in_response.response(user)
+
+
+@router.post("/otp/verify",
+             summary="Verify OTP",
+             response_model=Union[User, None]
+             )
+@inject
+async def verify_otp(
+    payload: OTPPayload,
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service]),
+    token_data: Optional[Payload] = Depends(get_optional_token_payload)
+):
+    """Verifies the session of the bearer token, or the user's latest
+    session when none is sent"""
+    user = await service.otp_verification(
+        payload, token_data.sid if token_data else None)
+
+    return otp_verify_response.response(user)
+
+
+@router.post("/otp/verify/batch",
+             summary="Verify many OTPs",
+             response_model=OTPBatchResponse,
+             dependencies=[Depends(get_otp_gateway)])
+@inject
+async def verify_otp_batch(
+    payload: OTPBatchPayload,
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service])
+):
+    """For gateways forwarding many users' codes at once: each item verifies
+    the user's latest session and gets its own result, in request order"""
+    results = await service.otp_batch_verification(payload)
+
+    return otp_batch_response.response(results)
+
+
+@router.post("/introspect",
+             summary="Introspect a token",
+             response_model=IntrospectionResponse,
+             response_model_exclude_none=True,
+             dependencies=[Depends(get_introspection_client)])
+@inject
+async def introspect(
+    token: str = Form(),
+    token_type_hint: Optional[str] = Form(None),
+    check_user: bool = Form(False),
+    require_otp_verified: bool = Form(False),
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service])
+):
+    """RFC 7662 token introspection for other services. The answer may be
+    reused for as long as its Cache-Control allows"""
+    result = await service.introspect(
+        token, check_user, require_otp_verified)
+    max_age = service.introspection_max_age(
+        [result], check_user or require_otp_verified)
+
+    return introspection_response.response(
+        result, headers=cache_headers(max_age))
+
+
+@router.post("/introspect/batch",
+             summary="Introspect many tokens",
+             response_model=IntrospectionBatchResponse,
+             response_model_exclude_none=True,
+             dependencies=[Depends(get_introspection_client)])
+@inject
+async def introspect_batch(
+    payload: IntrospectionBatchPayload,
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service])
+):
+    """``/introspect`` for several tokens, answered in request order"""
+    results = await service.introspect_batch(payload)
+    max_age = service.introspection_max_age(
+        results.results,
+        payload.check_user or payload.require_otp_verified)
+
+    return introspection_batch_response.response(
+        results, headers=cache_headers(max_age))
+
+
+@router.post("/logout",
+             summary="Log a user out")
+@inject
+async def logout(
+    service: AsyncAuthService = Depends(
+        Provide[Container.async_auth_service]),
+    current_user: AuthUser = Depends(get_current_user_async),
+    token_data: Payload = Depends(get_token_payload)
+):
+    """"""
+    return await service.logout(str(current_user.id), token_data.sid)
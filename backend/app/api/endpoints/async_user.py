@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# File: async_user.py
+"""Async User endpoint"""
+
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from dependency_injector.wiring import inject, Provide
+
+from app.core.container import Container
+from app.core.dependencies import get_current_user_async, \
+    get_token_payload, unit_of_work_async
+from app.model.user_records import AuthUser
+from app.services.async_user_service import AsyncUserService
+from app.schema.auth_schema import Payload
+from app.schema.responses import current_user_response
+from app.schema.user_schema import CurrentUser, User2FaUpdate, \
+    UserOTPPayload
+from app.util.qr import QRCodeRenderer
+from app.util.util import etag_matches
+
+
+router = APIRouter(
+    prefix="/user",
+    tags=["User"],
+    dependencies=[Depends(unit_of_work_async), Depends(get_current_user_async)]
+)
+
+
+@router.get("", summary="Get a user's info",
+            response_model=CurrentUser)
+async def get_user(
+    current_user: AuthUser = Depends(get_current_user_async)
+):
+    """"""
+    return current_user_response.response(current_user)
+
+
+@router.post("/otp/disable",
+             summary="Disable user 2fa",
+             response_model=CurrentUser
+             )
+@inject
+async def disable_2fa(
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service]),
+    current_user: AuthUser = Depends(get_current_user_async)
+):
+    """"""
+    user = await service.disable_user_2fa(current_user.id)
+
+    return current_user_response.response(user)
+
+
+@router.post("/otp/verify",
+             summary="Setup and verify user 2fa",
+             response_model=CurrentUser,
+             )
+@inject
+async def verify_2fa(
+    otp_info: UserOTPPayload,
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service]),
+    current_user: AuthUser = Depends(get_current_user_async),
+    token_data: Payload = Depends(get_token_payload)
+):
+    """"""
+    user = await service.verify_user_otp(
+        otp_info.otp, str(current_user.id), token_data.sid)
+
+    return current_user_response.response(user)
+
+
+@router.post("/2fa/update", summary="Updare 2fa type to sms or authenticator")
+@inject
+async def update_2fa(
+    user_2fa_info: User2FaUpdate,
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service]),
+    current_user: AuthUser = Depends(get_current_user_async)
+):
+    """"""
+    return await service.update_user_2fa(
+        user_2fa_info.authentication_type, str(current_user.id))
+
+
+@router.post("/otp/sms", summary="Send a 2fa code by SMS")
+@inject
+async def send_sms_otp(
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service]),
+    current_user: AuthUser = Depends(get_current_user_async)
+):
+    """"""
+    return await service.send_sms_otp(current_user)
+
+
+@router.get("/otp/qr", summary="Get the 2fa provisioning QR code",
+            response_class=Response,
+            responses={200: {"content": {"image/svg+xml": {},
+                                         "image/png": {}}},
+                       304: {"description": "Not modified"}})
+@inject
+async def get_otp_qr_code(
+    fmt: Literal["svg", "png"] = Query("svg", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncUserService = Depends(
+        Provide[Container.async_user_service]),
+    current_user: AuthUser = Depends(get_current_user_async)
+):
+    """"""
+    etag = service.otp_qr_etag(current_user, fmt)
+
+    if etag is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_qr_headers(etag))
+
+    # encoding on a cache miss is CPU bound, keep it off the event loop
+    image, etag = await run_in_threadpool(
+        service.otp_qr_code, current_user, fmt)
+
+    return Response(image, media_type=QRCodeRenderer.MEDIA_TYPES[fmt],
+                    headers=_qr_headers(etag))
+
+
+def _qr_headers(etag: str) -> dict:
+    # per-user content: only the browser may keep it, and must revalidate
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
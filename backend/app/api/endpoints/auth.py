@@ -3,19 +3,27 @@
 """Auth endpoint"""
 
 
-from typing import Union
-from fastapi import APIRouter, Depends, status
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Form, Request, status
 from dependency_injector.wiring import inject, Provide
 from app.core.container import Container
-from app.schema.auth_schema import OTPPayload, OTPResponse, SignIn, SignInResponse, SignInResponse2Fa, SignUp
+from app.schema.auth_schema import IntrospectionBatchPayload, IntrospectionBatchResponse, IntrospectionResponse, OTPBatchPayload, OTPBatchResponse, OTPPayload, OTPResponse, Payload, SignIn, SignInResponse, SignInResponse2Fa, SignUp
+from app.model.user_records import AuthUser
+from app.schema.responses import introspection_batch_response, \
+    introspection_response, otp_batch_response, otp_verify_response, \
+    sign_in_response, user_response
 from app.schema.user_schema import User
 from app.services.auth_service import AuthService
-from app.core.dependencies import get_current_user
+from app.util.responses import cache_headers
+from app.core.dependencies import get_current_user, \
+    get_introspection_client, get_optional_token_payload, get_otp_gateway, \
+    get_token_payload, unit_of_work
 
 
 router = APIRouter(
     prefix="/auth",
-    tags=["Auth"]
+    tags=["Auth"],
+    dependencies=[Depends(unit_of_work)]
 )
 
 
@@ -24,27 +32,29 @@ router = APIRouter(
              response_model=User,
              status_code=status.HTTP_201_CREATED)
 @inject
-def sign_up(
+async def sign_up(
         user_info: SignUp,
         service: AuthService = Depends(Provide[Container.auth_service])):
     """"""
-    user = service.sign_up(user_info)
+    user = await service.sign_up(user_info)
 
-    return user
+    return user_response.response(user, status.HTTP_201_CREATED)
 
 
 @router.post("/login",
              summary="Login",
              response_model=Union[SignInResponse, SignInResponse2Fa])
 @inject
-def login(
+async def login(
 	user_info: SignIn,
+	request: Request,
 	service: AuthService = Depends(Provide[Container.auth_service])
 ):
     """"""
-    user = service.sign_in(user_info)
+    user = await service.sign_in(user_info,
+                                 request.headers.get("user-agent"))
 
-    return user
+    return sign_in_response.response(user)
 
 
 @router.post("/otp/verify",
@@ -54,10 +64,74 @@ def login(
 @inject
 def verify_otp(
 	payload: OTPPayload,
+	service: AuthService = Depends(Provide[Container.auth_service]),
+	token_data: Optional[Payload] = Depends(get_optional_token_payload)
+):
+    """Verifies the session of the bearer token, or the user's latest
+    session when none is sent"""
+    user = service.otp_verification(
+        payload, token_data.sid if token_data else None)
+
+    return otp_verify_response.response(user)
+
+
+@router.post("/otp/verify/batch",
+             summary="Verify many OTPs",
+             response_model=OTPBatchResponse,
+             dependencies=[Depends(get_otp_gateway)])
+@inject
+def verify_otp_batch(
+	payload: OTPBatchPayload,
 	service: AuthService = Depends(Provide[Container.auth_service])
 ):
-    """"""
-    return service.otp_verification(payload)
+    """For gateways forwarding many users' codes at once: each item verifies
+    the user's latest session and gets its own result, in request order"""
+    results = service.otp_batch_verification(payload)
+
+    return otp_batch_response.response(results)
+
+
+@router.post("/introspect",
+             summary="Introspect a token",
+             response_model=IntrospectionResponse,
+             response_model_exclude_none=True,
+             dependencies=[Depends(get_introspection_client)])
+@inject
+def introspect(
+	token: str = Form(),
+	token_type_hint: Optional[str] = Form(None),
+	check_user: bool = Form(False),
+	require_otp_verified: bool = Form(False),
+	service: AuthService = Depends(Provide[Container.auth_service])
+):
+    """RFC 7662 token introspection for other services. The answer may be
+    reused for as long as its Cache-Control allows"""
+    result = service.introspect(token, check_user, require_otp_verified)
+    max_age = service.introspection_max_age(
+        [result], check_user or require_otp_verified)
+
+    return introspection_response.response(
+        result, headers=cache_headers(max_age))
+
+
+@router.post("/introspect/batch",
+             summary="Introspect many tokens",
+             response_model=IntrospectionBatchResponse,
+             response_model_exclude_none=True,
+             dependencies=[Depends(get_introspection_client)])
+@inject
+def introspect_batch(
+	payload: IntrospectionBatchPayload,
+	service: AuthService = Depends(Provide[Container.auth_service])
+):
+    """``/introspect`` for several tokens, answered in request order"""
+    results = service.introspect_batch(payload)
+    max_age = service.introspection_max_age(
+        results.results,
+        payload.check_user or payload.require_otp_verified)
+
+    return introspection_batch_response.response(
+        results, headers=cache_headers(max_age))
 
 
 @router.post("/logout",
@@ -65,7 +139,8 @@ def verify_otp(
 @inject
 def logout(
     service: AuthService = Depends(Provide[Container.auth_service]),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user),
+    token_data: Payload = Depends(get_token_payload)
 ):
     """"""
-    return service.logout(str(current_user.id))
\ No newline at end of file
+    return service.logout(str(current_user.id), token_data.sid)
\ No newline at end of file
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# File: metrics.py
+"""Metrics endpoint"""
+
+
+from fastapi import APIRouter, Depends
+
+from app.core.dependencies import get_metrics_client
+from app.core.metrics import metrics
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(get_metrics_client)]
+)
+
+
+@router.get("", summary="Process metrics snapshot")
+def get_metrics():
+    """"""
+    return metrics.snapshot()
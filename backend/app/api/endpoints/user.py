@@ -3,63 +3,73 @@
 """User endpoint"""
 
 
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Response
 from dependency_injector.wiring import inject, Provide
 
 from app.core.container import Container
-from app.core.dependencies import get_current_user
-from app.model.user import User
+from app.core.dependencies import get_current_user, get_token_payload, \
+    unit_of_work
+from app.model.user_records import AuthUser
 from app.services.user_service import UserService
-from app.schema.user_schema import User2FaUpdate, UserOTPPayload
+from app.schema.auth_schema import Payload
+from app.schema.responses import current_user_response
+from app.schema.user_schema import CurrentUser, User2FaUpdate, \
+    UserOTPPayload
+from app.util.qr import QRCodeRenderer
+from app.util.util import etag_matches
 
 
 router = APIRouter(
     prefix="/user",
     tags=["User"],
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(unit_of_work), Depends(get_current_user)]
 )
 
 
 @router.get("", summary="Get a user's info",
-            response_model=User)
+            response_model=CurrentUser)
 @inject
 def get_user(
     service: UserService = Depends(Provide[Container.user_service]),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """"""
-    return current_user
+    return current_user_response.response(current_user)
 
 
 @router.post("/otp/disable",
              summary="Disable user 2fa",
-             response_model=User
+             response_model=CurrentUser
              )
 @inject
 def disable_2fa(
     service: UserService = Depends(Provide[Container.user_service]),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """"""
     user = service.disable_user_2fa(current_user.id)
 
-    return user
+    return current_user_response.response(user)
 
 
 @router.post("/otp/verify",
              summary="Setup and verify user 2fa",
-             response_model=User,
+             response_model=CurrentUser,
              )
 @inject
 def verify_2fa(
     otp_info: UserOTPPayload,
     service: UserService = Depends(Provide[Container.user_service]),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user),
+    token_data: Payload = Depends(get_token_payload)
 ):
     """"""
-    user = service.verify_user_otp(otp_info.otp, str(current_user.id))
+    user = service.verify_user_otp(
+        otp_info.otp, str(current_user.id), token_data.sid)
 
-    return user
+    return current_user_response.response(user)
 
 
 @router.post("/2fa/update", summary="Updare 2fa type to sms or authenticator")
@@ -67,7 +77,7 @@ def verify_2fa(
 def update_2fa(
     user_2fa_info: User2FaUpdate,
     service: UserService = Depends(Provide[Container.user_service]),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """"""
 
@@ -75,3 +85,42 @@ def update_2fa(
         user_2fa_info.authentication_type, str(current_user.id))
 
     return user
+
+
+@router.post("/otp/sms", summary="Send a 2fa code by SMS")
+@inject
+def send_sms_otp(
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    """"""
+    return service.send_sms_otp(current_user)
+
+
+@router.get("/otp/qr", summary="Get the 2fa provisioning QR code",
+            response_class=Response,
+            responses={200: {"content": {"image/svg+xml": {},
+                                         "image/png": {}}},
+                       304: {"description": "Not modified"}})
+@inject
+def get_otp_qr_code(
+    fmt: Literal["svg", "png"] = Query("svg", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    """"""
+    etag = service.otp_qr_etag(current_user, fmt)
+
+    if etag is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_qr_headers(etag))
+
+    image, etag = service.otp_qr_code(current_user, fmt)
+
+    return Response(image, media_type=QRCodeRenderer.MEDIA_TYPES[fmt],
+                    headers=_qr_headers(etag))
+
+
+def _qr_headers(etag: str) -> dict:
+    # per-user content: only the browser may keep it, and must revalidate
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -4,11 +4,20 @@
 
 
 from fastapi import APIRouter
-from app.api.endpoints.auth import router as auth_router
-from app.api.endpoints.user import router as user_router
+from app.core.config import configs
+from app.api.endpoints.metrics import router as metrics_router
+
+if configs.DB_ASYNC:
+    from app.api.endpoints.async_admin import router as admin_router
+    from app.api.endpoints.async_auth import router as auth_router
+    from app.api.endpoints.async_user import router as user_router
+else:
+    from app.api.endpoints.admin import router as admin_router
+    from app.api.endpoints.auth import router as auth_router
+    from app.api.endpoints.user import router as user_router
 
 routers = APIRouter()
-router_list = [auth_router, user_router]
+router_list = [auth_router, user_router, admin_router, metrics_router]
 
 for router in router_list:
     routers.include_router(router)
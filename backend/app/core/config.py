@@ -27,6 +27,10 @@ class Configs(BaseSettings):
         "postgresql": "postgresql",
         "mysql": "mysql+mysqldb",
     }
+    ASYNC_DB_ENGINE_MAPPER: dict = {
+        "postgresql": "postgresql+asyncpg",
+        "mysql": "mysql+aiomysql",
+    }
 
     PROJECT_ROOT: str = os.path.dirname(os.path.dirname(
         os.path.dirname(os.path.abspath(__file__))))
@@ -39,6 +43,89 @@ class Configs(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     # 60 minutes * 24 hours * 30 days = 30 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # login sessions live as long as the token they were issued with
+    # "db" shares them across workers and restarts; "memory" keeps them in
+    # this process only, for single-worker dev runs
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "db")
+    SESSION_MEMORY_MAX_ENTRIES: int = int(
+        os.getenv("SESSION_MEMORY_MAX_ENTRIES", "100000"))
+    SESSION_TTL_SECONDS: int = int(os.getenv(
+        "SESSION_TTL_SECONDS", str(ACCESS_TOKEN_EXPIRE_MINUTES * 60)))
+    SESSION_TOUCH_SECONDS: int = int(
+        os.getenv("SESSION_TOUCH_SECONDS", "60"))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL_SECONDS: int = int(
+        os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    # comma-separated bearer secrets of the services allowed to call
+    # /auth/introspect; empty allows none
+    INTROSPECTION_CLIENT_SECRETS: str = os.getenv(
+        "INTROSPECTION_CLIENT_SECRETS", "")
+    INTROSPECTION_BATCH_MAX_TOKENS: int = int(
+        os.getenv("INTROSPECTION_BATCH_MAX_TOKENS", "100"))
+    # how long callers may reuse an answer that checked the user's state,
+    # which can change before the token expires
+    INTROSPECTION_USER_CHECK_MAX_AGE: int = int(
+        os.getenv("INTROSPECTION_USER_CHECK_MAX_AGE", "30"))
+
+    # one-time passwords
+    OTP_VALID_WINDOW: int = int(os.getenv("OTP_VALID_WINDOW", "1"))
+    OTP_KEY_CACHE_SIZE: int = int(os.getenv("OTP_KEY_CACHE_SIZE", "10000"))
+    # "memory" only stops a replay on the worker that accepted the code, so
+    # more than one worker (WEB_CONCURRENCY) with a REDIS_URL means "redis"
+    OTP_REPLAY_BACKEND: str = os.getenv(
+        "OTP_REPLAY_BACKEND",
+        "redis" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and
+        os.getenv("REDIS_URL") else "memory")
+    OTP_REPLAY_MAX_ENTRIES: int = int(
+        os.getenv("OTP_REPLAY_MAX_ENTRIES", "200000"))
+    # comma-separated bearer secrets of the gateways allowed to call
+    # /auth/otp/verify/batch; empty allows none
+    OTP_GATEWAY_SECRETS: str = os.getenv("OTP_GATEWAY_SECRETS", "")
+    # most {email, otp} items one POST /auth/otp/verify/batch may carry
+    OTP_BATCH_MAX_ITEMS: int = int(os.getenv("OTP_BATCH_MAX_ITEMS", "100"))
+    QR_CACHE_SIZE: int = int(os.getenv("QR_CACHE_SIZE", "1024"))
+
+    # sms
+    # "vonage", or "fake" to keep messages in memory instead of sending
+    # them; unset means fake in dev and test, and is an error elsewhere
+    SMS_PROVIDER: str = os.getenv("SMS_PROVIDER", "")
+    SMS_FAKE_MAX_SENT: int = int(os.getenv("SMS_FAKE_MAX_SENT", "1000"))
+    SMS_SENDER: str = os.getenv("SMS_SENDER", "2fa")
+    SMS_WORKERS: int = int(os.getenv("SMS_WORKERS", "4"))
+    SMS_QUEUE_SIZE: int = int(os.getenv("SMS_QUEUE_SIZE", "10000"))
+    SMS_RATE_PER_SECOND: float = float(os.getenv("SMS_RATE_PER_SECOND", "10"))
+    SMS_MAX_RETRIES: int = int(os.getenv("SMS_MAX_RETRIES", "3"))
+    # "db" lets any worker check a code, across restarts; "memory" is for
+    # single-process runs only
+    SMS_CODE_STORE: str = os.getenv("SMS_CODE_STORE", "db")
+    SMS_CODE_LENGTH: int = int(os.getenv("SMS_CODE_LENGTH", "6"))
+    SMS_CODE_TTL_SECONDS: int = int(os.getenv("SMS_CODE_TTL_SECONDS", "300"))
+    SMS_CODE_MAX_ATTEMPTS: int = int(os.getenv("SMS_CODE_MAX_ATTEMPTS", "5"))
+    VONAGE_API_KEY: Optional[str] = os.getenv("VONAGE_API_KEY")
+    VONAGE_API_SECRET: Optional[str] = os.getenv("VONAGE_API_SECRET")
+
+    # password hashing
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+    HASH_QUEUE_SIZE: int = int(os.getenv("HASH_QUEUE_SIZE", "32"))
+    HASH_USE_PROCESSES: bool = os.getenv(
+        "HASH_USE_PROCESSES", "false").lower() == "true"
+    HASH_RETRY_AFTER_SECONDS: int = int(
+        os.getenv("HASH_RETRY_AFTER_SECONDS", "1"))
+
+    # user cache
+    USER_CACHE_BACKEND: str = os.getenv("USER_CACHE_BACKEND", "memory")
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(
+        os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+
+    # comma-separated emails allowed on /admin endpoints
+    ADMIN_EMAILS: str = os.getenv("ADMIN_EMAILS", "")
+    # comma-separated bearer secrets of the scrapers allowed to read
+    # /metrics; empty allows none
+    METRICS_SECRETS: str = os.getenv("METRICS_SECRETS", "")
+    # rows fetched per server-side cursor round trip by user exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
 
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
@@ -50,6 +137,32 @@ class Configs(BaseSettings):
     DB_HOST: Optional[str] = os.getenv("DB_HOST")
     DB_PORT: str = os.getenv("DB_PORT", "3306")
     DB_ENGINE: str = DB_ENGINE_MAPPER.get(DB, "postgresql")
+    ASYNC_DB_ENGINE: str = ASYNC_DB_ENGINE_MAPPER.get(
+        DB, "postgresql+asyncpg")
+    # serve the API with async endpoints on an AsyncEngine
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+    # connection pool, sized per worker: N workers * (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW) must stay below the server's max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv(
+        "DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_DISPOSE_ON_FORK: bool = os.getenv(
+        "DB_POOL_DISPOSE_ON_FORK", "true").lower() == "true"
+    # compiled SQL kept per engine; see the db.*.query_cache metrics
+    DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+
+    # read replicas: comma-separated URLs in the DATABASE_URI format; each
+    # gets its own pool of the size above
+    DB_REPLICA_URIS: str = os.getenv("DB_REPLICA_URIS", "")
+    # reads for a user stay on the primary this long after their writes
+    DB_READ_YOUR_WRITES_MS: int = int(
+        os.getenv("DB_READ_YOUR_WRITES_MS", "1000"))
+    DB_REPLICA_RETRY_SECONDS: float = float(
+        os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
 
     DATABASE_URI_FORMAT: str = "{db_engine}://{user}:{password}@{host}:{port}/{database}"
 
@@ -62,6 +175,15 @@ class Configs(BaseSettings):
         database=ENV_DATABASE_MAPPER[ENV],
     )
 
+    ASYNC_DATABASE_URI: str = DATABASE_URI_FORMAT.format(
+        db_engine=ASYNC_DB_ENGINE,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+        database=ENV_DATABASE_MAPPER[ENV],
+    )
+
     class Config:
         case_sensitive = True
         # env_file = 'app/.env'
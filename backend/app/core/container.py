@@ -5,7 +5,15 @@
 from dependency_injector import containers, providers
 
 from app.core.config import configs
-from app.core.database import Database
+from app.core.database import AsyncDatabase, Database, replica_urls
+from app.core.hashing import PasswordHasher
+from app.core.otp_replay import build_replay_store
+from app.core.sessions import build_session_store
+from app.core.sms_codes import build_sms_code_store
+from app.core.totp import TOTPVerifier
+from app.core.user_cache import UserCache, build_user_cache_backend
+from app.util.qr import QRCodeRenderer
+from app.util.sms import SMSDispatcher, build_sms_provider
 from app.repository import *
 from app.services import *
 from app.services.auth_service import AuthService
@@ -16,18 +24,122 @@ class Container(containers.DeclarativeContainer):
         modules=[
             "app.api.endpoints.auth",
             "app.api.endpoints.user",
+            "app.api.endpoints.async_auth",
+            "app.api.endpoints.async_user",
+            "app.api.endpoints.admin",
+            "app.api.endpoints.async_admin",
             "app.core.dependencies",
         ]
     )
 
     db = providers.Singleton(
-        Database, db_url=configs.DATABASE_URI)
+        Database, db_url=configs.DATABASE_URI, configs=configs,
+        replica_urls=replica_urls(configs))
+
+    password_hasher = providers.Singleton(
+        PasswordHasher,
+        max_workers=configs.HASH_WORKERS,
+        max_queue=configs.HASH_QUEUE_SIZE,
+        use_processes=configs.HASH_USE_PROCESSES,
+        retry_after=configs.HASH_RETRY_AFTER_SECONDS,
+    )
+
+    user_cache = providers.Singleton(
+        UserCache,
+        backend=providers.Singleton(
+            build_user_cache_backend,
+            name=configs.USER_CACHE_BACKEND,
+            maxsize=configs.USER_CACHE_SIZE,
+            redis_url=configs.REDIS_URL,
+        ),
+        ttl=configs.USER_CACHE_TTL_SECONDS,
+    )
+
+    totp_verifier = providers.Singleton(
+        TOTPVerifier,
+        valid_window=configs.OTP_VALID_WINDOW,
+        cache_size=configs.OTP_KEY_CACHE_SIZE,
+    )
+
+    # a used step must be remembered for as long as it could still verify
+    otp_replay_store = providers.Singleton(
+        build_replay_store,
+        name=configs.OTP_REPLAY_BACKEND,
+        ttl=(2 * configs.OTP_VALID_WINDOW + 1) * 30,
+        max_entries=configs.OTP_REPLAY_MAX_ENTRIES,
+        redis_url=configs.REDIS_URL,
+        env=configs.ENV,
+    )
+
+    sms_dispatcher = providers.Singleton(
+        SMSDispatcher,
+        provider=providers.Singleton(
+            build_sms_provider,
+            name=configs.SMS_PROVIDER,
+            key=configs.VONAGE_API_KEY,
+            secret=configs.VONAGE_API_SECRET,
+            sender=configs.SMS_SENDER,
+            env=configs.ENV,
+            max_fake_sent=configs.SMS_FAKE_MAX_SENT,
+        ),
+        workers=configs.SMS_WORKERS,
+        queue_size=configs.SMS_QUEUE_SIZE,
+        rate_per_second=configs.SMS_RATE_PER_SECOND,
+        max_retries=configs.SMS_MAX_RETRIES,
+    )
+
+    sms_code_store = providers.Singleton(
+        build_sms_code_store,
+        name=configs.SMS_CODE_STORE,
+        secret_key=configs.SECRET_KEY,
+        length=configs.SMS_CODE_LENGTH,
+        ttl=configs.SMS_CODE_TTL_SECONDS,
+        max_attempts=configs.SMS_CODE_MAX_ATTEMPTS,
+    )
+
+    session_store = providers.Singleton(
+        build_session_store,
+        name=configs.SESSION_STORE,
+        ttl=configs.SESSION_TTL_SECONDS,
+        touch_interval=configs.SESSION_TOUCH_SECONDS,
+        max_memory_sessions=configs.SESSION_MEMORY_MAX_ENTRIES,
+    )
+
+    qr_renderer = providers.Singleton(
+        QRCodeRenderer, cache_size=configs.QR_CACHE_SIZE)
 
     user_repository = providers.Factory(
-        UserRepository, session_factory=db.provided.session)
+        UserRepository, session_factory=db.provided.session,
+        user_cache=user_cache, totp_verifier=totp_verifier,
+        replay_store=otp_replay_store, sms_code_store=sms_code_store,
+        session_store=session_store,
+        read_session_factory=db.provided.read_session,
+        record_write=db.provided.record_write)
 
     auth_service = providers.Factory(
-        AuthService, user_repository=user_repository)
+        AuthService, user_repository=user_repository,
+        password_hasher=password_hasher)
 
     user_service = providers.Factory(
-        UserService, user_repository=user_repository)
+        UserService, user_repository=user_repository,
+        sms_dispatcher=sms_dispatcher, qr_renderer=qr_renderer)
+
+    async_db = providers.Singleton(
+        AsyncDatabase, db_url=configs.ASYNC_DATABASE_URI, configs=configs,
+        replica_urls=replica_urls(configs, is_async=True))
+
+    async_user_repository = providers.Factory(
+        AsyncUserRepository, session_factory=async_db.provided.session,
+        user_cache=user_cache, totp_verifier=totp_verifier,
+        replay_store=otp_replay_store, sms_code_store=sms_code_store,
+        session_store=session_store,
+        read_session_factory=async_db.provided.read_session,
+        record_write=async_db.provided.record_write)
+
+    async_auth_service = providers.Factory(
+        AsyncAuthService, user_repository=async_user_repository,
+        password_hasher=password_hasher)
+
+    async_user_service = providers.Factory(
+        AsyncUserService, user_repository=async_user_repository,
+        sms_dispatcher=sms_dispatcher, qr_renderer=qr_renderer)
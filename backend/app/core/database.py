@@ -2,33 +2,155 @@
 # File: database.py
 """Database"""
 
-from contextlib import contextmanager
-from typing import Generator
-from sqlalchemy import create_engine, orm
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Generator, Hashable, List, Optional, \
+    Sequence
+from sqlalchemy import create_engine, make_url, orm
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, \
+    create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session
 
+from app.core.pool import instrument_pool, pool_options
+from app.core.query_cache import instrument_query_cache
+from app.core.replicas import ReplicaRouter, ReplicaUnavailableError
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork, \
+    enable_savepoints
+
 
 Base = declarative_base()
 
 
+def engine_options(db_url: str, configs=None, is_async: bool = False) -> dict:
+    """Pool and statement cache settings for ``db_url``; SQLite keeps
+    SQLAlchemy's default pool"""
+    if configs is None:
+        return {}
+
+    options = {"query_cache_size": configs.DB_QUERY_CACHE_SIZE}
+
+    if make_url(db_url).get_backend_name() != "sqlite":
+        options.update(pool_options(configs, is_async))
+
+    return options
+
+
+def replica_urls(configs, is_async: bool = False) -> List[str]:
+    """``DB_REPLICA_URIS`` as a list, with the async driver if asked"""
+    urls = [url.strip() for url in configs.DB_REPLICA_URIS.split(",")
+            if url.strip()]
+
+    if is_async:
+        urls = [make_url(url).set(drivername=configs.ASYNC_DB_ENGINE)
+                .render_as_string(hide_password=False) for url in urls]
+
+    return urls
+
+
+def replica_router(names: Sequence[str], configs=None) -> ReplicaRouter:
+    if configs is None:
+        return ReplicaRouter(names)
+
+    return ReplicaRouter(
+        names,
+        read_your_writes=configs.DB_READ_YOUR_WRITES_MS / 1000,
+        retry_after=configs.DB_REPLICA_RETRY_SECONDS,
+    )
+
+
 class Database:
-    def __init__(self, db_url: str) -> None:
-        self._engine = create_engine(db_url, echo=False)
+    def __init__(self, db_url: str, configs=None,
+                 replica_urls: Sequence[str] = ()) -> None:
+        self._engine = create_engine(
+            db_url, echo=False, **engine_options(db_url, configs))
 
-        self._session_factory = orm.scoped_session(
-            orm.sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self._engine,
-            ),
+        instrument_pool(self._engine, "primary")
+        instrument_query_cache(self._engine, "primary")
+
+        if self._engine.dialect.name == "sqlite":
+            enable_savepoints(self._engine)
+
+        self._replicas = []
+
+        for index, url in enumerate(replica_urls):
+            engine = create_engine(
+                url, echo=False, **engine_options(url, configs))
+
+            instrument_pool(engine, f"replica{index}")
+            instrument_query_cache(engine, f"replica{index}")
+            self._replicas.append(engine)
+
+        self._router = replica_router(
+            [f"replica{index}" for index in range(len(self._replicas))],
+            configs)
+
+        if configs is not None and configs.DB_POOL_DISPOSE_ON_FORK and \
+                hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.dispose_pool)
+
+        self._primary_session_factory = orm.sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self._engine,
         )
 
+        self._session_factory = orm.scoped_session(
+            self._primary_session_factory)
+
+        self._replica_session_factories = [
+            orm.sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            for engine in self._replicas
+        ]
+
+        self._current_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+            f"unit_of_work_{id(self)}", default=None)
+
     def create_database(self) -> None:
         Base.metadata.create_all(self._engine)
 
+    def dispose_pool(self) -> None:
+        """Drop connections inherited from a parent process without closing
+        them, so the child builds a fresh pool on first use"""
+        for engine in [self._engine, *self._replicas]:
+            engine.dispose(close=False)
+
+    def record_write(self, key: Hashable) -> None:
+        """Keep reads for ``key`` on the primary for the read-your-writes
+        window"""
+        self._router.record_write(key)
+
+    @contextmanager
+    def unit_of_work(self) -> Generator[UnitOfWork, None, None]:
+        """Make ``session()`` and ``read_session()`` share one transaction
+        in this context (see ``UnitOfWork``). Entering and leaving do no
+        I/O; the caller ends the work with ``UnitOfWork.finish``."""
+        work = UnitOfWork(self._engine)
+        previous = self._current_work.get()
+        self._current_work.set(work)
+
+        try:
+            yield work
+        finally:
+            # not ``reset``: the exit may run in a copy of the context
+            self._current_work.set(previous)
+
+    def _work(self) -> Optional[UnitOfWork]:
+        work = self._current_work.get()
+
+        return None if work is None or work.is_finished else work
+
     @contextmanager
     def session(self) -> Generator[Session, None, None]:
+        work = self._work()
+
+        if work is not None:
+            with self._shared(work.session()) as session:
+                yield session
+            return
+
         session: Session = self._session_factory()
 
         try:
@@ -38,3 +160,196 @@ class Database:
             raise
         finally:
             session.close()
+
+    @contextmanager
+    def read_session(self, key: Optional[Hashable] = None
+                     ) -> Generator[Session, None, None]:
+        """Session for read-only work, on a replica when one is healthy and
+        ``key`` has not been written to recently.
+
+        A connection failure on a replica takes it out of rotation and
+        surfaces as ``ReplicaUnavailableError`` so the read can be retried.
+        The session is never the thread's scoped one, so it can be held
+        across threads, e.g. by a response that streams from it.
+
+        Reads keep their replica routing in a unit of work: only those
+        that go to the primary join its session, and only once it is open,
+        so a read never starts the request's transaction.
+        """
+        work = self._work()
+        index = self._router.pick(key)
+
+        if index is None and work is not None and work.is_open:
+            with self._shared(work.session()) as session:
+                yield session
+            return
+
+        if index is None:
+            session: Session = self._primary_session_factory()
+
+            try:
+                yield session
+            finally:
+                session.close()
+            return
+
+        session = self._replica_session_factories[index]()
+
+        try:
+            yield session
+        except OperationalError as e:
+            session.rollback()
+            self._router.mark_unhealthy(index)
+            raise ReplicaUnavailableError(self._router.names[index]) from e
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    @contextmanager
+    def _shared(session: Session) -> Generator[Session, None, None]:
+        """A unit of work's session: a failed call rolls back to its last
+        savepoint, and only the unit of work closes it"""
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+
+
+class AsyncDatabase:
+    def __init__(self, db_url: str, configs=None,
+                 replica_urls: Sequence[str] = ()) -> None:
+        self._engine = create_async_engine(
+            db_url, echo=False,
+            **engine_options(db_url, configs, is_async=True))
+
+        instrument_pool(self._engine.sync_engine, "primary_async")
+        instrument_query_cache(self._engine.sync_engine, "primary_async")
+
+        if self._engine.dialect.name == "sqlite":
+            enable_savepoints(self._engine.sync_engine)
+
+        self._replicas = []
+
+        for index, url in enumerate(replica_urls):
+            engine = create_async_engine(
+                url, echo=False,
+                **engine_options(url, configs, is_async=True))
+
+            instrument_pool(engine.sync_engine, f"replica{index}_async")
+            instrument_query_cache(engine.sync_engine,
+                                   f"replica{index}_async")
+            self._replicas.append(engine)
+
+        self._router = replica_router(
+            [f"replica{index}_async" for index in range(len(self._replicas))],
+            configs)
+
+        self._session_factory = async_sessionmaker(
+            bind=self._engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+        self._replica_session_factories = [
+            async_sessionmaker(bind=engine, autoflush=False,
+                               expire_on_commit=False)
+            for engine in self._replicas
+        ]
+
+        self._current_work: ContextVar[Optional[AsyncUnitOfWork]] = \
+            ContextVar(f"async_unit_of_work_{id(self)}", default=None)
+
+    async def create_database(self) -> None:
+        async with self._engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    async def dispose(self) -> None:
+        for engine in [self._engine, *self._replicas]:
+            await engine.dispose()
+
+    def record_write(self, key: Hashable) -> None:
+        self._router.record_write(key)
+
+    @contextmanager
+    def unit_of_work(self) -> Generator[AsyncUnitOfWork, None, None]:
+        work = AsyncUnitOfWork(self._engine)
+        previous = self._current_work.get()
+        self._current_work.set(work)
+
+        try:
+            yield work
+        finally:
+            # not ``reset``: the exit may run in a copy of the context
+            self._current_work.set(previous)
+
+    def _work(self) -> Optional[AsyncUnitOfWork]:
+        work = self._current_work.get()
+
+        return None if work is None or work.is_finished else work
+
+    @asynccontextmanager
+    async def session(self) -> AsyncGenerator[AsyncSession, None]:
+        work = self._work()
+
+        if work is not None:
+            async with self._shared(await work.session()) as session:
+                yield session
+            return
+
+        session: AsyncSession = self._session_factory()
+
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    @asynccontextmanager
+    async def read_session(self, key: Optional[Hashable] = None
+                           ) -> AsyncGenerator[AsyncSession, None]:
+        work = self._work()
+        index = self._router.pick(key)
+
+        if index is None and work is not None and work.is_open:
+            async with self._shared(await work.session()) as session:
+                yield session
+            return
+
+        if index is None:
+            session: AsyncSession = self._session_factory()
+
+            try:
+                yield session
+            finally:
+                await session.close()
+            return
+
+        session = self._replica_session_factories[index]()
+
+        try:
+            yield session
+        except OperationalError as e:
+            await session.rollback()
+            self._router.mark_unhealthy(index)
+            raise ReplicaUnavailableError(self._router.names[index]) from e
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    @staticmethod
+    @asynccontextmanager
+    async def _shared(session: AsyncSession
+                      ) -> AsyncGenerator[AsyncSession, None]:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
@@ -3,37 +3,188 @@
 """Dependencies"""
 
 
-from typing import Optional
+import hmac
+from typing import AsyncGenerator, Optional
 from dependency_injector.wiring import Provide, inject
-from fastapi import Depends
-from jose import jwt, JWTError
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.concurrency import run_in_threadpool
 from pydantic import ValidationError
 
 from app.core.config import configs
 from app.core.container import Container
-from app.core.exceptions import AuthError
-from app.core.security import ALGORITHM, JWTBearer
-from app.model.user import User
+from app.core.database import AsyncDatabase, Database
+from app.core.exceptions import AuthError, RestrictedError
+from app.core.security import JWTBearer
+from app.model.user_records import AuthUser
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork
 from app.schema.auth_schema import Payload
+from app.services.async_user_service import AsyncUserService
 from app.services.user_service import UserService
+from app.util.util import normalize_email
+
+
+ADMIN_EMAILS = frozenset(normalize_email(email)
+                         for email in configs.ADMIN_EMAILS.split(",")
+                         if email.strip())
 
 
 @inject
-def get_current_user(
-    token: str = Depends(JWTBearer()),
-    service: UserService = Depends(Provide[Container.user_service]),
-) -> User:
+def get_database(db: Database = Depends(Provide[Container.db])) -> Database:
+    return db
+
+
+@inject
+def get_async_database(
+    db: AsyncDatabase = Depends(Provide[Container.async_db]),
+) -> AsyncDatabase:
+    return db
+
+
+# The unit of work dependencies resolve the database through the plain
+# functions above instead of ``@inject``: the wiring wraps an async
+# generator in ``async for ... yield``, so the exception FastAPI throws
+# back into the dependency would never reach the handlers below.
+async def unit_of_work(
+    db: Database = Depends(get_database),
+) -> AsyncGenerator[UnitOfWork, None]:
+    """One connection and transaction for the whole request, shared by
+    every repository call made while handling it.
+
+    The work is committed when the request succeeds or fails with an HTTP
+    error, which keeps what was done before the error (a counted OTP
+    attempt, a revoked session); anything else rolls it all back.
+    """
+    with db.unit_of_work() as work:
+        try:
+            yield work
+        except HTTPException:
+            await _finish(work, True)
+            raise
+        except Exception:
+            await _finish(work, False)
+            raise
+
+        await _finish(work, True)
+
+
+async def _finish(work: UnitOfWork, commit: bool) -> None:
+    if work.is_open:
+        await run_in_threadpool(work.finish, commit)
+
+
+async def unit_of_work_async(
+    db: AsyncDatabase = Depends(get_async_database),
+) -> AsyncGenerator[AsyncUnitOfWork, None]:
+    with db.unit_of_work() as work:
+        try:
+            yield work
+        except HTTPException:
+            await work.finish(True)
+            raise
+        except Exception:
+            await work.finish(False)
+            raise
+
+        await work.finish(True)
+
+
+async def get_token_payload(
+        claims: dict = Depends(JWTBearer())) -> Payload:
+    """Claims of the bearer token, decoded and verified exactly once"""
     try:
-        payload = jwt.decode(token, configs.SECRET_KEY, algorithms=ALGORITHM)
-    
-        token_data = Payload(**payload)
-    except (JWTError, ValidationError):
+        return Payload(**claims)
+    except ValidationError:
         raise AuthError(detail="Could not validate credentials")
-    
-    current_user: User = service.get_by_id(token_data.id)
+
+
+async def get_optional_token_payload(
+        claims: dict = Depends(JWTBearer(auto_error=False))
+) -> Optional[Payload]:
+    """Claims of the bearer token when one is sent"""
+    if not claims:
+        return None
+
+    return await get_token_payload(claims)
+
+
+@inject
+def get_current_user(
+    token_data: Payload = Depends(get_token_payload),
+    service: UserService = Depends(Provide[Container.user_service]),
+) -> AuthUser:
+    current_user: AuthUser = service.get_session_user(
+        token_data.id, token_data.sid)
     
     if not current_user:
         raise AuthError(detail="User not found")
     
     return current_user
 
+
+@inject
+async def get_current_user_async(
+    token_data: Payload = Depends(get_token_payload),
+    service: AsyncUserService = Depends(Provide[Container.async_user_service]),
+) -> AuthUser:
+    current_user: AuthUser = await service.get_session_user(
+        token_data.id, token_data.sid)
+
+    if not current_user:
+        raise AuthError(detail="User not found")
+
+    return current_user
+
+
+def _check_admin(user: AuthUser) -> AuthUser:
+    if normalize_email(user.email) not in ADMIN_EMAILS:
+        raise AuthError(detail="Admin access required")
+
+    if user.is_2fa_enabled and not user.is_otp_verified:
+        raise AuthError(detail="Verify your OTP first")
+
+    return user
+
+
+def get_current_admin(
+    current_user: AuthUser = Depends(get_current_user),
+) -> AuthUser:
+    return _check_admin(current_user)
+
+
+async def get_current_admin_async(
+    current_user: AuthUser = Depends(get_current_user_async),
+) -> AuthUser:
+    return _check_admin(current_user)
+
+
+class ServiceClient:
+    """Admits the services that send one of ``secrets``, a comma-separated
+    list, as their bearer token; an empty list admits none"""
+
+    def __init__(self, secrets: str, detail: str) -> None:
+        self._secrets = tuple(secret.strip().encode()
+                              for secret in secrets.split(",")
+                              if secret.strip())
+        self._detail = detail
+
+    async def __call__(
+        self,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(
+            HTTPBearer(auto_error=False)),
+    ) -> None:
+        presented = credentials.credentials.encode() if credentials else b""
+
+        if not any(hmac.compare_digest(presented, secret)
+                   for secret in self._secrets):
+            raise RestrictedError(detail=self._detail)
+
+
+get_introspection_client = ServiceClient(
+    configs.INTROSPECTION_CLIENT_SECRETS, "Invalid introspection client")
+
+get_otp_gateway = ServiceClient(
+    configs.OTP_GATEWAY_SECRETS, "Invalid OTP gateway")
+
+get_metrics_client = ServiceClient(
+    configs.METRICS_SECRETS, "Invalid metrics client")
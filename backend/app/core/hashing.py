@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# File: hashing.py
+"""Password Hashing Executor"""
+
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.core.security import get_password_hash, verify_password
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded pool so that hashing bursts
+    cannot starve the threadpool serving the cheap routes.
+
+    At most ``max_workers + max_queue`` calls are admitted at once, the rest
+    are rejected straight away with a 503 and a ``Retry-After`` header.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16,
+                 use_processes: bool = False, retry_after: int = 1) -> None:
+        self._max_workers = max_workers
+        self._retry_after = retry_after
+
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if use_processes
+            else ThreadPoolExecutor(max_workers=max_workers,
+                                    thread_name_prefix="hasher"))
+
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        metrics.gauge("hasher.in_flight", lambda: self._in_flight)
+        metrics.gauge("hasher.queue_depth", self.queue_depth)
+        self._rejected = metrics.counter("hasher.rejected")
+        self._latency = metrics.histogram("hasher.latency_seconds")
+        self._wait = metrics.histogram("hasher.queue_wait_seconds")
+
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self._max_workers)
+
+    def hash(self, password: str) -> str:
+        return self._submit(get_password_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(
+            verify_password, plain_password, hashed_password).result()
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(
+            self._submit(get_password_hash, password))
+
+    async def averify(self, plain_password: str,
+                      hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(verify_password, plain_password, hashed_password))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self._rejected.inc()
+            raise ServiceUnavailableError(
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": str(self._retry_after)})
+
+        with self._lock:
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+
+        try:
+            inner = self._executor.submit(_timed, func, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        outer: Future = Future()
+
+        def done(future: Future) -> None:
+            self._release()
+
+            try:
+                result, started, finished = future.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+
+            self._wait.observe(max(0.0, started - submitted))
+            self._latency.observe(finished - started)
+
+            outer.set_result(result)
+
+        inner.add_done_callback(done)
+
+        return outer
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+def _timed(func: Callable[..., Any], *args: Any):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started, time.perf_counter()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# File: metrics.py
+"""Metrics"""
+
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class Gauge:
+    def __init__(self, func: Optional[Callable[[], float]] = None) -> None:
+        self._value: float = 0
+        self._func = func
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self._func is not None:
+            return self._func()
+        return self._value
+
+
+class Histogram:
+    """Keeps count, sum, max and a bounded window of recent samples"""
+
+    def __init__(self, window: int = 1024) -> None:
+        self._window = window
+        self._samples: List[float] = []
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+            if len(self._samples) < self._window:
+                self._samples.append(value)
+            else:
+                self._samples[self._index] = value
+                self._index = (self._index + 1) % self._window
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self._count, self._sum, self._max
+
+        def quantile(q: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+        return {
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0,
+            "max": maximum,
+            "p50": quantile(0.50),
+            "p95": quantile(0.95),
+            "p99": quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        with self._lock:
+            return self._counters.setdefault(name, Counter())
+
+    def gauge(self, name: str,
+              func: Optional[Callable[[], float]] = None) -> Gauge:
+        with self._lock:
+            if func is not None or name not in self._gauges:
+                self._gauges[name] = Gauge(func)
+            return self._gauges[name]
+
+    def histogram(self, name: str) -> Histogram:
+        with self._lock:
+            return self._histograms.setdefault(name, Histogram())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+
+        return {
+            "counters": {k: v.value for k, v in counters.items()},
+            "gauges": {k: v.value for k, v in gauges.items()},
+            "histograms": {k: v.snapshot() for k, v in histograms.items()},
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# File: otp_replay.py
+"""OTP Replay Protection"""
+
+
+import threading
+import time
+import warnings
+from typing import Dict, Hashable, Optional, Protocol, Tuple
+
+from app.core.metrics import metrics
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class ReplayStore(Protocol):
+    def check_and_record(self, user_id: Hashable, step: int) -> bool:
+        """Record ``step`` as the user's last accepted time step; ``False``
+        when it is not newer than the one already recorded"""
+        ...
+
+
+class MemoryReplayStore:
+    """Last accepted step per user in one dict.
+
+    Entries are re-inserted on every update, so the dict stays ordered by
+    write time and expired entries are swept from the front without a
+    full scan. Once ``max_entries`` is reached the oldest entries go first;
+    an entry only needs to outlive the verification window, so ``ttl``
+    should cover it.
+    """
+
+    def __init__(self, ttl: float = 90, max_entries: int = 200000) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._steps: Dict[Hashable, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+        metrics.gauge("otp_replay.entries", lambda: len(self._steps))
+        self._replays = metrics.counter("otp_replay.rejected")
+
+    def check_and_record(self, user_id: Hashable, step: int) -> bool:
+        now = time.monotonic()
+
+        with self._lock:
+            last = self._steps.pop(user_id, None)
+
+            if last is not None and last[1] > now and last[0] >= step:
+                self._steps[user_id] = last
+                self._replays.inc()
+                return False
+
+            self._steps[user_id] = (step, now + self._ttl)
+            self._sweep(now)
+
+            return True
+
+    def _sweep(self, now: float) -> None:
+        steps = self._steps
+
+        while steps:
+            user_id = next(iter(steps))
+
+            if steps[user_id][1] > now and len(steps) <= self._max_entries:
+                break
+
+            del steps[user_id]
+
+
+class RedisReplayStore:
+    """Shared across workers; the compare-and-set runs atomically in
+    Redis"""
+
+    _SCRIPT = """
+local last = redis.call('GET', KEYS[1])
+if last and tonumber(last) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+    def __init__(self, url: str, ttl: float = 90,
+                 prefix: str = "2fa:otp-step:") -> None:
+        if redis is None:
+            raise RuntimeError(
+                "The redis package is required for the redis replay store")
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+        self._ttl = max(1, int(ttl))
+        self._prefix = prefix
+        self._replays = metrics.counter("otp_replay.rejected")
+
+    def check_and_record(self, user_id: Hashable, step: int) -> bool:
+        accepted = bool(self._script(
+            keys=[f"{self._prefix}{user_id}"], args=[step, self._ttl]))
+
+        if not accepted:
+            self._replays.inc()
+
+        return accepted
+
+
+def build_replay_store(name: str, ttl: float, max_entries: int,
+                       redis_url: Optional[str],
+                       env: str = "dev") -> ReplayStore:
+    if name == "redis":
+        return RedisReplayStore(redis_url or "redis://localhost:6379/0", ttl)
+
+    if env not in ("dev", "test"):
+        warnings.warn(
+            f"OTP_REPLAY_BACKEND=memory in {env!r}: a used code is only "
+            "rejected by the worker that accepted it; use redis when "
+            "running more than one", RuntimeWarning)
+
+    return MemoryReplayStore(ttl=ttl, max_entries=max_entries)
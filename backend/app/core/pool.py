@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# File: pool.py
+"""Connection Pool"""
+
+
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import Histogram, metrics
+
+
+class _TimedCheckoutMixin:
+    """Records how long callers block waiting for a pooled connection"""
+
+    checkout_wait: Optional[Histogram] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        finally:
+            if self.checkout_wait is not None:
+                self.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin,
+                                        AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(configs, is_async: bool = False) -> dict:
+    """``create_engine`` keyword arguments built from ``Configs``"""
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async
+        else InstrumentedQueuePool,
+        "pool_size": configs.DB_POOL_SIZE,
+        "max_overflow": configs.DB_MAX_OVERFLOW,
+        "pool_timeout": configs.DB_POOL_TIMEOUT,
+        "pool_recycle": configs.DB_POOL_RECYCLE,
+        "pool_pre_ping": configs.DB_POOL_PRE_PING,
+    }
+
+
+def instrument_pool(engine: Engine, name: str = "primary") -> None:
+    """Publish checkout, wait, overflow and invalidation metrics for the
+    pool of ``engine`` under ``db.<name>.pool.*``"""
+    prefix = f"db.{name}.pool"
+
+    checkouts = metrics.counter(f"{prefix}.checkouts")
+    connects = metrics.counter(f"{prefix}.connects")
+    invalidations = metrics.counter(f"{prefix}.invalidations")
+    soft_invalidations = metrics.counter(f"{prefix}.soft_invalidations")
+
+    if isinstance(engine.pool, _TimedCheckoutMixin):
+        engine.pool.checkout_wait = metrics.histogram(
+            f"{prefix}.checkout_wait_seconds")
+
+    def _stat(attribute: str):
+        def read() -> int:
+            method = getattr(engine.pool, attribute, None)
+            return method() if method is not None else 0
+        return read
+
+    metrics.gauge(f"{prefix}.size", _stat("size"))
+    metrics.gauge(f"{prefix}.checked_out", _stat("checkedout"))
+    metrics.gauge(f"{prefix}.checked_in", _stat("checkedin"))
+    metrics.gauge(f"{prefix}.overflow",
+                  lambda: max(0, _stat("overflow")()))
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connects.inc()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        invalidations.inc()
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        soft_invalidations.inc()
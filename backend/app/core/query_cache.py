@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# File: query_cache.py
+"""Compiled Statement Cache"""
+
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import CacheStats
+
+from app.core.metrics import metrics
+
+
+def instrument_query_cache(engine: Engine, name: str = "primary") -> None:
+    """Publish how often ``engine`` reuses a compiled statement instead of
+    compiling it again, under ``db.<name>.query_cache.*``.
+
+    ``misses`` should flatten out once every statement shape has been
+    seen; a steadily growing count means statements that vary in shape
+    (inlined literals, per-call ``IN`` lists) or a cache that is too small
+    for them, see ``DB_QUERY_CACHE_SIZE``.
+    """
+    prefix = f"db.{name}.query_cache"
+
+    hits = metrics.counter(f"{prefix}.hits")
+    misses = metrics.counter(f"{prefix}.misses")
+    uncached = metrics.counter(f"{prefix}.uncached")
+
+    def hit_ratio() -> float:
+        total = hits.value + misses.value
+        return hits.value / total if total else 0.0
+
+    def size() -> int:
+        cache = engine._compiled_cache
+        return len(cache) if cache is not None else 0
+
+    metrics.gauge(f"{prefix}.hit_ratio", hit_ratio)
+    metrics.gauge(f"{prefix}.size", size)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def on_execute(connection, cursor, statement, parameters, context,
+                   executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+
+        if cache_hit is CacheStats.CACHE_HIT:
+            hits.inc()
+        elif cache_hit is CacheStats.CACHE_MISS:
+            misses.inc()
+        else:
+            uncached.inc()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# File: replicas.py
+"""Read Replica Routing"""
+
+
+import itertools
+import time
+from typing import Hashable, Optional, Sequence
+
+from app.core.metrics import metrics
+from app.util.cache import LRUCache
+
+
+class ReplicaUnavailableError(Exception):
+    """A read could not be served by the replica it was routed to; the
+    caller may retry it on the primary"""
+
+
+class ReplicaRouter:
+    """Picks the engine for a read-only session.
+
+    Replicas are taken round-robin, skipping any that failed within the
+    last ``retry_after`` seconds. Keys passed to ``record_write`` (user ids,
+    emails) stick to the primary for ``read_your_writes`` seconds, so a
+    user does not read back a row older than their own last write. The
+    window is tracked per process.
+    """
+
+    def __init__(self, names: Sequence[str], read_your_writes: float = 1.0,
+                 retry_after: float = 30,
+                 max_tracked_writes: int = 100000) -> None:
+        self.names = list(names)
+        self._retry_after = retry_after
+        self._down_until = [0.0] * len(self.names)
+        self._next = itertools.count()
+
+        self._recent_writes = LRUCache(
+            maxsize=max_tracked_writes, ttl=read_your_writes) \
+            if self.names and read_your_writes > 0 else None
+
+        metrics.gauge("db.replicas.healthy", self.healthy)
+        self._primary_reads = metrics.counter("db.reads.primary")
+        self._replica_reads = metrics.counter("db.reads.replica")
+        self._sticky_reads = metrics.counter("db.reads.sticky")
+        self._failures = [metrics.counter(f"db.{name}.failures")
+                          for name in self.names]
+
+    def healthy(self) -> int:
+        now = time.monotonic()
+
+        return sum(1 for until in self._down_until if until <= now)
+
+    def record_write(self, key: Hashable) -> None:
+        if self._recent_writes is not None and key is not None:
+            self._recent_writes.set(key, True)
+
+    def pick(self, key: Optional[Hashable] = None) -> Optional[int]:
+        """Index of the replica to read from, ``None`` for the primary"""
+        if not self.names:
+            self._primary_reads.inc()
+            return None
+
+        if key is not None and self._recent_writes is not None and \
+                self._recent_writes.get(key) is not None:
+            self._sticky_reads.inc()
+            return None
+
+        now = time.monotonic()
+
+        for _ in range(len(self.names)):
+            index = next(self._next) % len(self.names)
+
+            if self._down_until[index] <= now:
+                self._replica_reads.inc()
+                return index
+
+        self._primary_reads.inc()
+
+        return None
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + self._retry_after
+        self._failures[index].inc()
@@ -3,6 +3,9 @@
 """Security"""
 
 
+import hashlib
+import time
+import pyotp
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 from fastapi import Request
@@ -11,11 +14,22 @@ from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import configs
 from app.core.exceptions import AuthError
+from app.core.metrics import metrics
+from app.util.cache import LRUCache
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
+# verified claims keyed by a digest of the raw token, each entry expiring
+# no later than the token's own ``exp``
+token_cache = LRUCache(maxsize=configs.TOKEN_CACHE_SIZE,
+                       ttl=configs.TOKEN_CACHE_TTL_SECONDS)
+
+metrics.gauge("token_cache.hits", lambda: token_cache.hits)
+metrics.gauge("token_cache.misses", lambda: token_cache.misses)
+metrics.gauge("token_cache.size", lambda: len(token_cache))
+
 
 def create_access_token(subject: dict, expires_delta:
                         Optional[timedelta] = None) -> Tuple[str, str]:
@@ -52,7 +66,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def generate_otp_credentials(email: str) -> Tuple[str, str]:
+    """A fresh TOTP secret and its provisioning URI"""
+    otp_base32 = pyotp.random_base32()
+
+    otp_auth_url = pyotp.totp.TOTP(otp_base32).provisioning_uri(
+        name=str(email), issuer_name="2fa.com")
+
+    return otp_base32, otp_auth_url
+
+
 def decode_jwt(token: str) -> dict:
+    key = token_digest(token)
+
+    cached = token_cache.get(key)
+
+    if cached is not None:
+        if cached["exp"] >= time.time():
+            return dict(cached)
+
+        token_cache.delete(key)
+
+        return {}
+
     try:
         decoded_token = jwt.decode(
             token, configs.SECRET_KEY, algorithms=ALGORITHM)
@@ -62,7 +102,10 @@ def decode_jwt(token: str) -> dict:
             decoded_token["exp"], timezone.utc)
 
         if expiration_time >= datetime.now(timezone.utc):
-            return decoded_token
+            token_cache.set(key, decoded_token,
+                            ttl=decoded_token["exp"] - time.time())
+
+            return dict(decoded_token)
         else:
             return {}
     except Exception as e:
@@ -73,7 +116,8 @@ class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
-    async def __call__(self, request: Request):
+    async def __call__(self, request: Request) -> dict:
+        """Return the verified claims of the bearer token"""
         credentials: Optional[HTTPAuthorizationCredentials] = \
             await super(JWTBearer, self).__call__(request)
 
@@ -81,21 +125,13 @@ class JWTBearer(HTTPBearer):
             if not credentials.scheme == "Bearer":
                 raise AuthError(detail="Invalid authentication scheme.")
 
-            if not self.verify_jwt(credentials.credentials):
+            claims = decode_jwt(credentials.credentials)
+
+            if not claims:
                 raise AuthError(detail="Invalid token or expired token.")
 
-            return credentials.credentials
-        else:
+            return claims
+        elif self.auto_error:
             raise AuthError(detail="Invalid authorization code.")
-
-    def verify_jwt(self, jwt_token: str) -> bool:
-        is_token_valid: bool = False
-
-        try:
-            payload = decode_jwt(jwt_token)
-        except Exception as e:
-            payload = None
-
-        if payload:
-            is_token_valid = True
-        return is_token_valid
+        else:
+            return {}
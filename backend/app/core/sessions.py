@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# File: sessions.py
+"""Session Store"""
+
+
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, List, Optional, Protocol, Set, \
+    Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.model.user_session import UserSession
+
+
+class SessionState:
+    __slots__ = ("id", "user_id", "device", "is_otp_verified", "created_at",
+                 "last_seen_at", "expires_at")
+
+    def __init__(self, id: UUID, user_id: UUID, device: Optional[str],
+                 is_otp_verified: bool, created_at: datetime,
+                 last_seen_at: datetime, expires_at: datetime) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.device = device
+        self.is_otp_verified = is_otp_verified
+        self.created_at = created_at
+        self.last_seen_at = last_seen_at
+        self.expires_at = expires_at
+
+    def __repr__(self) -> str:
+        return f"SessionState(id={self.id!r}, user_id={self.user_id!r})"
+
+
+class SessionStore(Protocol):
+    """Per-device login state, so signing in, verifying an OTP and logging
+    out never write to the ``users`` row.
+
+    ``session`` is the caller's database session; stores that keep their
+    state elsewhere ignore it.
+    """
+
+    def create(self, session: Optional[Session], user_id: UUID,
+               device: Optional[str]) -> SessionState: ...
+
+    def get(self, session: Optional[Session],
+            sid: UUID) -> Optional[SessionState]: ...
+
+    def latest(self, session: Optional[Session],
+               user_id: UUID) -> Optional[SessionState]: ...
+
+    def mark_verified(self, session: Optional[Session],
+                      sid: UUID) -> bool: ...
+
+    def latest_many(self, session: Optional[Session],
+                    user_ids: Collection[UUID]
+                    ) -> Dict[UUID, SessionState]: ...
+
+    def mark_verified_many(self, session: Optional[Session],
+                           sids: Collection[UUID]) -> Set[UUID]: ...
+
+    def revoke(self, session: Optional[Session], sid: UUID) -> bool: ...
+
+    def touch_due(self, state: SessionState) -> bool: ...
+
+    def touch(self, session: Optional[Session],
+              state: SessionState) -> None: ...
+
+    def sweep(self, session: Optional[Session]) -> int: ...
+
+
+class _SessionClock:
+    def __init__(self, ttl: float = 3600, touch_interval: float = 60) -> None:
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+
+        self._created = metrics.counter("sessions.created")
+        self._verified = metrics.counter("sessions.verified")
+        self._revoked = metrics.counter("sessions.revoked")
+
+    def new_state(self, user_id: UUID, device: Optional[str]) -> SessionState:
+        now = _utcnow()
+
+        return SessionState(
+            uuid4(), user_id, device[:255] if device else None, False,
+            now, now, now + timedelta(seconds=self.ttl))
+
+    def is_stale(self, state: SessionState, now: datetime) -> bool:
+        """last_seen_at is only rewritten once per ``touch_interval``"""
+        return (now - state.last_seen_at).total_seconds() >= \
+            self.touch_interval
+
+    def touch_due(self, state: SessionState) -> bool:
+        """Whether ``touch`` would write anything, so a caller reading
+        from a replica only goes to the primary when it would"""
+        return self.is_stale(state, _utcnow())
+
+
+class MemorySessionStore(_SessionClock):
+    """Sessions in a dict with a per-user index, and a heap ordered by
+    expiry so sweeping only touches sessions that have expired.
+
+    Only for a single worker: another process cannot see these sessions,
+    and a restart drops them all. At most ``max_sessions`` are kept; past
+    that, the ones closest to expiry are dropped first.
+    """
+
+    def __init__(self, ttl: float = 3600, touch_interval: float = 60,
+                 max_sessions: int = 100000) -> None:
+        super().__init__(ttl, touch_interval)
+
+        self._max_sessions = max_sessions
+
+        self._sessions: Dict[UUID, SessionState] = {}
+        # user_id -> sids in creation order
+        self._by_user: Dict[UUID, Dict[UUID, None]] = {}
+        self._expiry: List[Tuple[datetime, UUID]] = []
+        self._lock = threading.Lock()
+
+        metrics.gauge("sessions.active", lambda: len(self._sessions))
+
+    def create(self, session: Optional[Session], user_id: UUID,
+               device: Optional[str]) -> SessionState:
+        state = self.new_state(user_id, device)
+
+        with self._lock:
+            self._sweep(state.created_at)
+
+            while len(self._sessions) >= self._max_sessions and \
+                    self._expiry:
+                self._remove(heapq.heappop(self._expiry)[1])
+
+            self._sessions[state.id] = state
+            self._by_user.setdefault(user_id, {})[state.id] = None
+            heapq.heappush(self._expiry, (state.expires_at, state.id))
+
+        self._created.inc()
+
+        return state
+
+    def get(self, session: Optional[Session],
+            sid: UUID) -> Optional[SessionState]:
+        now = _utcnow()
+
+        with self._lock:
+            # an O(1) peek at the heap unless something has expired
+            self._sweep(now)
+
+            return self._sessions.get(sid)
+
+    def latest(self, session: Optional[Session],
+               user_id: UUID) -> Optional[SessionState]:
+        now = _utcnow()
+
+        with self._lock:
+            self._sweep(now)
+            sids = self._by_user.get(user_id)
+
+            # what is left after the sweep is live; the newest comes last
+            return self._sessions[next(reversed(sids))] if sids else None
+
+    def mark_verified(self, session: Optional[Session], sid: UUID) -> bool:
+        state = self.get(session, sid)
+
+        if state is None:
+            return False
+
+        state.is_otp_verified = True
+        self._verified.inc()
+
+        return True
+
+    def latest_many(self, session: Optional[Session],
+                    user_ids: Collection[UUID]) -> Dict[UUID, SessionState]:
+        found = {}
+
+        for user_id in user_ids:
+            state = self.latest(session, user_id)
+
+            if state is not None:
+                found[user_id] = state
+
+        return found
+
+    def mark_verified_many(self, session: Optional[Session],
+                           sids: Collection[UUID]) -> Set[UUID]:
+        return {sid for sid in sids if self.mark_verified(session, sid)}
+
+    def revoke(self, session: Optional[Session], sid: UUID) -> bool:
+        with self._lock:
+            state = self._remove(sid)
+
+        if state is None:
+            return False
+
+        self._revoked.inc()
+
+        return True
+
+    def touch(self, session: Optional[Session], state: SessionState) -> None:
+        now = _utcnow()
+
+        if self.is_stale(state, now):
+            state.last_seen_at = now
+
+    def sweep(self, session: Optional[Session] = None) -> int:
+        with self._lock:
+            return self._sweep(_utcnow())
+
+    def _sweep(self, now: datetime) -> int:
+        removed = 0
+
+        while self._expiry and self._expiry[0][0] <= now:
+            _, sid = heapq.heappop(self._expiry)
+
+            if self._remove(sid) is not None:
+                removed += 1
+
+        return removed
+
+    def _remove(self, sid: UUID) -> Optional[SessionState]:
+        state = self._sessions.pop(sid, None)
+
+        if state is not None:
+            sids = self._by_user.get(state.user_id)
+
+            if sids is not None:
+                sids.pop(sid, None)
+
+                if not sids:
+                    del self._by_user[state.user_id]
+
+        return state
+
+
+class DatabaseSessionStore(_SessionClock):
+    """Sessions in the ``sessions`` table: lookups go through the primary
+    key or the ``user_id`` index, sweeps through the ``expires_at`` index"""
+
+    _COLUMNS = (UserSession.id, UserSession.user_id, UserSession.device,
+                UserSession.is_otp_verified, UserSession.created_at,
+                UserSession.last_seen_at, UserSession.expires_at)
+
+    # run on every authenticated request, so built once
+    _GET = select(*_COLUMNS).where(UserSession.id == bindparam("sid"),
+                                   UserSession.expires_at > bindparam("now"))
+
+    _LATEST = (
+        select(*_COLUMNS)
+        .where(UserSession.user_id == bindparam("user_id"),
+               UserSession.expires_at > bindparam("now"))
+        .order_by(UserSession.created_at.desc())
+        .limit(1)
+    )
+
+    # every live session of a batch of users, oldest first
+    _LIVE_FOR_USERS = (
+        select(*_COLUMNS)
+        .where(UserSession.user_id.in_(bindparam("user_ids")),
+               UserSession.expires_at > bindparam("now"))
+        .order_by(UserSession.created_at)
+    )
+
+    def __init__(self, ttl: float = 3600, touch_interval: float = 60,
+                 sweep_every: int = 100) -> None:
+        super().__init__(ttl, touch_interval)
+
+        self._sweep_every = sweep_every
+        self._creates_since_sweep = 0
+
+    def create(self, session: Session, user_id: UUID,
+               device: Optional[str]) -> SessionState:
+        state = self.new_state(user_id, device)
+
+        session.execute(insert(UserSession).values(
+            {name: getattr(state, name) for name in SessionState.__slots__}))
+
+        self._creates_since_sweep += 1
+
+        if self._creates_since_sweep >= self._sweep_every:
+            self._creates_since_sweep = 0
+            self.sweep(session)
+
+        session.commit()
+        self._created.inc()
+
+        return state
+
+    def get(self, session: Session, sid: UUID) -> Optional[SessionState]:
+        row = session.execute(
+            self._GET, {"sid": sid, "now": _utcnow()}).first()
+
+        return SessionState(*row) if row is not None else None
+
+    def latest(self, session: Session,
+               user_id: UUID) -> Optional[SessionState]:
+        row = session.execute(
+            self._LATEST, {"user_id": user_id, "now": _utcnow()}).first()
+
+        return SessionState(*row) if row is not None else None
+
+    def mark_verified(self, session: Session, sid: UUID) -> bool:
+        result = session.execute(
+            update(UserSession)
+            .where(UserSession.id == sid, UserSession.expires_at > _utcnow())
+            .values(is_otp_verified=True))
+
+        session.commit()
+
+        if not result.rowcount:
+            return False
+
+        self._verified.inc()
+
+        return True
+
+    def latest_many(self, session: Session,
+                    user_ids: Collection[UUID]) -> Dict[UUID, SessionState]:
+        """``latest`` for many users in one query over the ``user_id``
+        index"""
+        if not user_ids:
+            return {}
+
+        rows = session.execute(self._LIVE_FOR_USERS, {
+            "user_ids": list(user_ids), "now": _utcnow()})
+
+        # the newest session of each user overwrites its older ones
+        return {row.user_id: SessionState(*row) for row in rows}
+
+    def mark_verified_many(self, session: Session,
+                           sids: Collection[UUID]) -> Set[UUID]:
+        """``mark_verified`` for many sessions in one UPDATE; returns the
+        sids that were still live"""
+        if not sids:
+            return set()
+
+        statement = (
+            update(UserSession)
+            .where(UserSession.id.in_(list(sids)),
+                   UserSession.expires_at > _utcnow())
+            .values(is_otp_verified=True)
+        )
+
+        if session.get_bind().dialect.update_returning:
+            verified = set(session.execute(
+                statement.returning(UserSession.id)).scalars())
+        else:
+            session.execute(statement)
+            verified = set(session.execute(
+                select(UserSession.id).where(
+                    UserSession.id.in_(list(sids)),
+                    UserSession.is_otp_verified.is_(True))).scalars())
+
+        session.commit()
+        self._verified.inc(len(verified))
+
+        return verified
+
+    def revoke(self, session: Session, sid: UUID) -> bool:
+        result = session.execute(
+            delete(UserSession).where(UserSession.id == sid))
+
+        session.commit()
+
+        if not result.rowcount:
+            return False
+
+        self._revoked.inc()
+
+        return True
+
+    def touch(self, session: Session, state: SessionState) -> None:
+        now = _utcnow()
+
+        if not self.is_stale(state, now):
+            return
+
+        # conditional, so concurrent requests of one session write it once
+        session.execute(
+            update(UserSession)
+            .where(UserSession.id == state.id,
+                   UserSession.last_seen_at <= now - timedelta(
+                       seconds=self.touch_interval))
+            .values(last_seen_at=now))
+        session.commit()
+
+        state.last_seen_at = now
+
+    def sweep(self, session: Session) -> int:
+        result = session.execute(
+            delete(UserSession).where(UserSession.expires_at <= _utcnow()))
+
+        return result.rowcount or 0
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def build_session_store(name: str, ttl: float, touch_interval: float,
+                        max_memory_sessions: int = 100000) -> SessionStore:
+    if name == "memory":
+        return MemorySessionStore(ttl, touch_interval, max_memory_sessions)
+
+    return DatabaseSessionStore(ttl, touch_interval)
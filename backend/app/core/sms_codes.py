@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# File: sms_codes.py
+"""SMS Code Store"""
+
+
+import heapq
+import hmac
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Protocol, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.model.sms_code import SmsCode
+
+
+class SMSCodeStore(Protocol):
+    """One outstanding code per user, kept only as a keyed hash.
+
+    ``session`` is the caller's database session; stores that keep their
+    state elsewhere ignore it.
+    """
+
+    def issue(self, session: Optional[Session], user_id: UUID) -> str: ...
+
+    def verify(self, session: Optional[Session], user_id: UUID,
+               code: str) -> bool: ...
+
+    def sweep(self, session: Optional[Session]) -> int: ...
+
+
+class _CodeHasher:
+    def __init__(self, secret_key: str, length: int = 6,
+                 ttl: float = 300, max_attempts: int = 5) -> None:
+        self._key = secret_key.encode()
+        self.length = length
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+        self._issued = metrics.counter("sms_codes.issued")
+        self._verified = metrics.counter("sms_codes.verified")
+        self._rejected = metrics.counter("sms_codes.rejected")
+
+    def new_code(self) -> str:
+        return str(secrets.randbelow(10 ** self.length)).zfill(self.length)
+
+    def digest(self, user_id: UUID, code: str) -> str:
+        return hmac.new(self._key, f"{user_id}:{code.strip()}".encode(),
+                        hashlib.sha256).hexdigest()
+
+    def matches(self, stored: str, user_id: UUID, code: str) -> bool:
+        return hmac.compare_digest(stored, self.digest(user_id, code))
+
+
+class MemorySMSCodeStore(_CodeHasher):
+    """Codes in a dict, with a heap ordered by expiry so sweeping only
+    touches entries that have actually expired. Only for a single process:
+    other workers cannot check these codes, and a restart drops them."""
+
+    def __init__(self, secret_key: str, length: int = 6, ttl: float = 300,
+                 max_attempts: int = 5) -> None:
+        super().__init__(secret_key, length, ttl, max_attempts)
+
+        # user_id -> [digest, expires_at, attempts]
+        self._codes: Dict[UUID, list] = {}
+        self._expiry: List[Tuple[float, UUID]] = []
+        self._lock = threading.Lock()
+
+        metrics.gauge("sms_codes.outstanding", lambda: len(self._codes))
+
+    def issue(self, session: Optional[Session], user_id: UUID) -> str:
+        code = self.new_code()
+        expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._sweep(time.monotonic())
+            self._codes[user_id] = [
+                self.digest(user_id, code), expires_at, 0]
+            heapq.heappush(self._expiry, (expires_at, user_id))
+
+        self._issued.inc()
+
+        return code
+
+    def verify(self, session: Optional[Session], user_id: UUID,
+               code: str) -> bool:
+        with self._lock:
+            entry = self._codes.get(user_id)
+
+            if entry is None or entry[1] <= time.monotonic():
+                self._rejected.inc()
+                return False
+
+            if self.matches(entry[0], user_id, code):
+                del self._codes[user_id]
+                self._verified.inc()
+                return True
+
+            entry[2] += 1
+
+            if entry[2] >= self.max_attempts:
+                del self._codes[user_id]
+
+        self._rejected.inc()
+
+        return False
+
+    def sweep(self, session: Optional[Session] = None) -> int:
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def _sweep(self, now: float) -> int:
+        removed = 0
+
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self._expiry)
+            entry = self._codes.get(user_id)
+
+            # a newer code for the same user has its own heap entry
+            if entry is not None and entry[1] == expires_at:
+                del self._codes[user_id]
+                removed += 1
+
+        return removed
+
+
+class DatabaseSMSCodeStore(_CodeHasher):
+    """Codes in the ``sms_codes`` table: lookups go through the primary key
+    and sweeps through the ``expires_at`` index"""
+
+    def __init__(self, secret_key: str, length: int = 6, ttl: float = 300,
+                 max_attempts: int = 5, sweep_every: int = 100) -> None:
+        super().__init__(secret_key, length, ttl, max_attempts)
+
+        self._sweep_every = sweep_every
+        self._issues_since_sweep = 0
+
+    def issue(self, session: Session, user_id: UUID) -> str:
+        code = self.new_code()
+
+        values = {
+            "user_id": user_id,
+            "code_hash": self.digest(user_id, code),
+            "expires_at": _utcnow() + timedelta(seconds=self.ttl),
+            "attempts": 0,
+        }
+
+        dialect = session.get_bind().dialect.name
+
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" \
+                else sqlite.insert
+
+            statement = insert(SmsCode).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[SmsCode.user_id],
+                set_={k: statement.excluded[k] for k in values
+                      if k != "user_id"})
+
+            session.execute(statement)
+        else:
+            session.merge(SmsCode(**values))
+
+        self._issues_since_sweep += 1
+
+        if self._issues_since_sweep >= self._sweep_every:
+            self._issues_since_sweep = 0
+            self.sweep(session)
+
+        session.commit()
+        self._issued.inc()
+
+        return code
+
+    def verify(self, session: Session, user_id: UUID, code: str) -> bool:
+        row = session.execute(
+            select(SmsCode.code_hash, SmsCode.expires_at, SmsCode.attempts)
+            .where(SmsCode.user_id == user_id)
+        ).first()
+
+        if row is None or row.expires_at <= _utcnow():
+            self._rejected.inc()
+            return False
+
+        if self.matches(row.code_hash, user_id, code):
+            session.execute(delete(SmsCode).where(SmsCode.user_id == user_id))
+            session.commit()
+            self._verified.inc()
+            return True
+
+        if row.attempts + 1 >= self.max_attempts:
+            session.execute(delete(SmsCode).where(SmsCode.user_id == user_id))
+        else:
+            session.execute(
+                update(SmsCode).where(SmsCode.user_id == user_id)
+                .values(attempts=SmsCode.attempts + 1))
+
+        session.commit()
+        self._rejected.inc()
+
+        return False
+
+    def sweep(self, session: Session) -> int:
+        result = session.execute(
+            delete(SmsCode).where(SmsCode.expires_at <= _utcnow()))
+
+        return result.rowcount or 0
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def build_sms_code_store(name: str, secret_key: str, length: int,
+                         ttl: float, max_attempts: int) -> SMSCodeStore:
+    if name == "memory":
+        return MemorySMSCodeStore(secret_key, length, ttl, max_attempts)
+
+    return DatabaseSMSCodeStore(secret_key, length, ttl, max_attempts)
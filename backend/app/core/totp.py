@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# File: totp.py
+"""TOTP Verification"""
+
+
+import base64
+import hashlib
+import hmac
+import struct
+import time
+from typing import Hashable, List, Optional
+
+from app.core.metrics import metrics
+from app.util.cache import LRUCache
+
+
+class TOTPVerifier:
+    """RFC 6238 verifier meant to be shared by all requests.
+
+    Decoded keys are cached per user and re-decoded whenever the stored
+    secret differs from the cached one. The offset that matched last time
+    is remembered per user and tried first, so a client whose clock runs
+    one step behind usually costs a single HMAC.
+    """
+
+    def __init__(self, valid_window: int = 1, interval: int = 30,
+                 digits: int = 6, cache_size: int = 10000) -> None:
+        self.valid_window = valid_window
+        self.interval = interval
+        self.digits = digits
+
+        self._keys = LRUCache(maxsize=cache_size)
+        self._drift = LRUCache(maxsize=cache_size)
+
+        metrics.gauge("totp.key_cache_hits", lambda: self._keys.hits)
+        metrics.gauge("totp.key_cache_misses", lambda: self._keys.misses)
+        self._accepted = metrics.counter("totp.accepted")
+        self._rejected = metrics.counter("totp.rejected")
+        self._drifted = metrics.counter("totp.accepted_with_drift")
+
+    def time_step(self, at: Optional[float] = None) -> int:
+        return int((time.time() if at is None else at) // self.interval)
+
+    def verify(self, user_id: Hashable, secret: str, code: str,
+               at: Optional[float] = None) -> Optional[int]:
+        """Return the matching time step, or ``None`` if ``code`` is not
+        valid for ``secret`` within the window"""
+        code = (code or "").strip()
+
+        if len(code) != self.digits or not code.isdigit() or not secret:
+            self._rejected.inc()
+            return None
+
+        key = self._key(user_id, secret)
+
+        if key is None:
+            self._rejected.inc()
+            return None
+
+        step = self.time_step(at)
+        candidate = code.encode()
+
+        for offset in self._offsets(user_id):
+            if hmac.compare_digest(self.hotp(key, step + offset), candidate):
+                self._drift.set(user_id, offset)
+                self._accepted.inc()
+
+                if offset:
+                    self._drifted.inc()
+
+                return step + offset
+
+        self._rejected.inc()
+
+        return None
+
+    def generate(self, user_id: Hashable, secret: str,
+                 at: Optional[float] = None) -> Optional[str]:
+        """The code for the current time step"""
+        key = self._key(user_id, secret)
+
+        if key is None:
+            return None
+
+        return self.hotp(key, self.time_step(at)).decode()
+
+    def forget(self, user_id: Hashable) -> None:
+        """Drop cached key material, e.g. when 2FA is disabled"""
+        self._keys.delete(user_id)
+        self._drift.delete(user_id)
+
+    def hotp(self, key: bytes, counter: int) -> bytes:
+        digest = hmac.new(key, struct.pack(">Q", counter),
+                          hashlib.sha1).digest()
+
+        offset = digest[-1] & 0x0F
+        binary = struct.unpack(">I", digest[offset:offset + 4])[0] \
+            & 0x7FFFFFFF
+
+        return str(binary % 10 ** self.digits).zfill(self.digits).encode()
+
+    def _key(self, user_id: Hashable, secret: str) -> Optional[bytes]:
+        cached = self._keys.get(user_id)
+
+        if cached is not None and cached[0] == secret:
+            return cached[1]
+
+        try:
+            key = base64.b32decode(
+                secret + "=" * (-len(secret) % 8), casefold=True)
+        except (ValueError, TypeError):
+            return None
+
+        self._keys.set(user_id, (secret, key))
+
+        return key
+
+    def _offsets(self, user_id: Hashable) -> List[int]:
+        window = range(-self.valid_window, self.valid_window + 1)
+        drift = self._drift.get(user_id, 0)
+
+        if drift not in window:
+            drift = 0
+
+        return sorted(window, key=lambda offset: (abs(offset - drift),
+                                                  offset))
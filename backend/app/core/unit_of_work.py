@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# File: unit_of_work.py
+"""Unit of Work"""
+
+
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, \
+    AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+
+
+_opened = metrics.counter("db.unit_of_work.opened")
+_committed = metrics.counter("db.unit_of_work.committed")
+_rolled_back = metrics.counter("db.unit_of_work.rolled_back")
+
+
+def enable_savepoints(engine: Engine) -> None:
+    """Let SAVEPOINTs nest on SQLite: the pysqlite driver begins its own
+    transactions lazily and commits around SAVEPOINT, so hand transaction
+    control back to SQLAlchemy, which then emits BEGIN itself. Pass an
+    ``AsyncEngine``'s ``sync_engine``."""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+
+class UnitOfWork:
+    """One connection, transaction and session for a whole request.
+
+    Nothing is checked out until the first ``session()``. The session
+    joins the connection's transaction with ``create_savepoint``, so the
+    ``commit()`` calls inside repositories and stores only release a
+    SAVEPOINT; the transaction itself is committed or rolled back once, by
+    ``finish``.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self._engine = engine
+        self._connection: Optional[Connection] = None
+        self._session: Optional[Session] = None
+        self.is_finished = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    def session(self) -> Session:
+        if self._session is None:
+            self._connection = self._engine.connect()
+            self._connection.begin()
+            self._session = Session(
+                bind=self._connection, autoflush=False,
+                join_transaction_mode="create_savepoint")
+            _opened.inc()
+
+        return self._session
+
+    def finish(self, commit: bool) -> None:
+        """End the transaction. What the session holds beyond its last
+        ``commit()`` is discarded either way, as closing a per-call session
+        used to. Calls made after this, e.g. by a streaming response,
+        get sessions of their own again."""
+        self.is_finished = True
+
+        if self._session is None:
+            return
+
+        try:
+            self._session.close()
+
+            if commit:
+                self._connection.commit()
+                _committed.inc()
+            else:
+                self._connection.rollback()
+                _rolled_back.inc()
+        finally:
+            self._connection.close()
+            self._session = self._connection = None
+
+
+class AsyncUnitOfWork:
+    """``UnitOfWork`` on an ``AsyncEngine``"""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+        self._connection: Optional[AsyncConnection] = None
+        self._session: Optional[AsyncSession] = None
+        self.is_finished = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    async def session(self) -> AsyncSession:
+        if self._session is None:
+            self._connection = await self._engine.connect()
+            await self._connection.begin()
+            self._session = AsyncSession(
+                bind=self._connection, autoflush=False,
+                expire_on_commit=False,
+                join_transaction_mode="create_savepoint")
+            _opened.inc()
+
+        return self._session
+
+    async def finish(self, commit: bool) -> None:
+        self.is_finished = True
+
+        if self._session is None:
+            return
+
+        try:
+            await self._session.close()
+
+            if commit:
+                await self._connection.commit()
+                _committed.inc()
+            else:
+                await self._connection.rollback()
+                _rolled_back.inc()
+        finally:
+            await self._connection.close()
+            self._session = self._connection = None
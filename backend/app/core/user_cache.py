@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# File: user_cache.py
+"""User Cache"""
+
+
+from typing import Any, Optional, Protocol, Union
+from uuid import UUID
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core.metrics import metrics
+from app.model.user_records import AUTH_USER_COLUMNS, AuthUser
+from app.util.cache import LRUCache
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[dict]: ...
+
+    def set(self, key: str, value: dict, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryCacheBackend:
+    """Per-process backend, coherent only within one worker"""
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+class RedisCacheBackend:
+    """Shared backend, so that a write in one worker evicts the entry for
+    every worker"""
+
+    def __init__(self, url: str, prefix: str = "2fa:user:") -> None:
+        if redis is None:
+            raise RuntimeError(
+                "The redis package is required for the redis cache backend")
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self._client.get(self._prefix + key)
+
+        return orjson.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        self._client.set(self._prefix + key, orjson.dumps(value),
+                         px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+
+class UserCache:
+    """``AuthUser`` records by user id, for resolving a request's token
+    without a query. Entries hold no password hash or OTP secret."""
+
+    _adapter = TypeAdapter(AuthUser)
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30) -> None:
+        self._backend = backend
+        self._ttl = ttl
+
+        self._hits = metrics.counter("user_cache.hits")
+        self._misses = metrics.counter("user_cache.misses")
+        self._evictions = metrics.counter("user_cache.invalidations")
+
+    def get(self, user_id: Union[UUID, str]) -> Optional[AuthUser]:
+        if self._ttl <= 0:
+            return None
+
+        data = self._backend.get(str(user_id))
+
+        if data is None:
+            self._misses.inc()
+            return None
+
+        self._hits.inc()
+
+        return self._adapter.validate_python(data)
+
+    def set(self, user: Any) -> None:
+        """Cache ``user``, an ``AuthUser`` or a full row to project"""
+        if self._ttl <= 0 or user is None:
+            return
+
+        if not isinstance(user, AuthUser):
+            user = AuthUser.from_user(user)
+
+        values = self._adapter.dump_python(user, mode="json")
+
+        # is_otp_verified belongs to the session, not the user
+        self._backend.set(
+            str(user.id), dict(zip(AUTH_USER_COLUMNS, values)), self._ttl)
+
+    def invalidate(self, user_id: Union[UUID, str]) -> None:
+        self._evictions.inc()
+        self._backend.delete(str(user_id))
+
+
+def build_user_cache_backend(name: str, maxsize: int,
+                             redis_url: Optional[str]) -> CacheBackend:
+    if name == "redis":
+        return RedisCacheBackend(redis_url or "redis://localhost:6379/0")
+
+    return MemoryCacheBackend(maxsize=maxsize)
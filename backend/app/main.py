@@ -5,7 +5,7 @@
 
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from app.core.config import configs
 from app.core.container import Container
 from app.util.class_object import singleton
@@ -23,7 +23,8 @@ class AppCreator:
             title=configs.PROJECT_NAME,
             # openapi_url=f"{configs.API}/openapi.json",
             version="0.0.1",
-            description="Two Factor Authentication"
+            description="Two Factor Authentication",
+            default_response_class=ORJSONResponse,
         )
 
         self.app.add_middleware(
@@ -34,6 +35,21 @@ class AppCreator:
 
         self.db = self.container.db()
 
+        self.app.add_event_handler(
+            "shutdown", self.container.password_hasher().shutdown)
+
+        self.sms_dispatcher = self.container.sms_dispatcher()
+        # built now so a per-worker replay store is reported at startup
+        self.container.otp_replay_store()
+
+        self.app.add_event_handler("startup", self.sms_dispatcher.start)
+        self.app.add_event_handler("shutdown", self.sms_dispatcher.stop)
+
+        if configs.DB_ASYNC:
+            self.async_db = self.container.async_db()
+
+            self.app.add_event_handler("shutdown", self.async_db.dispose)
+
         # set cors
         if configs.BACKEND_CORS_ORIGINS:
             self.app.add_middleware(
@@ -68,7 +84,7 @@ async def validation_exception_handler(_, exc):
             'field': field,
             'message': error['msg']
         })
-    return JSONResponse(status_code=422, content={
+    return ORJSONResponse(status_code=422, content={
         "detail": "Validation error", "errors": errors})
 
 
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# File: sms_code.py
+"""SMS Code Model"""
+
+
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Uuid
+from sqlmodel import Field, SQLModel
+
+
+class SmsCode(SQLModel, table=True):
+    """The one outstanding SMS code of a user, stored as a keyed hash"""
+
+    __tablename__: str = 'sms_codes'
+
+    user_id: UUID = Field(sa_column=Column(
+        Uuid, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True))
+
+    code_hash: str = Field(sa_column=Column(String(64), nullable=False))
+
+    expires_at: datetime = Field(sa_column=Column(
+        DateTime, nullable=False, index=True))
+
+    attempts: int = Field(sa_column=Column(
+        Integer, nullable=False, default=0))
@@ -5,7 +5,8 @@
 
 from typing import List, Optional
 from pydantic import EmailStr
-from sqlalchemy import Boolean, Column, String, text, Enum
+from sqlalchemy import Boolean, Column, DDL, Index, String, event, func, \
+    text, Enum
 from app.core.database import Base
 from app.model.base_model import BaseModel
 from sqlalchemy.orm import Session
@@ -60,3 +61,29 @@ class User(BaseModel, table=True):
 
     otp_auth_url: Optional[str] = Field(
         sa_column=Column(String, nullable=True))
+
+
+# case-insensitive uniqueness; also serves the lower(email) login lookups
+Index("ix_users_email_lower", func.lower(User.__table__.c.email), unique=True)
+
+# keyset pagination of listings in (created_at, id) order, either direction
+Index("ix_users_created_at_id", User.__table__.c.created_at,
+      User.__table__.c.id)
+
+# search: prefix matches use the text_pattern_ops btrees, substring matches
+# the pg_trgm GIN indexes; SQLite only gets the plain btrees
+Index("ix_users_email_pattern", User.__table__.c.email,
+      postgresql_ops={"email": "text_pattern_ops"})
+Index("ix_users_phone_no_pattern", User.__table__.c.phone_no,
+      postgresql_ops={"phone_no": "text_pattern_ops"})
+Index("ix_users_email_trgm", User.__table__.c.email,
+      postgresql_using="gin",
+      postgresql_ops={"email": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+Index("ix_users_phone_no_trgm", User.__table__.c.phone_no,
+      postgresql_using="gin",
+      postgresql_ops={"phone_no": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+event.listen(
+    User.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(
+        dialect="postgresql"))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# File: user_records.py
+"""User Records
+
+Immutable projections of the ``users`` row for the auth paths. They are
+built from the selected columns alone, so nothing else the row holds is
+hydrated or left in request scope.
+"""
+
+
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+from uuid import UUID
+
+from app.model.user import AuthType
+
+
+class LoginUser(NamedTuple):
+    """What sign-in checks and answers with; the only record carrying the
+    password hash"""
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+    email: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone_no: Optional[str]
+    password: Optional[str]
+    is_active: Optional[bool]
+    is_2fa_enabled: Optional[bool]
+    is_2fa_setup: Optional[bool]
+    auth_2fa_type: Optional[AuthType]
+
+
+class AuthUser(NamedTuple):
+    """The user behind a request's token: no password hash or OTP secret.
+    ``otp_auth_url`` stays for the QR code and /user handlers, and
+    ``is_otp_verified`` comes from the token's session."""
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+    email: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone_no: Optional[str]
+    is_active: Optional[bool]
+    is_2fa_enabled: Optional[bool]
+    is_2fa_setup: Optional[bool]
+    auth_2fa_type: Optional[AuthType]
+    otp_auth_url: Optional[str]
+    is_otp_verified: bool = False
+
+    @classmethod
+    def from_user(cls, user: Any) -> "AuthUser":
+        """Project a full row, e.g. one a write returned"""
+        return cls(*(getattr(user, name) for name in AUTH_USER_COLUMNS))
+
+
+# the columns each record is selected from, in field order
+LOGIN_USER_COLUMNS = LoginUser._fields
+
+AUTH_USER_COLUMNS = AuthUser._fields[:-1]
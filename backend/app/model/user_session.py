@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# File: user_session.py
+"""User Session Model"""
+
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, Uuid
+from sqlmodel import Field, SQLModel
+
+
+class UserSession(SQLModel, table=True):
+    """One signed-in device; access tokens carry its id as ``sid``"""
+
+    __tablename__: str = 'sessions'
+
+    id: UUID = Field(sa_column=Column(Uuid, primary_key=True))
+
+    user_id: UUID = Field(sa_column=Column(
+        Uuid, ForeignKey("users.id", ondelete="CASCADE"), nullable=False,
+        index=True))
+
+    device: Optional[str] = Field(sa_column=Column(
+        String(255), nullable=True))
+
+    is_otp_verified: bool = Field(sa_column=Column(
+        Boolean, nullable=False, default=False))
+
+    created_at: datetime = Field(sa_column=Column(DateTime, nullable=False))
+
+    last_seen_at: datetime = Field(sa_column=Column(
+        DateTime, nullable=False))
+
+    expires_at: datetime = Field(sa_column=Column(
+        DateTime, nullable=False, index=True))
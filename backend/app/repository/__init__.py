@@ -1 +1,2 @@
 from app.repository.user_repository import UserRepository
+from app.repository.async_user_repository import AsyncUserRepository
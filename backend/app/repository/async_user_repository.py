@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# File: async_user_repository.py
+"""Async User Repository"""
+
+
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, \
+    Hashable, Optional, Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.otp_replay import ReplayStore
+from app.core.replicas import ReplicaUnavailableError
+from app.core.sessions import SessionStore
+from app.core.sms_codes import SMSCodeStore
+from app.core.totp import TOTPVerifier
+from app.core.user_cache import UserCache
+from app.model.user_records import AuthUser
+from app.repository.user_repository import UserRepository
+from app.util.util import as_uuid
+
+
+class AsyncUserRepository(UserRepository):
+    """UserRepository on an ``AsyncSession``.
+
+    Every public method of ``UserRepository`` becomes awaitable: the shared
+    ``_``-prefixed implementations run through ``AsyncSession.run_sync``, so
+    no threadpool thread is held while waiting on the database.
+    """
+
+    def __init__(self, session_factory:
+                 Callable[[], AsyncContextManager[AsyncSession]],
+                 user_cache: Optional[UserCache] = None,
+                 totp_verifier: Optional[TOTPVerifier] = None,
+                 replay_store: Optional[ReplayStore] = None,
+                 sms_code_store: Optional[SMSCodeStore] = None,
+                 session_store: Optional[SessionStore] = None,
+                 read_session_factory: Optional[Callable[
+                     [Optional[Hashable]],
+                     AsyncContextManager[AsyncSession]]] = None,
+                 record_write: Optional[Callable[[Hashable], None]] = None):
+        super().__init__(session_factory, user_cache, totp_verifier,
+                         replay_store, sms_code_store, session_store,
+                         read_session_factory, record_write)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        async with self.session_factory() as session:
+            return await session.run_sync(func, *args)
+
+    async def _run_read(self, func: Callable[..., Any], *args: Any,
+                        key: Optional[Hashable] = None) -> Any:
+        if self.read_session_factory is None:
+            return await self._run(func, *args)
+
+        try:
+            async with self.read_session_factory(key) as session:
+                return await session.run_sync(func, *args)
+        except ReplicaUnavailableError:
+            return await self._run(func, *args)
+
+    async def get_session_user(self, user_id: str,
+                               sid: Optional[str]) -> Optional[AuthUser]:
+        user, login = await self._run_read(
+            self._get_session_user, user_id, sid, key=as_uuid(user_id))
+
+        if login is not None and self.session_store.touch_due(login):
+            await self._run(self.session_store.touch, login)
+
+        return user
+
+    async def _stream(self, statement) -> AsyncIterator[Sequence[Row]]:
+        """``AsyncSession.stream`` keeps the server-side cursor open between
+        batches without holding a thread"""
+        session_context = self.read_session_factory(None) \
+            if self.read_session_factory is not None \
+            else self.session_factory()
+
+        async with session_context as session:
+            result = await session.stream(statement)
+
+            async for partition in result.partitions():
+                yield partition
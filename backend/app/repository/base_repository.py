@@ -3,57 +3,240 @@
 """Base Repository"""
 
 
-from typing import Callable
+import json
+from typing import Any, Callable, ContextManager, Hashable, Iterator, \
+    Optional, Sequence, Tuple
 from uuid import UUID
 
+from sqlalchemy import Row, func, select, text, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 
-from app.core.exceptions import DuplicatedError, NotFoundError
+from app.core.exceptions import DuplicatedError, NotFoundError, \
+    RequestError
+from app.core.replicas import ReplicaUnavailableError
+from app.util.query_builder import decode_keyset_cursor, \
+    dict_to_sqlalchemy_filter_options, encode_keyset_cursor
+
+# FindBase fields that shape the page rather than filter rows
+PAGING_FIELDS = ("cursor", "page_size", "newest_first", "count", "match")
 
 
 class BaseRepository:
+    """Public methods open a session and hand it to a ``_``-prefixed
+    implementation that only talks to that session, so the same logic can
+    be driven by a sync ``Session`` or an ``AsyncSession.run_sync``.
+
+    Pure reads go through ``_run_read``, which uses ``read_session_factory``
+    (a replica, see ``Database.read_session``) when one is given.
+    """
+
     def __init__(self, session_factory:
-                 Callable[[], Session], model) -> None:
+                 Callable[[], Session], model,
+                 read_session_factory: Optional[
+                     Callable[[Optional[Hashable]], ContextManager[Session]]
+                 ] = None,
+                 record_write: Optional[Callable[[Hashable], None]] = None
+                 ) -> None:
         self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+        self.record_write = record_write
 
         self.model = model
 
-    def read_by_id(self, id: UUID, eager=False):
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
         with self.session_factory() as session:
-            query = session.query(self.model)
+            return func(session, *args)
+
+    def _run_read(self, func: Callable[..., Any], *args: Any,
+                  key: Optional[Hashable] = None) -> Any:
+        """``_run`` for read-only work; ``key`` is what the caller last
+        wrote under, for read-your-writes"""
+        if self.read_session_factory is None:
+            return self._run(func, *args)
+
+        try:
+            with self.read_session_factory(key) as session:
+                return func(session, *args)
+        except ReplicaUnavailableError:
+            return self._run(func, *args)
+
+    def _written(self, *keys: Hashable) -> None:
+        if self.record_write is not None:
+            for key in keys:
+                self.record_write(key)
+
+    def _stream(self, statement) -> Iterator[Sequence[Row]]:
+        """Batches of ``statement``'s rows, fetched ``yield_per`` at a time
+        through a server-side cursor, from a session held only while the
+        caller keeps iterating"""
+        session_context = self.read_session_factory(None) \
+            if self.read_session_factory is not None \
+            else self.session_factory()
+
+        with session_context as session:
+            yield from session.execute(statement).partitions()
+
+    def read_by_options(self, schema, eager=False) -> dict:
+        """One page in ``(created_at, id)`` order.
+
+        Pages are addressed by the keyset of the last row instead of an
+        OFFSET, so every page costs an index range scan of ``page_size``
+        rows however deep it is.
+        """
+        return self._run_read(self._read_by_options, schema, eager)
+
+    def _read_by_options(self, session: Session, schema,
+                         eager=False) -> dict:
+        options = schema.model_dump(exclude_none=True)
+        paging = {key: options.pop(key) for key in PAGING_FIELDS
+                  if key in options}
+
+        page_size = paging["page_size"]
+        newest_first = paging["newest_first"]
+
+        criteria = dict_to_sqlalchemy_filter_options(
+            self.model, options, paging["match"])
+        keyset = tuple_(self.model.created_at, self.model.id)
+
+        query = select(self.model).where(criteria)
+
+        if paging.get("cursor"):
+            try:
+                after = decode_keyset_cursor(paging["cursor"])
+            except ValueError:
+                raise RequestError(detail="Invalid cursor")
+
+            query = query.where(keyset < after if newest_first
+                                else keyset > after)
+
+        if eager:
+            for eager in getattr(self.model, "eagers", []):
+                query = query.options(
+                    joinedload(getattr(self.model, eager)))
+
+        order = (self.model.created_at, self.model.id)
+
+        query = query.order_by(
+            *(column.desc() if newest_first else column.asc()
+              for column in order)
+        ).limit(page_size + 1)
+
+        founds = session.execute(query).scalars().unique().all()
+
+        next_cursor = None
+
+        if len(founds) > page_size:
+            founds = founds[:page_size]
+            next_cursor = encode_keyset_cursor(
+                founds[-1].created_at, founds[-1].id)
+
+        total_count, is_estimate = self._count(
+            session, criteria, paging["count"], filtered=bool(options))
+
+        return {
+            "founds": founds,
+            "search_options": {
+                "page_size": page_size,
+                "newest_first": newest_first,
+                "next_cursor": next_cursor,
+                "total_count": total_count,
+                "total_count_is_estimate": is_estimate,
+            },
+        }
+
+    def _count(self, session: Session, criteria, mode: str,
+               filtered: bool = True) -> Tuple[Optional[int], bool]:
+        if mode == "none":
+            return None, False
+
+        if mode == "estimate" and \
+                session.get_bind().dialect.name == "postgresql":
+            estimate = self._estimate_count(session, criteria, filtered)
+
+            if estimate is not None:
+                return estimate, True
+
+        return session.execute(
+            select(func.count()).select_from(self.model).where(criteria)
+        ).scalar_one(), False
+
+    def _estimate_count(self, session: Session, criteria,
+                        filtered: bool) -> Optional[int]:
+        """Row count from planner statistics (PostgreSQL): ``reltuples``
+        for the whole table, the plan's row estimate otherwise. ``None``
+        when the table has never been analyzed."""
+        if not filtered:
+            reltuples = session.execute(
+                text("SELECT reltuples::bigint FROM pg_class "
+                     "WHERE oid = CAST(:table AS regclass)"),
+                {"table": self.model.__tablename__},
+            ).scalar()
+
+            if reltuples is None or reltuples < 0:
+                return None
+
+            return reltuples
+
+        compiled = select(self.model.id).where(criteria).compile(
+            dialect=session.get_bind().dialect)
+
+        if compiled.positional:
+            params = tuple(compiled.params[name]
+                           for name in compiled.positiontup)
+        else:
+            params = compiled.params
+
+        plan = session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def read_by_id(self, id: UUID, eager=False):
+        return self._run_read(self._read_by_id, id, eager, key=id)
+
+    def _read_by_id(self, session: Session, id: UUID, eager=False):
+        query = session.query(self.model)
 
-            if eager:
-                for eager in getattr(self.model, "eagers", []):
-                    query = query.options(
-                        joinedload(getattr(self.model, eager)))
+        if eager:
+            for eager in getattr(self.model, "eagers", []):
+                query = query.options(
+                    joinedload(getattr(self.model, eager)))
 
-            query = query.filter(self.model.id == id).first()
+        query = query.filter(self.model.id == id).first()
 
-            if not query:
-                raise NotFoundError(detail=f"not found id : {id}")
-            return query
+        if not query:
+            raise NotFoundError(detail=f"not found id : {id}")
+        return query
 
     def create(self, schema):
-        with self.session_factory() as session:
-            query = self.model(**schema.dict())
+        return self._run(self._create, schema)
 
-            try:
-                session.add(query)
+    def _create(self, session: Session, schema):
+        query = self.model(**schema.dict())
 
-                session.commit()
+        try:
+            session.add(query)
+
+            session.commit()
 
-                session.refresh(query)
-            except IntegrityError as e:
-                raise DuplicatedError(detail=str(e.orig))
+            session.refresh(query)
+        except IntegrityError as e:
+            raise DuplicatedError(detail=str(e.orig))
 
-            return query
+        return query
 
     def update(self, id: UUID, schema):
-        with self.session_factory() as session:
-            session.query(self.model).filter(self.model.id == id).update(
-                schema.dict(exclude_none=True))
+        return self._run(self._update, id, schema)
 
-            session.commit()
+    def _update(self, session: Session, id: UUID, schema):
+        session.query(self.model).filter(self.model.id == id).update(
+            schema.dict(exclude_none=True))
+
+        session.commit()
+        self._written(id)
 
-            return self.read_by_id(id)
+        return self._read_by_id(session, id)
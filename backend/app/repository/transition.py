@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# File: transition.py
+"""State Transitions"""
+
+
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+
+class Transition:
+    """A single-row state change applied as one conditional
+    ``UPDATE ... WHERE id = :id AND <expected> RETURNING *``.
+
+    ``expected`` is the compare-and-set guard: when the row no longer
+    matches it, nothing is written and ``apply`` returns ``None``.
+    """
+
+    def __init__(self, name: str, values: Dict[str, Any],
+                 expected: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.values = values
+        self.expected = expected or {}
+
+    def __repr__(self) -> str:
+        return f"Transition({self.name!r})"
+
+    def apply(self, session: Session, model, id: UUID, **expected: Any):
+        guard = {**self.expected, **expected}
+
+        conditions = [model.id == id]
+
+        for key, value in guard.items():
+            column = getattr(model, key)
+            conditions.append(
+                column.is_(None) if value is None else column == value)
+
+        values = dict(self.values)
+
+        if hasattr(model, "updated_at"):
+            values.setdefault("updated_at", func.now())
+
+        statement = update(model).where(*conditions).values(**values)
+
+        if session.get_bind().dialect.update_returning:
+            row = session.execute(
+                statement.returning(model),
+                execution_options={"synchronize_session": False,
+                                   "populate_existing": True},
+            ).scalars().first()
+        else:
+            result = session.execute(
+                statement, execution_options={"synchronize_session": False})
+
+            row = None
+
+            if result.rowcount:
+                row = session.execute(
+                    select(model).where(model.id == id),
+                    execution_options={"populate_existing": True},
+                ).scalars().first()
+
+        return row
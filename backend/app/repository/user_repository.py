@@ -3,46 +3,242 @@
 """User Repository"""
 
 
-from typing import Callable, Optional
+from datetime import datetime
+from typing import Callable, ContextManager, Hashable, Iterator, List, \
+    Optional, Sequence, Tuple
 from uuid import UUID, uuid4
-import pyotp
 from requests import session
-from sqlalchemy import String, Uuid, cast
+from sqlalchemy import Row, bindparam, func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.core.exceptions import AuthError, DuplicatedError, RequestError
-from app.core.security import verify_password
+from fastapi import HTTPException, status
+from app.core.exceptions import AuthError, ConflictError, DuplicatedError, \
+    RequestError
+from app.core.config import configs
+from app.core.otp_replay import ReplayStore
+from app.core.sessions import MemorySessionStore, SessionState, SessionStore
+from app.core.sms_codes import MemorySMSCodeStore, SMSCodeStore
+from app.core.security import generate_otp_credentials, verify_password
+from app.core.totp import TOTPVerifier
+from app.core.user_cache import UserCache
 from app.model.user import AuthType, User
+from app.model.user_records import AUTH_USER_COLUMNS, LOGIN_USER_COLUMNS, \
+    AuthUser, LoginUser
 from app.repository.base_repository import BaseRepository
-from app.schema.auth_schema import OTPPayload, SignUp
+from app.repository.transition import Transition
+from app.schema.auth_schema import OTPBatchResult, OTPPayload, SignUp
+from app.schema.user_schema import USER_EXPORT_COLUMNS
+from app.util.query_builder import match_expression
+from app.util.util import as_uuid, normalize_email
 from sqlalchemy.exc import IntegrityError
 
 
+SETUP_2FA = Transition("setup_2fa", {"is_2fa_setup": True})
+
+DISABLE_2FA = Transition(
+    "disable_2fa",
+    {
+        "otp_auth_url": None,
+        "otp_secret": None,
+        "auth_2fa_type": None,
+        "is_2fa_enabled": False,
+    },
+    expected={"is_2fa_enabled": True},
+)
+
+# guarded at call time on the otp_secret the code was checked against
+OTP_SETUP_VERIFIED = Transition("otp_setup_verified", {"is_2fa_setup": True})
+
+SMS_SETUP = Transition(
+    "sms_setup", {"is_2fa_setup": True},
+    expected={"auth_2fa_type": AuthType.Sms})
+
+USE_SMS = Transition("use_sms", {"auth_2fa_type": AuthType.Sms})
+
+USE_AUTHENTICATOR = Transition(
+    "use_authenticator", {"auth_2fa_type": AuthType.Authenticator})
+
+
+# the login and current-user lookups, built once: executing them skips
+# constructing a query per call, and their compiled SQL is found in the
+# engine's statement cache under a key computed only once
+_USER_BY_EMAIL = select(User).where(
+    func.lower(User.email) == bindparam("email")).limit(1)
+
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id")).limit(1)
+
+# sign-in and per-request auth select only their records' columns
+_LOGIN_USER_BY_EMAIL = select(
+    *(getattr(User, name) for name in LOGIN_USER_COLUMNS)
+).where(func.lower(User.email) == bindparam("email")).limit(1)
+
+_AUTH_USER_BY_ID = select(
+    *(getattr(User, name) for name in AUTH_USER_COLUMNS)
+).where(User.id == bindparam("user_id")).limit(1)
+
+
+# what a batch of OTPs is checked against, for all its users at once
+_OTP_STATES_BY_EMAIL = select(
+    User.id, User.otp_secret, User.auth_2fa_type,
+    func.lower(User.email).label("email")
+).where(func.lower(User.email).in_(bindparam("emails")))
+
+
+def _uses_sms(state) -> bool:
+    return bool(state.auth_2fa_type) and \
+        state.auth_2fa_type.lower() == 'sms'
+
+
 class UserRepository(BaseRepository):
-    def __init__(self, session_factory: Callable[[], Session]):
+    def __init__(self, session_factory: Callable[[], Session],
+                 user_cache: Optional[UserCache] = None,
+                 totp_verifier: Optional[TOTPVerifier] = None,
+                 replay_store: Optional[ReplayStore] = None,
+                 sms_code_store: Optional[SMSCodeStore] = None,
+                 session_store: Optional[SessionStore] = None,
+                 read_session_factory: Optional[Callable[
+                     [Optional[Hashable]], ContextManager[Session]]] = None,
+                 record_write: Optional[Callable[[Hashable], None]] = None):
         self.session_factory = session_factory
         self.model = User
+        self.user_cache = user_cache
+        self.totp_verifier = totp_verifier or TOTPVerifier()
+        self.replay_store = replay_store
+        self.sms_code_store = sms_code_store or \
+            MemorySMSCodeStore(configs.SECRET_KEY)
+        self.session_store = session_store or MemorySessionStore(
+            ttl=configs.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+        super().__init__(session_factory, User, read_session_factory,
+                         record_write)
+
+    def _cache_user(self, user: Optional[User]) -> None:
+        """Write-through after a successful commit"""
+        if self.user_cache is not None and user is not None:
+            self.user_cache.set(user)
+
+    def _evict_user(self, user_id) -> None:
+        if self.user_cache is not None:
+            self.user_cache.invalidate(user_id)
+
+    def _written_user(self, user: Optional[User]) -> None:
+        """Reads by either id or email follow this write to the primary"""
+        if user is not None:
+            self._written(user.id, normalize_email(user.email))
+
+    def _update(self, session: Session, id: UUID, schema):
+        self._evict_user(id)
 
-        super().__init__(session_factory, User)
+        return super()._update(session, id, schema)
 
     def get_by_email(self, email: str):
         """"""
-        with self.session_factory() as session:
-            query = session.query(self.model).filter(
-                cast(self.model.email, String) == cast(email, String)).first()
+        return self._run_read(self._get_by_email, email,
+                              key=normalize_email(email))
 
-            return query
+    def _get_by_email(self, session: Session, email: str):
+        return session.execute(
+            _USER_BY_EMAIL, {"email": normalize_email(email)}
+        ).scalars().first()
 
     def get_by_id(self, user_id: str):
         """"""
-        with self.session_factory() as session:
-            query = session.query(self.model).filter(
-                cast(self.model.id, Uuid) == cast(user_id, Uuid)).first()
-
-            return query
+        return self._run_read(self._get_by_id, user_id,
+                              key=as_uuid(user_id))
+
+    def _get_by_id(self, session: Session, user_id: str):
+        return session.execute(
+            _USER_BY_ID, {"user_id": as_uuid(user_id)}).scalars().first()
+
+    def get_login_user(self, email: str) -> Optional[LoginUser]:
+        """The columns sign-in needs, without hydrating the row"""
+        return self._run_read(self._get_login_user, email,
+                              key=normalize_email(email))
+
+    def _get_login_user(self, session: Session,
+                        email: str) -> Optional[LoginUser]:
+        row = session.execute(
+            _LOGIN_USER_BY_EMAIL, {"email": normalize_email(email)}).first()
+
+        return LoginUser(*row) if row is not None else None
+
+    def _get_auth_user(self, session: Session,
+                       user_id: str) -> Optional[AuthUser]:
+        if self.user_cache is not None:
+            cached = self.user_cache.get(user_id)
+
+            if cached is not None:
+                return cached
+
+        row = session.execute(
+            _AUTH_USER_BY_ID, {"user_id": as_uuid(user_id)}).first()
+
+        if row is None:
+            return None
+
+        user = AuthUser(*row)
+        self._cache_user(user)
+
+        return user
+
+    def search(self, term: str, field: str = "email",
+               match: str = "prefix", limit: int = 20) -> List[User]:
+        """Case-insensitive email or phone search.
+
+        ``prefix`` and ``exact`` are served by btree indexes, ``contains``
+        by the pg_trgm GIN indexes (see the users search migration).
+        """
+        return self._run_read(self._search, term, field, match, limit)
+
+    def _search(self, session: Session, term: str, field: str,
+                match: str, limit: int) -> List[User]:
+        if field == "phone_no":
+            column = self.model.phone_no
+            term = term.strip()
+        else:
+            # stored normalised, see normalize_email
+            column = self.model.email
+            term = normalize_email(term)
+
+        return session.execute(
+            select(self.model)
+            .where(match_expression(column, term, match))
+            .order_by(column, self.model.id)
+            .limit(limit)
+        ).scalars().all()
+
+    def export_rows(self, columns: Sequence[str] = USER_EXPORT_COLUMNS,
+                    batch_size: int = 1000) -> Iterator[Sequence[Row]]:
+        """Every user's ``columns`` in ``(created_at, id)`` order, in
+        batches of ``batch_size``; memory stays flat however many users
+        there are. Columns outside ``USER_EXPORT_COLUMNS`` are refused up
+        front, before anything is read."""
+        return self._stream(self._export_statement(columns, batch_size))
+
+    def _export_statement(self, columns: Sequence[str], batch_size: int):
+        if not columns:
+            raise RequestError(detail="No columns to export")
+
+        unknown = [name for name in columns
+                   if name not in USER_EXPORT_COLUMNS]
+
+        if unknown:
+            raise RequestError(
+                detail=f"Columns cannot be exported: {', '.join(unknown)}")
+
+        return (
+            select(*(getattr(self.model, name) for name in columns))
+            .order_by(self.model.created_at, self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
 
     def user_exists(self, email: str):
         """"""
-        user = self.get_by_email(email)
+        return self._run_read(self._user_exists, email,
+                              key=normalize_email(email))
+
+    def _user_exists(self, session: Session, email: str):
+        user = self._get_by_email(session, email)
 
         if user:
             return True
@@ -51,235 +247,420 @@ class UserRepository(BaseRepository):
 
     def create(self, schema: SignUp) -> User:
         """"""
-        with self.session_factory() as session:
-            user_2fa_type: Optional[AuthType] = None
-            user_enabled_2fa: bool = False
+        return self._run(self._create, schema)
 
-            otp_base32 = pyotp.random_base32()
+    def _create(self, session: Session, schema: SignUp) -> User:
+        user_2fa_type: Optional[AuthType] = None
+        user_enabled_2fa: bool = False
 
-            otp_auth_url = pyotp.totp.TOTP(otp_base32).provisioning_uri(
-                name=str(schema.email), issuer_name="2fa.com")
+        otp_base32, otp_auth_url = generate_otp_credentials(schema.email)
 
-            user = self.user_exists(schema.email)
+        auth_type = AuthType.Sms if schema.authentication_type is not None and schema.authentication_type.lower(
+        ) == 'sms' else AuthType.Authenticator
 
-            if user:
-                raise DuplicatedError(detail="Account exists!")
+        now = datetime.now()
 
-            auth_type = AuthType.Sms if schema.authentication_type is not None and schema.authentication_type.lower(
-            ) == 'sms' else AuthType.Authenticator
+        query = self.model(
+            id=uuid4(),
+            **schema.model_dump(),
+            otp_secret=otp_base32,
+            otp_auth_url=otp_auth_url,
+            is_2fa_enabled=True,
+            auth_2fa_type=auth_type,
+            created_at=now,
+            updated_at=now)
 
-            query = self.model(
-                id=uuid4(),
-                **schema.model_dump(),
-                otp_secret=otp_base32,
-                otp_auth_url=otp_auth_url,
-                is_2fa_enabled=True,
-                auth_2fa_type=auth_type)
+        try:
+            user = self._insert_new(session, query)
 
-            try:
-                session.add(query)
+            if user is not None:
+                session.expunge(user)
+
+            session.commit()
+        except IntegrityError:
+            raise DuplicatedError(detail="Account exists!")
+
+        if user is None:
+            raise DuplicatedError(detail="Account exists!")
+
+        self._written_user(user)
+
+        return user
+
+    def _insert_new(self, session: Session, user: User) -> Optional[User]:
+        """INSERT ... ON CONFLICT (lower(email)) DO NOTHING RETURNING *;
+        ``None`` means the email was already taken. Any other unique
+        violation still raises."""
+        dialect = session.get_bind().dialect.name
+
+        if dialect == "postgresql":
+            statement = postgresql.insert(self.model)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(self.model)
+        else:
+            # no portable ON CONFLICT: let the unique index reject it
+            session.add(user)
+            session.flush()
+
+            return user
 
-                session.commit()
+        values = {
+            column.key: getattr(user, column.key)
+            for column in self.model.__table__.columns
+            if getattr(user, column.key, None) is not None
+        }
 
-                session.refresh(query)
-            except IntegrityError as e:
-                raise DuplicatedError(detail=str(e.orig))
+        statement = statement.values(**values).on_conflict_do_nothing(
+            index_elements=[func.lower(self.model.email)])
 
-            return query
+        return session.execute(
+            statement.returning(self.model),
+            execution_options={"populate_existing": True},
+        ).scalars().first()
 
     def check_2fa_status(self, user_email: str) -> bool:
         """Get user's 2fa status"""
-        query = self.get_by_email(user_email)
+        return self._run_read(self._check_2fa_status, user_email,
+                              key=normalize_email(user_email))
+
+    def _check_2fa_status(self, session: Session, user_email: str) -> bool:
+        query = self._get_by_email(session, user_email)
 
         if not query or query is None:
             raise AuthError(detail="Unauthorized!")
 
         return query.is_2fa_enabled
 
-    def verify_otp(self, payload: OTPPayload):
-        """"""
-        with self.session_factory() as session:
-            query = session.query(self.model).filter(
-                cast(self.model.email, String) == cast(payload.email, String)).first()
+    def _transition(self, session: Session, transition: Transition,
+                    user_id, **expected) -> Optional[User]:
+        """Apply ``transition`` in one round trip and commit it"""
+        try:
+            user = transition.apply(
+                session, self.model, as_uuid(user_id), **expected)
+
+            if user is not None:
+                # keep the RETURNING values loaded past the commit
+                session.expunge(user)
 
-            if query is not None:
-                totp: Optional[pyotp.TOTP] = None
+            session.commit()
+        except IntegrityError as e:
+            raise DuplicatedError(detail=str(e.orig))
 
-                is_valid_otp: bool = False
+        self._cache_user(user)
+        self._written_user(user)
 
-                if query.otp_secret:
-                    totp = pyotp.TOTP(query.otp_secret)
+        return user
 
-                if totp is not None:
-                    is_valid_otp = totp.verify(payload.otp)
+    def _otp_state(self, session: Session, *criteria):
+        """The few columns needed to check a code, without hydrating the
+        full row"""
+        return session.execute(
+            select(self.model.id, self.model.otp_secret,
+                   self.model.auth_2fa_type).where(*criteria)
+        ).first()
 
-                if not is_valid_otp:
-                    raise AuthError(detail="Invalid OTP or login")
+    def _check_totp(self, state, otp: str) -> int:
+        """Verify ``otp`` against the user's secret and burn its time step,
+        so a captured code cannot be replayed"""
+        step = self.totp_verifier.verify(state.id, state.otp_secret, otp)
 
-                query.is_otp_verified = True
+        if step is None:
+            raise AuthError(detail="Invalid OTP or login")
 
-                try:
-                    session.commit()
+        if self.replay_store is not None and \
+                not self.replay_store.check_and_record(state.id, step):
+            raise AuthError(detail="OTP has already been used")
 
-                    session.refresh(query)
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+        return step
 
-                return query
+    def _check_sms_code(self, session: Session, state, otp: str) -> None:
+        if not self.sms_code_store.verify(session, state.id, otp):
+            raise AuthError(detail="Invalid OTP or login")
 
-            return query
+    def issue_sms_code(self, user_id: UUID) -> str:
+        """Create the user's SMS code, replacing any outstanding one"""
+        return self._run(self._issue_sms_code, user_id)
 
-    def verify_otp_user(self, otp: str, user_id: str) -> Optional[User]:
-        """"""
-        with self.session_factory() as session:
-            query = session.get(self.model, user_id)
+    def _issue_sms_code(self, session: Session, user_id: UUID) -> str:
+        return self.sms_code_store.issue(session, as_uuid(user_id))
 
-            if query is not None and query.auth_2fa_type and query.auth_2fa_type.lower() == 'sms':
-                query.is_2fa_setup = True
-                query.is_otp_verified = False
+    def create_session(self, user_id: UUID,
+                       device: Optional[str] = None) -> SessionState:
+        """Start a login session for one device"""
+        return self._run(self._create_session, user_id, device)
 
-                try:
-                    session.commit()
+    def _create_session(self, session: Session, user_id: UUID,
+                        device: Optional[str]) -> SessionState:
+        login = self.session_store.create(session, as_uuid(user_id), device)
+        # the user's next requests read the new session from the primary
+        self._written(login.user_id)
 
-                    session.refresh(query)
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+        return login
 
-                return query
+    def get_session_user(self, user_id: str,
+                         sid: Optional[str]) -> Optional[AuthUser]:
+        """The user behind an access token, with ``is_otp_verified`` taken
+        from the token's session.
 
-            if query is not None:
-                totp: Optional[pyotp.TOTP] = None
+        Runs on every authenticated request, so the session and user are
+        read from a replica when one is healthy; only a ``last_seen_at``
+        older than the touch interval is written, on the primary.
+        """
+        user, login = self._run_read(self._get_session_user, user_id, sid,
+                                     key=as_uuid(user_id))
 
-                is_valid_otp: bool = False
+        if login is not None and self.session_store.touch_due(login):
+            self._run(self.session_store.touch, login)
 
-                if query.otp_secret:
-                    totp = pyotp.TOTP(query.otp_secret)
+        return user
 
-                if totp is not None:
-                    is_valid_otp = totp.verify(otp)
+    def _get_session_user(self, session: Session, user_id: str,
+                          sid: Optional[str]
+                          ) -> Tuple[Optional[AuthUser],
+                                     Optional[SessionState]]:
+        if sid is None:
+            # tokens issued before sessions existed
+            return self._get_auth_user(session, user_id), None
 
-                if not is_valid_otp:
-                    raise AuthError(detail="Invalid OTP or login")
+        login = self._login_session(session, as_uuid(user_id), sid)
 
-                query.is_2fa_setup = True
-                query.is_otp_verified = True
+        if login is None:
+            raise AuthError(detail="Session expired or logged out")
 
-                try:
-                    session.commit()
+        return self._in_session(self._get_auth_user(session, user_id),
+                                login), login
 
-                    session.refresh(query)
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+    def _login_session(self, session: Session, user_id: Optional[UUID],
+                       sid: Optional[str]) -> Optional[SessionState]:
+        """The session ``sid`` if it belongs to ``user_id``; without a sid,
+        the user's most recent session"""
+        if sid is None:
+            return self.session_store.latest(session, user_id)
 
-                return query
+        login = self.session_store.get(session, as_uuid(sid))
 
-            return query
+        if login is None or login.user_id != user_id:
+            return None
 
-    def disable_2fa(self, user_id: UUID):
+        return login
+
+    def _in_session(self, user, login: SessionState):
+        """``user`` as seen from ``login``, as a detached copy: the flag
+        belongs to the login session, and setting it on a row of the
+        request's session would flush it into ``users.is_otp_verified``"""
+        if user is None:
+            return None
+
+        if not isinstance(user, AuthUser):
+            user = AuthUser.from_user(user)
+
+        return user._replace(is_otp_verified=login.is_otp_verified)
+
+    def _verify_session(self, session: Session, user_id: UUID,
+                        sid: Optional[str]) -> SessionState:
+        login = self._login_session(session, user_id, sid)
+
+        if login is None or \
+                not self.session_store.mark_verified(session, login.id):
+            raise AuthError(detail="Session expired, please sign in again")
+
+        login.is_otp_verified = True
+        self._written(login.user_id)
+
+        return login
+
+    def verify_otp(self, payload: OTPPayload, sid: Optional[str] = None):
         """"""
-        with self.session_factory() as session:
-            user = session.get(self.model, user_id)
+        return self._run(self._verify_otp, payload, sid)
+
+    def _verify_otp(self, session: Session, payload: OTPPayload,
+                    sid: Optional[str] = None):
+        state = self._otp_state(
+            session,
+            func.lower(self.model.email) == normalize_email(payload.email))
+
+        if state is None:
+            return None
 
-            if user is None or not user:
-                raise AuthError(detail="Invalid user")
+        if _uses_sms(state):
+            self._check_sms_code(session, state, payload.otp)
+        else:
+            self._check_totp(state, payload.otp)
 
-            if user.id != user_id:
-                raise AuthError(detail="Invalid user")
+        login = self._verify_session(session, state.id, sid)
 
-            # query_model = self.model(**schema.model_dump(),
-            #                          is_2fa_enabled=schema.enable_2fa)
+        return self._in_session(self._get_by_id(session, state.id), login)
 
-            # for k, v in query_model.model_dump().items():
-            #     if k not in ['id', 'created_at', 'updated_at']:
-            #         if k == 'is_2fa_enabled' and v is False:
-            #             user.otp_auth_url = None
-            #             user.otp_secret = None
-            #             user.auth_2fa_type = None
-            #             setattr(user, k, v)
+    def verify_otp_batch(self, items: Sequence[OTPPayload]
+                         ) -> List[OTPBatchResult]:
+        """``verify_otp`` for many items, each against its user's latest
+        session, in one query for the users, one for their sessions and one
+        UPDATE marking them verified. An item that fails is reported in its
+        result and does not stop the others."""
+        return self._run(self._verify_otp_batch, items)
 
-            user.otp_auth_url = None
-            user.otp_secret = None
-            user.auth_2fa_type = None
-            user.is_2fa_enabled = False
+    def _verify_otp_batch(self, session: Session,
+                          items: Sequence[OTPPayload]
+                          ) -> List[OTPBatchResult]:
+        emails = [normalize_email(item.email) for item in items]
+        states = {
+            state.email: state for state in session.execute(
+                _OTP_STATES_BY_EMAIL, {"emails": list(set(emails))})
+        }
+
+        results: List[Optional[OTPBatchResult]] = [None] * len(items)
+        checked = {}
+
+        for index, (item, email) in enumerate(zip(items, emails)):
+            state = states.get(email)
 
             try:
-                session.commit()
-            except:
-                raise RequestError(detail="An error has occured")
+                if state is None:
+                    raise AuthError(detail="Invalid OTP or login")
 
-            return self.get_by_id(str(user.id))
+                if _uses_sms(state):
+                    self._check_sms_code(session, state, item.otp)
+                else:
+                    self._check_totp(state, item.otp)
+            except HTTPException as e:
+                results[index] = _batch_result(item, e)
+                continue
 
-    def setup_2fa(self, user_id: UUID):
+            checked[index] = state
+
+        logins = self.session_store.latest_many(
+            session, {state.id for state in checked.values()})
+        verified = self.session_store.mark_verified_many(
+            session, {login.id for login in logins.values()})
+        self._written(*(login.user_id for login in logins.values()
+                        if login.id in verified))
+
+        for index, state in checked.items():
+            login = logins.get(state.id)
+
+            if login is None or login.id not in verified:
+                results[index] = _batch_result(items[index], AuthError(
+                    detail="Session expired, please sign in again"))
+            else:
+                results[index] = _batch_result(items[index])
+
+        return results
+
+    def verify_otp_user(self, otp: str, user_id: str,
+                        sid: Optional[str] = None) -> Optional[User]:
         """"""
-        with self.session_factory() as session:
-            user = session.get(self.model, user_id)
+        return self._run(self._verify_otp_user, otp, user_id, sid)
 
-            if user is None or not user:
-                raise AuthError(detail="Invalid user")
+    def _verify_otp_user(self, session: Session, otp: str, user_id: str,
+                         sid: Optional[str] = None) -> Optional[User]:
+        state = self._otp_state(session, self.model.id == as_uuid(user_id))
 
-            if user.id != user_id:
-                raise AuthError(detail="Invalid user")
+        if state is None:
+            return None
 
-            user.is_2fa_setup = True
+        if _uses_sms(state):
+            self._check_sms_code(session, state, otp)
 
-            try:
-                session.commit()
+            user = self._transition(session, SMS_SETUP, state.id)
 
-                session.refresh(user)
-            except:
-                raise RequestError(detail="An error has occured")
+            if user is None:
+                raise ConflictError(detail="2fa type changed, try again")
 
-            return self.get_by_id(str(user.id))
+            login = self._login_session(session, state.id, sid)
 
-    def otp_is_verified(self, user_id: str):
-        with self.session_factory() as session:
-            query = session.query(self.model).filter(
-                cast(self.model.id, Uuid) == cast(user_id, Uuid)).first()
+            return self._in_session(user, login) if login is not None \
+                else user
 
-            if query is not None:
-                query.is_2fa_setup = True
+        self._check_totp(state, otp)
 
-                try:
-                    session.commit()
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+        user = self._transition(session, OTP_SETUP_VERIFIED, state.id,
+                                otp_secret=state.otp_secret)
 
-            return query
+        if user is None:
+            raise AuthError(detail="Invalid OTP or login")
 
-    def update_2fa_user(self, authentication_type: str, user_id: str):
+        return self._in_session(
+            user, self._verify_session(session, state.id, sid))
+
+    def disable_2fa(self, user_id: UUID):
         """"""
-        with self.session_factory() as session:
-            query = session.get(self.model, user_id)
+        return self._run(self._disable_2fa, user_id)
 
-            if query:
-                if authentication_type == 'SMS':
-                    query.auth_2fa_type = AuthType.Sms
-                else:
-                    query.auth_2fa_type = AuthType.Authenticator
-                try:
-                    session.commit()
+    def _disable_2fa(self, session: Session, user_id: UUID):
+        try:
+            user = self._transition(session, DISABLE_2FA, user_id)
+        except DuplicatedError:
+            raise RequestError(detail="An error has occured")
+
+        self.totp_verifier.forget(as_uuid(user_id))
+
+        if user is None:
+            # already disabled is not an error, a missing user is
+            user = self._get_by_id(session, str(user_id))
+
+        if user is None:
+            raise AuthError(detail="Invalid user")
+
+        return user
+
+    def setup_2fa(self, user_id: UUID):
+        """"""
+        return self._run(self._setup_2fa, user_id)
+
+    def _setup_2fa(self, session: Session, user_id: UUID):
+        try:
+            user = self._transition(session, SETUP_2FA, user_id)
+        except DuplicatedError:
+            raise RequestError(detail="An error has occured")
+
+        if user is None:
+            raise AuthError(detail="Invalid user")
 
-                    session.refresh(query)
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+        return user
 
-            return query
+    def otp_is_verified(self, user_id: str):
+        return self._run(self._otp_is_verified, user_id)
+
+    def _otp_is_verified(self, session: Session, user_id: str):
+        return self._transition(session, SETUP_2FA, user_id)
 
-    def logout(self, user_id: str):
+    def update_2fa_user(self, authentication_type: str, user_id: str):
         """"""
-        with self.session_factory() as session:
-            query = session.get(self.model, user_id)
+        return self._run(self._update_2fa_user, authentication_type, user_id)
 
-            if query:
-                query.is_otp_verified = False
+    def _update_2fa_user(self, session: Session, authentication_type: str,
+                         user_id: str):
+        if authentication_type == 'SMS':
+            transition = USE_SMS
+        else:
+            transition = USE_AUTHENTICATOR
 
-                try:
-                    session.commit()
+        return self._transition(session, transition, user_id)
 
-                    session.refresh(query)
-                except IntegrityError as e:
-                    raise DuplicatedError(detail=str(e.orig))
+    def logout(self, user_id: str, sid: Optional[str] = None):
+        """End one session; other devices stay signed in"""
+        return self._run(self._logout, user_id, sid)
+
+    def _logout(self, session: Session, user_id: str,
+                sid: Optional[str] = None) -> bool:
+        if sid is None:
+            return False
 
-                return True
+        login = self._login_session(session, as_uuid(user_id), sid)
 
+        if login is None:
             return False
+
+        self._written(login.user_id)
+
+        return self.session_store.revoke(session, login.id)
+
+
+def _batch_result(item: OTPPayload,
+                  error: Optional[HTTPException] = None) -> OTPBatchResult:
+    if error is None:
+        return OTPBatchResult(email=item.email, verified=True,
+                              status_code=status.HTTP_200_OK)
+
+    return OTPBatchResult(email=item.email, verified=False,
+                          status_code=error.status_code, detail=error.detail)
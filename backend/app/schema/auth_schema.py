@@ -5,11 +5,12 @@
 
 from datetime import datetime
 import re
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel, EmailStr, Field, field_validator
+from app.core.config import configs
 from app.schema.user_schema import User
-from app.util.util import check_password_strength
+from app.util.util import check_password_strength, normalize_email
 
 
 class SignUpValueError(ValueError):
@@ -40,6 +41,7 @@ class SignUp(BaseModel):
     def check_email(cls, value):
         # use a regex to check that the email has a valid format
         email_regex = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
+        value = normalize_email(value)
         if not re.match(email_regex, value):
             raise SignUpValueError('Invalid email address')
         return value
@@ -76,6 +78,8 @@ class Payload(BaseModel):
     id: str
     email: str
     name: str
+    # login session; absent from tokens issued before sessions existed
+    sid: Optional[str] = None
 
 
 class SignInResponse2Fa(BaseModel):
@@ -105,3 +109,60 @@ class OTPPayload(BaseModel):
     email: str
     # password: str
     otp: str
+
+
+class IntrospectionResponse(BaseModel):
+    """RFC 7662 answer; an inactive token gets ``active`` alone"""
+    active: bool
+    token_type: Optional[str] = None
+    # user id
+    sub: Optional[str] = None
+    username: Optional[str] = None
+    name: Optional[str] = None
+    exp: Optional[int] = None
+    # login session
+    sid: Optional[str] = None
+    # only when the user's state was checked
+    is_otp_verified: Optional[bool] = None
+
+
+class IntrospectionBatchPayload(BaseModel):
+    tokens: List[str] = Field(
+        min_length=1, max_length=configs.INTROSPECTION_BATCH_MAX_TOKENS)
+    # also require a live session and an active user
+    check_user: bool = False
+    # also require the OTP verified when the user has 2FA enabled
+    require_otp_verified: bool = False
+
+
+class IntrospectionBatchResponse(BaseModel):
+    # in the order of the request's tokens
+    results: List[IntrospectionResponse]
+
+
+class OTPBatchPayload(BaseModel):
+    items: List[OTPPayload] = Field(
+        min_length=1, max_length=configs.OTP_BATCH_MAX_ITEMS)
+
+    # one guess per account and batch, as a single request gets
+    @field_validator("items")
+    def check_unique_emails(cls, value):
+        emails = [normalize_email(item.email) for item in value]
+
+        if len(set(emails)) != len(emails):
+            raise ValueError("An email can appear only once per batch")
+
+        return value
+
+
+class OTPBatchResult(BaseModel):
+    email: str
+    verified: bool
+    # what POST /auth/otp/verify would have answered for this item alone
+    status_code: int
+    detail: Optional[str] = None
+
+
+class OTPBatchResponse(BaseModel):
+    # in the order of the request's items
+    results: List[OTPBatchResult]
@@ -4,8 +4,9 @@
 
 
 from datetime import datetime
+from typing import List, Literal, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ModelBaseInfo(BaseModel):
@@ -15,3 +16,27 @@ class ModelBaseInfo(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class FindBase(BaseModel):
+    # opaque position returned as ``next_cursor`` by the previous page
+    cursor: Optional[str] = None
+    page_size: int = Field(default=20, ge=1, le=100)
+    newest_first: bool = True
+    # "estimate" reads planner statistics instead of running COUNT(*)
+    count: Literal["none", "estimate", "exact"] = "none"
+    # how string filters match; "contains" relies on trigram indexes
+    match: Literal["prefix", "contains", "exact"] = "prefix"
+
+
+class SearchOptions(BaseModel):
+    page_size: int
+    newest_first: bool
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
+    total_count_is_estimate: bool = False
+
+
+class FindResult(BaseModel):
+    founds: Optional[List] = None
+    search_options: Optional[SearchOptions] = None
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# File: responses.py
+"""Response Adapters"""
+
+
+from typing import Optional, Union
+
+from app.schema.auth_schema import IntrospectionBatchResponse, \
+    IntrospectionResponse, OTPBatchResponse, SignInResponse, \
+    SignInResponse2Fa
+from app.schema.user_schema import CurrentUser, User
+from app.util.responses import ResponseAdapter
+
+
+user_response = ResponseAdapter(User)
+
+current_user_response = ResponseAdapter(CurrentUser)
+
+sign_in_response = ResponseAdapter(Union[SignInResponse, SignInResponse2Fa])
+
+otp_verify_response = ResponseAdapter(Optional[User])
+
+otp_batch_response = ResponseAdapter(OTPBatchResponse)
+
+introspection_response = ResponseAdapter(IntrospectionResponse,
+                                         exclude_none=True)
+
+introspection_batch_response = ResponseAdapter(IntrospectionBatchResponse,
+                                               exclude_none=True)
@@ -3,10 +3,21 @@
 """User Schema"""
 
 
-from typing import Optional
-from pydantic import BaseModel
-from app.schema.base_schema import ModelBaseInfo
+from datetime import datetime
+from typing import List, Literal, Optional, Tuple
+from pydantic import BaseModel, Field, field_validator
+from app.schema.base_schema import FindBase, FindResult, ModelBaseInfo
 from app.util.schema import AllOptional
+from app.util.util import normalize_email
+
+
+# what an export may contain; password, otp_secret and otp_auth_url (which
+# embeds the secret) are deliberately absent
+USER_EXPORT_COLUMNS = (
+    "id", "created_at", "updated_at", "first_name", "last_name", "email",
+    "phone_no", "is_active", "is_2fa_enabled", "is_2fa_setup",
+    "auth_2fa_type",
+)
 
 
 class BaseUser(BaseModel):
@@ -31,11 +42,17 @@ class User(ModelBaseInfo, BaseUser, AllOptional):
     is_2fa_setup: Optional[bool]
     is_otp_verified: Optional[bool]
     auth_2fa_type: Optional[str]
-    otp_secret: Optional[str]
-    otp_auth_url: Optional[str]
+    # left out of the projections the auth paths load
+    otp_secret: Optional[str] = None
+    otp_auth_url: Optional[str] = None
     ...
 
 
+class CurrentUser(User):
+    """What /user returns about the signed-in user"""
+    is_active: Optional[bool] = None
+
+
 class UserOTPPayload(BaseModel):
     # email: str
     otp: str
@@ -47,9 +64,54 @@ class User2FaUpdate(BaseModel):
 class UserOTPResponse(BaseModel):
     otp_verified: bool
 
-class FindUser(BaseModel):
-    email: str
-    ...
+class UserListItem(ModelBaseInfo, BaseUser):
+    """What admin listings show: no secrets"""
+    is_active: Optional[bool] = None
+    is_2fa_enabled: Optional[bool] = None
+    is_2fa_setup: Optional[bool] = None
+    auth_2fa_type: Optional[str] = None
+
+
+class FindUser(FindBase):
+    email: Optional[str] = None
+    phone_no: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_2fa_enabled: Optional[bool] = None
+    created_at__gte: Optional[datetime] = None
+    created_at__lt: Optional[datetime] = None
+
+    # emails are stored normalised, so matching the input's normal form is
+    # case-insensitive and still uses the plain column indexes
+    @field_validator("email")
+    def check_email(cls, value):
+        return normalize_email(value) if value is not None else value
+
+
+class UserSearch(BaseModel):
+    q: str = Field(min_length=1, max_length=255)
+    field: Literal["email", "phone_no"] = "email"
+    match: Literal["prefix", "contains", "exact"] = "prefix"
+    limit: int = Field(default=20, ge=1, le=100)
+
+
+class UserExport(BaseModel):
+    format: Literal["ndjson", "csv"] = "ndjson"
+    # comma separated, in output order, from USER_EXPORT_COLUMNS; all of
+    # them by default
+    columns: Optional[str] = None
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        if self.columns is None:
+            return USER_EXPORT_COLUMNS
+
+        return tuple(dict.fromkeys(
+            name.strip() for name in self.columns.split(",")
+            if name.strip()))
+
+
+class FindUserResult(FindResult):
+    founds: Optional[List[UserListItem]] = None
 
 
 class FindUserByEmail(BaseModel):
@@ -1,2 +1,4 @@
 from app.services.user_service import UserService
 from app.services.auth_service import AuthService
+from app.services.async_user_service import AsyncUserService
+from app.services.async_auth_service import AsyncAuthService
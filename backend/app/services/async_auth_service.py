@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# File: async_auth_service.py
+"""Async Auth Service"""
+
+
+from typing import Optional
+from app.core.exceptions import AuthError
+from app.core.hashing import PasswordHasher
+from app.repository.async_user_repository import AsyncUserRepository
+from app.schema.auth_schema import IntrospectionBatchPayload, \
+    IntrospectionBatchResponse, IntrospectionResponse, OTPBatchPayload, \
+    OTPBatchResponse, OTPPayload, SignIn, SignUp
+from app.schema.user_schema import User
+from app.model.user_records import LoginUser
+from app.services.auth_service import INACTIVE, AuthService
+
+
+class AsyncAuthService(AuthService):
+    def __init__(self, user_repository: AsyncUserRepository,
+                 password_hasher: PasswordHasher):
+        super().__init__(user_repository, password_hasher)
+
+    async def sign_up(self, user_info: SignUp) -> User:
+        user_info.password = await self.password_hasher.ahash(
+            user_info.password)
+
+        created_user = await self.user_repository.create(user_info)
+
+        delattr(created_user, "password")
+
+        return User(**created_user.model_dump())
+
+    async def sign_in(self, user_info: SignIn, device: Optional[str] = None):
+        user: Optional[LoginUser] = \
+            await self.user_repository.get_login_user(user_info.email)
+
+        if not user:
+            raise AuthError(detail="Incorrect email or password")
+
+        if not user.is_active:
+            raise AuthError(detail="Account is not active")
+
+        if not await self.password_hasher.averify(
+                user_info.password, user.password):
+            raise AuthError(detail="Incorrect email or password")
+
+        login = await self.user_repository.create_session(user.id, device)
+
+        return self._sign_in_response(user, login)
+
+    async def otp_verification(self, payload: OTPPayload,
+                               sid: Optional[str] = None):
+        return await self.user_repository.verify_otp(payload, sid)
+
+    async def otp_batch_verification(self, payload: OTPBatchPayload
+                                     ) -> OTPBatchResponse:
+        results = await self.user_repository.verify_otp_batch(payload.items)
+
+        return OTPBatchResponse(results=results)
+
+    async def introspect(self, token: str, check_user: bool = False,
+                         require_otp_verified: bool = False
+                         ) -> IntrospectionResponse:
+        claims = self._token_claims(token)
+
+        if claims is None:
+            return INACTIVE
+
+        if not (check_user or require_otp_verified):
+            return self._introspection(*claims)
+
+        if claims[0].sid is None:
+            # no session to check it against
+            return INACTIVE
+
+        try:
+            user = await self.user_repository.get_session_user(
+                claims[0].id, claims[0].sid)
+        except AuthError:
+            return INACTIVE
+
+        if user is None:
+            return INACTIVE
+
+        return self._introspection(*claims, user, require_otp_verified)
+
+    async def introspect_batch(self, payload: IntrospectionBatchPayload
+                               ) -> IntrospectionBatchResponse:
+        return IntrospectionBatchResponse(results=[
+            await self.introspect(token, payload.check_user,
+                                  payload.require_otp_verified)
+            for token in payload.tokens
+        ])
+
+    async def logout(self, user_id: str, sid: Optional[str] = None):
+        return await self.user_repository.logout(user_id, sid)
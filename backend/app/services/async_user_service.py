@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# File: async_user_service.py
+"""Async User Service"""
+
+
+from typing import AsyncIterator, Optional
+from uuid import UUID
+from app.core.config import configs
+from app.model.user_records import AuthUser
+from app.repository.async_user_repository import AsyncUserRepository
+from app.schema.user_schema import UserExport, UserSearch
+from app.services.user_service import UserService
+from app.util.export import astream_export
+from app.util.qr import QRCodeRenderer
+from app.util.sms import SMSDispatcher
+
+
+class AsyncUserService(UserService):
+    def __init__(self, user_repository: AsyncUserRepository,
+                 sms_dispatcher: Optional[SMSDispatcher] = None,
+                 qr_renderer: Optional[QRCodeRenderer] = None) -> None:
+        super().__init__(user_repository, sms_dispatcher, qr_renderer)
+
+    async def get_list(self, schema):
+        return await self.user_repository.read_by_options(schema)
+
+    async def search_users(self, search: UserSearch):
+        return await self.user_repository.search(
+            search.q, search.field, search.match, search.limit)
+
+    def export_users(self, export: UserExport) -> AsyncIterator[bytes]:
+        columns = export.column_names
+        batches = self.user_repository.export_rows(
+            columns, configs.EXPORT_BATCH_SIZE)
+
+        return astream_export(batches, columns, export.format)
+
+    async def get_by_id(self, id: str):
+        return await self.user_repository.read_by_id(UUID(id))
+
+    async def get_session_user(self, user_id: str, sid: Optional[str]):
+        return await self.user_repository.get_session_user(user_id, sid)
+
+    async def disable_user_2fa(self, user_id: UUID):
+        return await self.user_repository.disable_2fa(user_id)
+
+    async def setup_user_2fa(self, user_id: UUID):
+        return await self.user_repository.setup_2fa(user_id)
+
+    async def verify_user_otp(self, otp: str, user_id: str,
+                              sid: Optional[str] = None):
+        """"""
+        return await self.user_repository.verify_otp_user(
+            otp, user_id, sid)
+
+    async def update_user_2fa(self, authentication_type: str, user_id: str):
+        """"""
+        return await self.user_repository.update_2fa_user(
+            authentication_type, user_id)
+
+    async def send_sms_otp(self, user: AuthUser) -> dict:
+        self._check_sms_user(user)
+
+        code = await self.user_repository.issue_sms_code(user.id)
+
+        return self._send_sms_code(user, code)
@@ -3,37 +3,51 @@
 """Auth Service"""
 
 
+import time
 from datetime import timedelta
-from typing import Optional
+from typing import List, Optional, Tuple
+import pydantic
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import configs
 from app.core.exceptions import AuthError, RequestError, RestrictedError, ValidationError
-from app.core.security import create_access_token, get_password_hash, \
-    verify_password
+from app.core.hashing import PasswordHasher
+from app.core.security import create_access_token, decode_jwt
+from app.core.sessions import SessionState
 from app.repository.user_repository import UserRepository
-from app.schema.auth_schema import OTPPayload, OTPResponse, Payload, SignIn, SignInResponse, SignInResponse2Fa, SignUp
+from app.schema.auth_schema import IntrospectionBatchPayload, IntrospectionBatchResponse, IntrospectionResponse, OTPBatchPayload, OTPBatchResponse, OTPPayload, OTPResponse, Payload, SignIn, SignInResponse, SignInResponse2Fa, SignUp
 from app.schema.user_schema import User
-from app.model.user import User as UserModel
+from app.model.user_records import AuthUser, LoginUser
 from app.services.base_service import BaseService
 from app.util.util import check_password_strength
 
 
+INACTIVE = IntrospectionResponse(active=False)
+
+
 class AuthService(BaseService):
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository,
+                 password_hasher: PasswordHasher):
         self.user_repository = user_repository
+        self.password_hasher = password_hasher
         super().__init__(user_repository)
 
-    def sign_up(self, user_info: SignUp) -> User:
-        user_info.password = get_password_hash(user_info.password)
+    # sign-up and sign-in are coroutines even on the sync stack: bcrypt runs
+    # on the hasher's pool without holding a request thread, and only the
+    # repository calls go to the threadpool
+    async def sign_up(self, user_info: SignUp) -> User:
+        user_info.password = await self.password_hasher.ahash(
+            user_info.password)
 
-        created_user = self.user_repository.create(user_info)
+        created_user = await run_in_threadpool(
+            self.user_repository.create, user_info)
 
         delattr(created_user, "password")
 
         return User(**created_user.model_dump())
 
-    def sign_in(self, user_info: SignIn):
-        user: Optional[UserModel] = self.user_repository.get_by_email(
-            user_info.email)
+    async def sign_in(self, user_info: SignIn, device: Optional[str] = None):
+        user: Optional[LoginUser] = await run_in_threadpool(
+            self.user_repository.get_login_user, user_info.email)
 
         if not user:
             raise AuthError(detail="Incorrect email or password")
@@ -41,15 +55,25 @@ class AuthService(BaseService):
         if not user.is_active:
             raise AuthError(detail="Account is not active")
 
-        if not verify_password(user_info.password, user.password):
+        if not await self.password_hasher.averify(user_info.password,
+                                                  user.password):
             raise AuthError(detail="Incorrect email or password")
 
-        delattr(user, "password")
+        login = await run_in_threadpool(
+            self.user_repository.create_session, user.id, device)
+
+        return self._sign_in_response(user, login)
+
+    def _sign_in_response(self, user: LoginUser,
+                          login: SessionState) -> SignInResponse:
+        user_info = user._asdict()
+        del user_info["password"]
 
         payload = Payload(
             id=str(user.id),
             email=user.email,
             name=user.first_name + " " + user.last_name,
+            sid=str(login.id),
         )
 
         token_lifespan = timedelta(
@@ -61,15 +85,116 @@ class AuthService(BaseService):
         sign_in_result = {
             "access_token": access_token,
             "expiration": expiration_datetime,
-            "user_info": user,
+            "user_info": User(**user_info,
+                              is_otp_verified=login.is_otp_verified),
         }
 
         return SignInResponse(**sign_in_result)
 
-    def otp_verification(self, payload: OTPPayload):
-        user = self.user_repository.verify_otp(payload)
+    def otp_verification(self, payload: OTPPayload,
+                         sid: Optional[str] = None):
+        user = self.user_repository.verify_otp(payload, sid)
 
         return user
 
-    def logout(self, user_id: str):
-        return self.user_repository.logout(user_id)
+    def otp_batch_verification(self, payload: OTPBatchPayload
+                               ) -> OTPBatchResponse:
+        results = self.user_repository.verify_otp_batch(payload.items)
+
+        return OTPBatchResponse(results=results)
+
+    def introspect(self, token: str, check_user: bool = False,
+                   require_otp_verified: bool = False
+                   ) -> IntrospectionResponse:
+        """RFC 7662 introspection of an access token.
+
+        The signature and expiry are checked through the verified-token
+        cache, so a token seen before costs no crypto and no query. The
+        session and user rows are only read when ``check_user`` or
+        ``require_otp_verified`` asks for them; a token without a session
+        id is then inactive, as there is no session to check.
+        """
+        claims = self._token_claims(token)
+
+        if claims is None:
+            return INACTIVE
+
+        if not (check_user or require_otp_verified):
+            return self._introspection(*claims)
+
+        if claims[0].sid is None:
+            # no session to check it against
+            return INACTIVE
+
+        try:
+            user = self.user_repository.get_session_user(
+                claims[0].id, claims[0].sid)
+        except AuthError:
+            # the session expired or was logged out
+            return INACTIVE
+
+        if user is None:
+            return INACTIVE
+
+        return self._introspection(*claims, user, require_otp_verified)
+
+    def introspect_batch(self, payload: IntrospectionBatchPayload
+                         ) -> IntrospectionBatchResponse:
+        return IntrospectionBatchResponse(results=[
+            self.introspect(token, payload.check_user,
+                            payload.require_otp_verified)
+            for token in payload.tokens
+        ])
+
+    @staticmethod
+    def introspection_max_age(results: List[IntrospectionResponse],
+                              checked_user: bool) -> int:
+        """Seconds callers may reuse ``results``: until the earliest
+        ``exp``, capped when user state was checked, and not at all once
+        any token is inactive"""
+        if not all(result.active for result in results):
+            return 0
+
+        max_age = min(result.exp for result in results) - int(time.time())
+
+        if checked_user:
+            max_age = min(max_age, configs.INTROSPECTION_USER_CHECK_MAX_AGE)
+
+        return max(0, max_age)
+
+    def logout(self, user_id: str, sid: Optional[str] = None):
+        return self.user_repository.logout(user_id, sid)
+
+    @staticmethod
+    def _token_claims(token: str) -> Optional[Tuple[Payload, int]]:
+        """The verified payload of ``token`` and its ``exp``"""
+        claims = decode_jwt(token)
+
+        if not claims:
+            return None
+
+        try:
+            return Payload(**claims), int(claims["exp"])
+        except (pydantic.ValidationError, KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _introspection(payload: Payload, exp: int,
+                       user: Optional[AuthUser] = None,
+                       require_otp_verified: bool = False
+                       ) -> IntrospectionResponse:
+        checked = user is not None
+
+        if checked and not user.is_active:
+            return INACTIVE
+
+        if require_otp_verified and \
+                user.is_2fa_enabled and not user.is_otp_verified:
+            return INACTIVE
+
+        return IntrospectionResponse(
+            active=True, token_type="Bearer", sub=payload.id,
+            username=payload.email, name=payload.name, exp=exp,
+            sid=payload.sid,
+            is_otp_verified=user.is_otp_verified if checked else None)
+
@@ -3,14 +3,28 @@
 """User Service"""
 
 
+from typing import Iterator, Optional, Tuple
 from uuid import UUID
+from app.core.config import configs
+from app.core.exceptions import NotFoundError, RequestError, \
+    ServiceUnavailableError
+from app.model.user import AuthType
+from app.model.user_records import AuthUser
 from app.repository.user_repository import UserRepository
+from app.schema.user_schema import UserExport, UserSearch
 from app.services.base_service import BaseService
+from app.util.export import stream_export
+from app.util.qr import QRCodeRenderer
+from app.util.sms import SMSDispatcher
 
 
 class UserService(BaseService):
-    def __init__(self, user_repository: UserRepository) -> None:
+    def __init__(self, user_repository: UserRepository,
+                 sms_dispatcher: Optional[SMSDispatcher] = None,
+                 qr_renderer: Optional[QRCodeRenderer] = None) -> None:
         self.user_repository = user_repository
+        self.sms_dispatcher = sms_dispatcher
+        self.qr_renderer = qr_renderer or QRCodeRenderer()
         super().__init__(user_repository)
 
     def add(self, schema):
@@ -19,16 +33,66 @@ class UserService(BaseService):
 
         return user
 
+    def get_session_user(self, user_id: str, sid: Optional[str]):
+        return self.user_repository.get_session_user(user_id, sid)
+
+    def search_users(self, search: UserSearch):
+        return self.user_repository.search(
+            search.q, search.field, search.match, search.limit)
+
+    def export_users(self, export: UserExport) -> Iterator[bytes]:
+        """Encoded chunks of the export; columns are checked before the
+        first one is produced"""
+        columns = export.column_names
+        batches = self.user_repository.export_rows(
+            columns, configs.EXPORT_BATCH_SIZE)
+
+        return stream_export(batches, columns, export.format)
+
     def disable_user_2fa(self, user_id: UUID):
         return self.user_repository.disable_2fa(user_id)
 
     def setup_user_2fa(self, user_id: UUID):
         return self.user_repository.setup_2fa(user_id)
     
-    def verify_user_otp(self, otp: str, user_id: str):
+    def verify_user_otp(self, otp: str, user_id: str,
+                        sid: Optional[str] = None):
         """"""
-        return self.user_repository.verify_otp_user(otp, user_id)
+        return self.user_repository.verify_otp_user(otp, user_id, sid)
     
     def update_user_2fa(self, authentication_type: str, user_id: str):
         """"""
         return self.user_repository.update_2fa_user(authentication_type, user_id)
+
+    def otp_qr_code(self, user: AuthUser, fmt: str) -> Tuple[bytes, str]:
+        """The user's provisioning QR code and its ETag"""
+        if not user.otp_auth_url:
+            raise NotFoundError(detail="2fa is not enabled for this user")
+
+        return self.qr_renderer.render(user.otp_auth_url, fmt)
+
+    def otp_qr_etag(self, user: AuthUser, fmt: str) -> Optional[str]:
+        if not user.otp_auth_url:
+            return None
+
+        return self.qr_renderer.etag(user.otp_auth_url, fmt)
+
+    def send_sms_otp(self, user: AuthUser) -> dict:
+        """Issue a code for an SMS 2fa user and queue it; returns at once"""
+        self._check_sms_user(user)
+
+        code = self.user_repository.issue_sms_code(user.id)
+
+        return self._send_sms_code(user, code)
+
+    def _check_sms_user(self, user: AuthUser) -> None:
+        if user.auth_2fa_type != AuthType.Sms or not user.phone_no:
+            raise RequestError(detail="SMS 2fa is not set up for this user")
+
+    def _send_sms_code(self, user: AuthUser, code: str) -> dict:
+        if self.sms_dispatcher is None or not self.sms_dispatcher.enqueue(
+                user.phone_no, f"Your verification code is {code}"):
+            raise ServiceUnavailableError(
+                detail="Could not send the code, please try again")
+
+        return {"sent": True}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# File: export.py
+"""Row export encoding"""
+
+
+import csv
+import enum
+import io
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, \
+    Sequence
+
+import orjson
+
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_header(columns: Sequence[str], fmt: str) -> bytes:
+    if fmt == "csv":
+        return _csv_rows([list(columns)])
+
+    return b""
+
+
+def encode_rows(rows: Sequence[Sequence], columns: Sequence[str],
+                fmt: str) -> bytes:
+    """One chunk of output for a batch of rows"""
+    if fmt == "csv":
+        return _csv_rows([[_csv_value(value) for value in row]
+                          for row in rows])
+
+    return b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n"
+                    for row in rows)
+
+
+def stream_export(batches: Iterable[Sequence[Sequence]],
+                  columns: Sequence[str], fmt: str) -> Iterator[bytes]:
+    """Encode batches as they arrive, one chunk per batch"""
+    header = encode_header(columns, fmt)
+
+    if header:
+        yield header
+
+    for rows in batches:
+        yield encode_rows(rows, columns, fmt)
+
+
+async def astream_export(batches: AsyncIterable[Sequence[Sequence]],
+                         columns: Sequence[str],
+                         fmt: str) -> AsyncIterator[bytes]:
+    header = encode_header(columns, fmt)
+
+    if header:
+        yield header
+
+    async for rows in batches:
+        yield encode_rows(rows, columns, fmt)
+
+
+def _csv_rows(rows) -> bytes:
+    buffer = io.StringIO()
+
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+
+    return buffer.getvalue().encode()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
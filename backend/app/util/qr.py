@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# File: qr.py
+"""QR code rendering"""
+
+
+import hashlib
+import io
+import time
+from typing import Tuple
+
+from app.core.metrics import metrics
+from app.util.cache import LRUCache
+
+try:
+    import segno
+except ImportError:  # pragma: no cover - optional dependency
+    segno = None
+
+
+class QRCodeRenderer:
+    """Renders provisioning URIs to SVG or PNG.
+
+    Output is content addressed: the ETag is a digest of the format,
+    rendering options and URI, so it is known before anything is encoded,
+    and the rendered bytes are kept in a bounded LRU under the same key.
+    """
+
+    MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+    def __init__(self, cache_size: int = 1024, scale: int = 5,
+                 border: int = 4) -> None:
+        self.scale = scale
+        self.border = border
+
+        self._images = LRUCache(maxsize=cache_size)
+
+        metrics.gauge("qr.cache_hits", lambda: self._images.hits)
+        metrics.gauge("qr.cache_misses", lambda: self._images.misses)
+        self._latency = metrics.histogram("qr.render_seconds")
+
+    def etag(self, data: str, fmt: str) -> str:
+        digest = hashlib.sha256(
+            f"{fmt}:{self.scale}:{self.border}:{data}".encode()).hexdigest()
+
+        return f'"{digest[:32]}"'
+
+    def render(self, data: str, fmt: str = "svg") -> Tuple[bytes, str]:
+        """Return ``(image, etag)`` for ``data`` in ``fmt``"""
+        if fmt not in self.MEDIA_TYPES:
+            raise ValueError(f"unsupported QR code format: {fmt}")
+
+        etag = self.etag(data, fmt)
+        image = self._images.get(etag)
+
+        if image is None:
+            image = self._encode(data, fmt)
+            self._images.set(etag, image)
+
+        return image, etag
+
+    def _encode(self, data: str, fmt: str) -> bytes:
+        if segno is None:
+            raise RuntimeError(
+                "The segno package is required to render QR codes")
+
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+
+        segno.make(data, error="m").save(
+            buffer, kind=fmt, scale=self.scale, border=self.border)
+
+        self._latency.observe(time.perf_counter() - started)
+
+        return buffer.getvalue()
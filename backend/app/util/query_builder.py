@@ -3,8 +3,18 @@
 """Query Builder"""
 
 
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
 from sqlalchemy.sql.expression import and_
 
+# string filters: "prefix" can use a btree (text_pattern_ops) index,
+# "contains" needs a trigram index, "exact" any index
+MATCH_MODES = ("prefix", "contains", "exact")
+
 SQLALCHEMY_QUERY_MAPPER = {
     "eq": "__eq__",
     "ne": "__ne__",
@@ -15,7 +25,18 @@ SQLALCHEMY_QUERY_MAPPER = {
 }
 
 
-def dict_to_sqlalchemy_filter_options(model_class, search_option_dict):
+def match_expression(attr, value: str, match: str = "prefix"):
+    """``attr`` matched against ``value``; LIKE wildcards in ``value`` are
+    escaped, so user input only ever matches literally"""
+    if match == "exact":
+        return attr == value
+    if match == "contains":
+        return attr.contains(value, autoescape=True)
+    return attr.startswith(value, autoescape=True)
+
+
+def dict_to_sqlalchemy_filter_options(model_class, search_option_dict,
+                                      match: str = "prefix"):
     sql_alchemy_filter_options = []
 
     copied_dict = search_option_dict.copy()
@@ -32,7 +53,7 @@ def dict_to_sqlalchemy_filter_options(model_class, search_option_dict):
             sql_alchemy_filter_options.append(attr == option_from_dict)
         elif type(option_from_dict) in [str]:
             sql_alchemy_filter_options.append(
-                attr.like("%" + option_from_dict + "%"))
+                match_expression(attr, option_from_dict, match))
         elif type(option_from_dict) in [bool]:
             sql_alchemy_filter_options.append(attr.is_(option_from_dict))
 
@@ -62,3 +83,21 @@ def dict_to_sqlalchemy_filter_options(model_class, search_option_dict):
                 getattr(attr, bool_command)(None))
 
     return and_(True, *sql_alchemy_filter_options)
+
+
+def encode_keyset_cursor(created_at: datetime, id: UUID) -> str:
+    """Opaque position of a row in ``(created_at, id)`` order"""
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of ``encode_keyset_cursor``; ``ValueError`` if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# File: responses.py
+"""Precompiled JSON responses"""
+
+
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+class ResponseAdapter:
+    """A response model's validator and serializer, built once.
+
+    Returning a model from an endpoint makes FastAPI dump it to a dict,
+    validate that dict against ``response_model`` again and dump it a
+    second time before encoding. ``response`` instead validates an ORM row
+    or schema instance once, straight from its attributes, and lets
+    pydantic-core write the JSON bytes. The endpoint keeps its
+    ``response_model`` for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, tp: Any, exclude_none: bool = False) -> None:
+        self.type = tp
+        self.exclude_none = exclude_none
+        self._adapter = TypeAdapter(tp)
+
+    def project(self, obj: Any) -> Any:
+        """``obj`` as ``tp``; schema instances pass through unvalidated"""
+        return self._adapter.validate_python(obj, from_attributes=True)
+
+    def dump_json(self, obj: Any) -> bytes:
+        return self._adapter.dump_json(self.project(obj),
+                                       exclude_none=self.exclude_none)
+
+    def response(self, obj: Any, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(self.dump_json(obj), status_code=status_code,
+                        headers=headers, media_type=self.media_type)
+
+
+def cache_headers(max_age: int) -> Dict[str, str]:
+    """Let the one caller reuse a response for ``max_age`` seconds"""
+    if max_age <= 0:
+        return {"Cache-Control": "no-store"}
+
+    return {"Cache-Control": f"private, max-age={max_age}"}
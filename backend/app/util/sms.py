@@ -1,9 +1,287 @@
-from vonage import vonage
+#!/usr/bin/env python3
+# File: sms.py
+"""Outbound SMS"""
 
-client = vonage.Client(key="dea5c9a0", secret="pqSgDew309fwGJDf")
-sms = vonage.Sms(client)
 
+import asyncio
+import random
+import time
+import warnings
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, List, Optional
 
-class SMS:
-    def __init__(self) -> None:
-        pass
\ No newline at end of file
+from app.core.metrics import metrics
+
+
+class SMSMessage:
+    __slots__ = ("to", "body", "attempts")
+
+    def __init__(self, to: str, body: str) -> None:
+        self.to = to
+        self.body = body
+        self.attempts = 0
+
+    def __repr__(self) -> str:
+        return f"SMSMessage(to={self.to!r})"
+
+
+class SMSError(Exception):
+    pass
+
+
+class SMSProvider(ABC):
+    name: str = "provider"
+    # messages accepted by a single send() call
+    max_batch_size: int = 1
+
+    @abstractmethod
+    async def send(self, messages: List[SMSMessage]) -> None:
+        """Deliver ``messages``; raise SMSError to have them retried"""
+
+
+class VonageProvider(SMSProvider):
+    name = "vonage"
+
+    def __init__(self, key: str, secret: str, sender: str) -> None:
+        self._key = key
+        self._secret = secret
+        self._sender = sender
+        self._sms = None
+
+    def _client(self):
+        if self._sms is None:
+            from vonage import vonage
+
+            self._sms = vonage.Sms(
+                vonage.Client(key=self._key, secret=self._secret))
+        return self._sms
+
+    async def send(self, messages: List[SMSMessage]) -> None:
+        for message in messages:
+            # the vonage SDK is blocking
+            response = await asyncio.to_thread(
+                self._client().send_message,
+                {"from": self._sender, "to": message.to,
+                 "text": message.body})
+
+            status = response["messages"][0].get("status")
+
+            if status != "0":
+                raise SMSError(
+                    response["messages"][0].get("error-text", status))
+
+
+class FakeSMSProvider(SMSProvider):
+    """Keeps the last ``max_sent`` messages in memory instead of sending
+    them; for local runs and tests"""
+
+    name = "fake"
+    max_batch_size = 100
+
+    def __init__(self, fail_times: int = 0, max_sent: int = 1000) -> None:
+        self.sent: Deque[SMSMessage] = deque(maxlen=max_sent)
+        self.fail_times = fail_times
+
+    async def send(self, messages: List[SMSMessage]) -> None:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise SMSError("fake provider failure")
+
+        self.sent.extend(messages)
+
+    def last_to(self, to: str) -> Optional[SMSMessage]:
+        for message in reversed(self.sent):
+            if message.to == to:
+                return message
+        return None
+
+
+class RateLimiter:
+    """Token bucket shared by the workers of one provider"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self._rate = rate
+        self._capacity = burst or max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        if self._rate <= 0:
+            return
+
+        tokens = min(tokens, self._capacity)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity,
+                    self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / self._rate)
+
+
+class SMSDispatcher:
+    """In-process queue drained by N asyncio workers.
+
+    ``enqueue`` is safe to call from the event loop or from threadpool
+    handlers and returns without waiting on the provider. Failed sends are
+    retried with jittered exponential backoff, up to ``max_retries``.
+    """
+
+    def __init__(self, provider: SMSProvider, workers: int = 4,
+                 queue_size: int = 10000, rate_per_second: float = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 30) -> None:
+        self.provider = provider
+        self._workers = workers
+        self._queue_size = queue_size
+        self._limiter = RateLimiter(rate_per_second)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        prefix = f"sms.{provider.name}"
+        metrics.gauge(f"{prefix}.queue_depth", self.queue_depth)
+        self._enqueued = metrics.counter(f"{prefix}.enqueued")
+        self._dropped = metrics.counter(f"{prefix}.dropped")
+        self._sent = metrics.counter(f"{prefix}.sent")
+        self._retried = metrics.counter(f"{prefix}.retried")
+        self._failed = metrics.counter(f"{prefix}.failed")
+        self._latency = metrics.histogram(f"{prefix}.send_seconds")
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"sms-worker-{i}")
+            for i in range(self._workers)
+        ]
+
+    async def stop(self, timeout: float = 5) -> None:
+        """Give queued messages ``timeout`` seconds to go out, then stop"""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, to: str, body: str) -> bool:
+        """Queue a message; ``False`` if the dispatcher is not running or
+        its queue is full"""
+        if self._loop is None or self._queue is None or \
+                self._queue.qsize() >= self._queue_size:
+            self._dropped.inc()
+            return False
+
+        message = SMSMessage(to, body)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._put(message)
+        else:
+            self._loop.call_soon_threadsafe(self._put, message)
+
+        return True
+
+    def _put(self, message: SMSMessage) -> None:
+        try:
+            self._queue.put_nowait(message)
+            self._enqueued.inc()
+        except asyncio.QueueFull:
+            self._dropped.inc()
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+
+            while len(batch) < self.provider.max_batch_size and \
+                    not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, batch: List[SMSMessage]) -> None:
+        await self._limiter.acquire(len(batch))
+
+        started = time.perf_counter()
+
+        try:
+            await self.provider.send(batch)
+        except Exception:
+            for message in batch:
+                self._retry(message)
+            return
+        finally:
+            self._latency.observe(time.perf_counter() - started)
+
+        self._sent.inc(len(batch))
+
+    def _retry(self, message: SMSMessage) -> None:
+        message.attempts += 1
+
+        if message.attempts > self._max_retries:
+            self._failed.inc()
+            return
+
+        delay = min(self._backoff_max,
+                    self._backoff_base * 2 ** (message.attempts - 1))
+        # full jitter keeps retries from a provider outage from lining up
+        delay = random.uniform(0, delay)
+
+        self._retried.inc()
+        self._loop.call_later(delay, self._put, message)
+
+
+def build_sms_provider(name: str, key: Optional[str] = None,
+                       secret: Optional[str] = None,
+                       sender: str = "2fa", env: str = "dev",
+                       max_fake_sent: int = 1000) -> SMSProvider:
+    """The provider named by ``SMS_PROVIDER``. The fake one never sends
+    anything: dev and test runs fall back to it, but a stage or prod deploy
+    without a provider fails at startup instead of silently dropping every
+    SMS."""
+    if name == "vonage":
+        return VonageProvider(key or "", secret or "", sender)
+
+    local = env in ("dev", "test")
+
+    if name == "fake" or (not name and local):
+        if not local:
+            warnings.warn(
+                f"SMS_PROVIDER=fake in {env!r}: text messages are kept in "
+                "memory and never sent", RuntimeWarning)
+
+        return FakeSMSProvider(max_sent=max_fake_sent)
+
+    raise ValueError(
+        f"Unknown SMS_PROVIDER {name!r}: set it to 'vonage', or to 'fake' "
+        "to keep messages in memory")
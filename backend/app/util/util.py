@@ -3,6 +3,41 @@
 """Utilities"""
 
 import re
+from typing import Optional, Union
+from uuid import UUID
+
+
+def normalize_email(email: str) -> str:
+    """Canonical form used for storage and lookups (``lower(email)``)"""
+    return email.strip().lower()
+
+
+def as_uuid(value: Union[UUID, str]) -> Optional[UUID]:
+    """Parse ``value`` so it can be compared to a UUID column directly;
+    malformed ids become ``None`` and match no row"""
+    if isinstance(value, UUID):
+        return value
+
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header covers ``etag`` (weak
+    comparison, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(",")}
 
 
 def check_password_strength(password: str):
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# File: repository_lookups.py
+"""Hot repository lookup benchmark
+
+Times the per-call cost of the login lookup and of ``get_current_user``
+(session row plus user row) with the prebuilt statements and the slim
+``LoginUser``/``AuthUser`` projections, against the per-call
+``session.query(...)`` / ``select(...)`` of full rows they replaced, on
+one held session so only the Python side and the database round trip are
+measured. The session is emptied before every call, as a request's would
+be, so ORM rows are hydrated each time. The memory each loaded user keeps
+alive is printed for the full row and the projection. The raw driver round trip for
+the same SQL is printed as the floor, followed by the engine's compiled
+statement cache counters.
+
+    python3 -m benchmarks.repository_lookups --calls 5000
+    python3 -m benchmarks.repository_lookups --database-url sqlite:///bench.db
+"""
+
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select
+from sqlmodel import SQLModel
+
+from app.core.config import configs
+from app.core.database import Database
+from app.core.metrics import metrics
+from app.core.sessions import DatabaseSessionStore
+from app.model.user import AuthType, User
+from app.model.user_session import UserSession
+from app.repository.user_repository import UserRepository
+from app.util.util import normalize_email
+
+
+def seed(db: Database, store: DatabaseSessionStore):
+    email = f"bench-{uuid4().hex[:12]}@example.com"
+    user_id = uuid4()
+    now = datetime.now()
+
+    with db.session() as session:
+        session.execute(insert(User).values(
+            id=user_id, created_at=now, updated_at=now, first_name="Bench",
+            last_name="User", email=email, password="x", phone_no="+15550000",
+            is_active=True, is_2fa_enabled=True, is_2fa_setup=True,
+            is_otp_verified=False, auth_2fa_type=AuthType.Authenticator))
+        session.commit()
+
+        login = store.create(session, user_id, "benchmark")
+
+    return email, user_id, login.id
+
+
+def legacy_get_by_email(session, email: str):
+    return session.query(User).filter(
+        func.lower(User.email) == normalize_email(email)).first()
+
+
+def legacy_get_current_user(session, user_id, sid):
+    columns = DatabaseSessionStore._COLUMNS
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    login = session.execute(
+        select(*columns).where(UserSession.id == sid,
+                               UserSession.expires_at > now)).first()
+    user = session.query(User).filter(User.id == user_id).first()
+    user.is_otp_verified = login.is_otp_verified
+
+    return user
+
+
+def timed(label: str, func, calls: int, session=None) -> float:
+    func()
+
+    started = time.perf_counter()
+
+    for _ in range(calls):
+        if session is not None:
+            session.expunge_all()
+
+        func()
+
+    per_call = (time.perf_counter() - started) / calls * 1e6
+
+    print(f"{label:<38} {per_call:8.1f} us/call")
+
+    return per_call
+
+
+def retained(label: str, func, calls: int, session) -> None:
+    kept = [func()]
+
+    tracemalloc.start()
+
+    for _ in range(calls):
+        session.expunge_all()
+        kept.append(func())
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<38} {current / calls:8.0f} bytes/user")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--database-url", default=configs.DATABASE_URI)
+    args = parser.parse_args()
+
+    db = Database(args.database_url)
+    SQLModel.metadata.create_all(db._engine)
+
+    store = DatabaseSessionStore()
+    repository = UserRepository(db.session, session_store=store)
+    email, user_id, sid = seed(db, store)
+
+    with db.session() as session:
+        floor = session.connection().exec_driver_sql
+
+        compiled = select(User).where(
+            func.lower(User.email) == email).limit(1).compile(db._engine)
+        floor_params = tuple(compiled.params[name]
+                             for name in compiled.positiontup) \
+            if compiled.positional else compiled.params
+
+        print("login: user by email")
+        before = timed("  session.query per call",
+                       lambda: legacy_get_by_email(session, email),
+                       args.calls, session)
+        timed("  prebuilt statement",
+              lambda: repository._get_by_email(session, email),
+              args.calls, session)
+        after = timed("  LoginUser projection",
+                      lambda: repository._get_login_user(session, email),
+                      args.calls, session)
+        timed("  driver round trip (floor)",
+              lambda: floor(str(compiled), floor_params).all(),
+              args.calls, session)
+        print(f"  saved {before - after:.1f} us/call")
+
+        retained("  full User row",
+                 lambda: repository._get_by_email(session, email),
+                 min(args.calls, 2000), session)
+        retained("  LoginUser projection",
+                 lambda: repository._get_login_user(session, email),
+                 min(args.calls, 2000), session)
+
+        print("get_current_user: session row + user row")
+        before = timed(
+            "  query built per call",
+            lambda: legacy_get_current_user(session, user_id, sid),
+            args.calls, session)
+        after = timed(
+            "  AuthUser projection",
+            lambda: repository._get_session_user(session, user_id, str(sid)),
+            args.calls, session)
+        print(f"  saved {before - after:.1f} us/call")
+
+    counters = metrics.snapshot()["counters"]
+    hits = counters["db.primary.query_cache.hits"]
+    misses = counters["db.primary.query_cache.misses"]
+
+    print(f"compiled cache: hits={hits} misses={misses} "
+          f"hit_ratio={hits / max(1, hits + misses):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# File: response_serialization.py
+"""Response serialization benchmark
+
+Times, per endpoint, turning what the service returns into response
+bytes: FastAPI's ``response_model`` path (dump, validate, dump again, then
+encode with ``JSONResponse`` or ``ORJSONResponse``) against the
+precompiled ``ResponseAdapter`` the endpoints now return through.
+
+    python3 -m benchmarks.response_serialization --calls 20000
+"""
+
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.model.user import AuthType, User as UserModel
+from app.schema.auth_schema import SignInResponse, SignInResponse2Fa
+from app.schema.responses import current_user_response, \
+    otp_verify_response, sign_in_response, user_response
+from app.schema.user_schema import CurrentUser, User
+
+
+def user_row() -> UserModel:
+    now = datetime.now()
+
+    return UserModel(
+        id=uuid4(), created_at=now, updated_at=now, first_name="Bench",
+        last_name="User", email="bench@example.com", password="x" * 60,
+        phone_no="+15550000", is_active=True, is_2fa_enabled=True,
+        is_2fa_setup=True, is_otp_verified=True,
+        auth_2fa_type=AuthType.Authenticator,
+        otp_secret="JBSWY3DPEHPK3PXPJBSWY3DPEHPK3PXP",
+        otp_auth_url="otpauth://totp/2fa.com:bench%40example.com"
+                     "?secret=JBSWY3DPEHPK3PXPJBSWY3DPEHPK3PXP"
+                     "&issuer=2fa.com")
+
+
+def _result(coroutine):
+    """Run a coroutine that never awaits, without an event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+
+    raise RuntimeError("coroutine suspended")
+
+
+def timed(label: str, func, calls: int) -> float:
+    func()
+
+    started = time.perf_counter()
+
+    for _ in range(calls):
+        func()
+
+    per_call = (time.perf_counter() - started) / calls * 1e6
+
+    print(f"  {label:<32} {per_call:8.1f} us/response")
+
+    return per_call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    row = user_row()
+    signed_in = SignInResponse(
+        access_token="x" * 220,
+        expiration=datetime.now() + timedelta(minutes=30),
+        user_info=row)
+
+    endpoints = [
+        ("POST /auth/register", User, User(**row.model_dump()),
+         user_response),
+        ("POST /auth/login", Union[SignInResponse, SignInResponse2Fa],
+         signed_in, sign_in_response),
+        ("POST /auth/otp/verify", Optional[User], row, otp_verify_response),
+        ("GET /user", CurrentUser, row, current_user_response),
+    ]
+
+    for name, response_model, content, adapter in endpoints:
+        field = create_response_field(name="Response", type_=response_model)
+
+        def fastapi_path(response_class):
+            def run():
+                data = _result(serialize_response(
+                    field=field, response_content=content))
+                return response_class(data).body
+            return run
+
+        print(name)
+        before = timed("response_model + JSONResponse",
+                       fastapi_path(JSONResponse), args.calls)
+        timed("response_model + ORJSONResponse",
+              fastapi_path(ORJSONResponse), args.calls)
+        after = timed("ResponseAdapter",
+                      lambda: adapter.response(content).body, args.calls)
+        print(f"  {'speedup':<32} {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# File: totp_verify.py
+"""TOTP verification microbenchmark
+
+Compares the per-attempt pyotp path (a fresh ``pyotp.TOTP`` per request)
+with the shared TOTPVerifier, for a client in sync and one a step behind.
+
+    python3 -m benchmarks.totp_verify --users 1000 --rounds 20
+"""
+
+
+import argparse
+import time
+from uuid import uuid4
+
+import pyotp
+
+from app.core.totp import TOTPVerifier
+
+
+def bench(label: str, func, attempts: int) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<40} {elapsed / attempts * 1e6:8.2f} us/verify")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    users = [(uuid4(), pyotp.random_base32()) for _ in range(args.users)]
+    now = time.time()
+    attempts = args.users * args.rounds
+
+    current = {uid: pyotp.TOTP(secret).at(now) for uid, secret in users}
+    behind = {uid: pyotp.TOTP(secret).at(now - 30) for uid, secret in users}
+
+    verifier = TOTPVerifier(valid_window=1, cache_size=args.users)
+
+    for label, codes in (("in sync", current), ("one step behind", behind)):
+        def run_pyotp():
+            for _ in range(args.rounds):
+                for uid, secret in users:
+                    pyotp.TOTP(secret).verify(
+                        codes[uid], for_time=now, valid_window=1)
+
+        def run_verifier():
+            for _ in range(args.rounds):
+                for uid, secret in users:
+                    verifier.verify(uid, secret, codes[uid], at=now)
+
+        bench(f"pyotp.TOTP per attempt ({label})", run_pyotp, attempts)
+        bench(f"TOTPVerifier ({label})", run_verifier, attempts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# File: user_search.py
+"""User search benchmark
+
+Seeds the users table up to --rows synthetic users, then times
+UserRepository.search for each match mode against the old
+leading-wildcard LIKE, and prints the plan PostgreSQL picked.
+
+    python3 -m benchmarks.user_search --rows 1000000
+    python3 -m benchmarks.user_search --database-url sqlite:///bench.db
+"""
+
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select, text
+from sqlmodel import SQLModel
+
+from app.core.config import configs
+from app.core.database import Database
+from app.model.user import AuthType, User
+from app.repository.user_repository import UserRepository
+
+
+def email(i: int) -> str:
+    return f"user{i:07d}@example{i % 97}.com"
+
+
+def phone(i: int) -> str:
+    return f"+1555{i:07d}"
+
+
+def seed(db: Database, rows: int, batch_size: int) -> None:
+    with db.session() as session:
+        existing = session.execute(
+            select(func.count()).select_from(User)).scalar_one()
+
+        started = time.perf_counter()
+        epoch = datetime(2024, 1, 1)
+
+        for start in range(existing, rows, batch_size):
+            session.execute(insert(User), [
+                {
+                    "id": uuid4(),
+                    "created_at": epoch + timedelta(seconds=i),
+                    "updated_at": epoch + timedelta(seconds=i),
+                    "first_name": "Bench",
+                    "last_name": f"User{i}",
+                    "email": email(i),
+                    "password": "x",
+                    "phone_no": phone(i),
+                    "is_active": True,
+                    "is_2fa_enabled": False,
+                    "is_2fa_setup": False,
+                    "is_otp_verified": False,
+                    "auth_2fa_type": AuthType.Authenticator,
+                }
+                for i in range(start, min(rows, start + batch_size))
+            ])
+            session.commit()
+
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text("ANALYZE users"))
+            session.commit()
+
+    if rows > existing:
+        print(f"seeded {rows - existing} rows in "
+              f"{time.perf_counter() - started:.1f}s")
+
+
+def plan(db: Database, statement) -> str:
+    with db.session() as session:
+        if session.get_bind().dialect.name != "postgresql":
+            return ""
+
+        compiled = statement.compile(dialect=session.get_bind().dialect,
+                                     compile_kwargs={"literal_binds": True})
+        lines = session.execute(text(f"EXPLAIN {compiled}")).scalars()
+
+        return " | ".join(line.strip() for line in lines
+                          if "Scan" in line)
+
+
+def timed(func, repeat: int) -> str:
+    samples = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+
+    return (f"p50={statistics.median(samples):7.2f} ms "
+            f"p95={samples[int(len(samples) * 0.95) - 1]:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--database-url", default=configs.DATABASE_URI)
+    args = parser.parse_args()
+
+    db = Database(args.database_url)
+    SQLModel.metadata.create_all(db._engine)
+    seed(db, args.rows, args.batch_size)
+
+    repository = UserRepository(db.session)
+    i = random.randrange(args.rows)
+
+    cases = [
+        ("email prefix", "email", "prefix", f"user{i:07d}"[:9]),
+        ("email exact", "email", "exact", email(i).upper()),
+        ("email contains", "email", "contains", f"{i:07d}@"),
+        ("phone prefix", "phone_no", "prefix", phone(i)[:9]),
+        ("phone contains", "phone_no", "contains", f"{i:07d}"[2:]),
+    ]
+
+    for name, field, match, term in cases:
+        def run():
+            return repository.search(term, field, match)
+
+        print(f"{name:<16} {timed(run, args.repeat)} found={len(run())}")
+
+    legacy = select(User).where(
+        User.email.like(f"%{i:07d}@%")).limit(20)
+
+    def run_legacy():
+        with db.session() as session:
+            session.execute(legacy).all()
+
+    # the old default for every string filter
+    print(f"{'legacy %like%':<16} {timed(run_legacy, args.repeat)}")
+
+    for name, statement in [
+        ("email prefix", select(User.id).where(
+            User.email.startswith(f"user{i:07d}"[:9]))),
+        ("email contains", select(User.id).where(
+            User.email.contains(f"{i:07d}@"))),
+        ("legacy %like%", select(User.id).where(
+            User.email.like(f"%{i:07d}@%"))),
+    ]:
+        scans = plan(db, statement)
+
+        if scans:
+            print(f"plan {name:<16} {scans}")
+
+
+if __name__ == "__main__":
+    main()
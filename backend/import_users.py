@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# File: import_users.py
+"""Bulk user import
+
+Streams users from a CSV or NDJSON file into the users table:
+
+    python3 import_users.py users.csv --batch-size 5000 --workers 8
+    python3 import_users.py users.ndjson --resume --copy
+
+Every row is validated with the SignUp schema. Plain passwords are hashed
+in a process pool; rows carrying a bcrypt ``password_hash`` instead of a
+``password`` are loaded as-is. Each batch is committed in its own
+transaction and the last committed line is written to a checkpoint file,
+so an interrupted run picks up where it stopped with ``--resume``.
+Existing emails are skipped, which also makes replayed batches harmless.
+"""
+
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import ValidationError, field_validator
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.core.config import configs
+from app.core.security import generate_otp_credentials, get_password_hash
+from app.model.user import AuthType, User
+from app.schema.auth_schema import SignUp
+
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+class PreHashedSignUp(SignUp):
+    """SignUp for rows that already carry a bcrypt hash"""
+
+    @field_validator('password')
+    def validate_password(cls, value):
+        if not value.startswith(BCRYPT_PREFIXES) or len(value) != 60:
+            raise ValueError("password_hash is not a bcrypt hash")
+        return value
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def line(self) -> str:
+        rate = self.read / self.elapsed if self.elapsed else 0.0
+
+        return (f"read={self.read} inserted={self.inserted} "
+                f"duplicates={self.duplicates} invalid={self.invalid} "
+                f"elapsed={self.elapsed:.1f}s rate={rate:.0f} rows/s")
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield ``(line_no, row)`` without loading the file in memory"""
+    stream = sys.stdin if path == "-" else open(path, newline="")
+
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(stream, start=1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def validate(row: dict) -> SignUp:
+    row = {k: v for k, v in row.items() if v not in (None, "")}
+
+    if "password_hash" in row:
+        row["password"] = row.pop("password_hash")
+
+        return PreHashedSignUp(**row)
+
+    return SignUp(**row)
+
+
+def build_user(user_info: SignUp, password_hash: str) -> dict:
+    """Column values for one user, as UserRepository.create builds them"""
+    otp_base32, otp_auth_url = generate_otp_credentials(user_info.email)
+
+    auth_type = AuthType.Sms if user_info.authentication_type is not None \
+        and user_info.authentication_type.lower() == 'sms' \
+        else AuthType.Authenticator
+
+    now = datetime.now()
+
+    return {
+        "id": uuid4(),
+        "created_at": now,
+        "updated_at": now,
+        "first_name": user_info.first_name,
+        "last_name": user_info.last_name,
+        "email": user_info.email,
+        "password": password_hash,
+        "phone_no": user_info.phone_no,
+        "is_active": True,
+        "is_2fa_enabled": True,
+        "is_2fa_setup": False,
+        "is_otp_verified": False,
+        "auth_2fa_type": auth_type,
+        "otp_secret": otp_base32,
+        "otp_auth_url": otp_auth_url,
+    }
+
+
+def insert_batch(connection: Connection, rows: List[dict]) -> int:
+    """Batched executemany INSERT ... ON CONFLICT DO NOTHING"""
+    dialect = connection.dialect.name
+    table = User.__table__
+
+    if dialect == "postgresql":
+        statement = postgresql.insert(table)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(table)
+    else:
+        raise SystemExit(f"unsupported database dialect: {dialect}")
+
+    result = connection.execute(
+        statement.on_conflict_do_nothing().returning(table.c.id), rows)
+
+    return len(result.all())
+
+
+def copy_batch(connection: Connection, rows: List[dict]) -> int:
+    """COPY into a temporary table, then move the rows over skipping
+    existing emails"""
+    columns = [column.name for column in User.__table__.columns]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for row in rows:
+        writer.writerow([_copy_value(row[name]) for name in columns])
+
+    buffer.seek(0)
+
+    connection.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS users_import "
+        "(LIKE users INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"))
+
+    cursor = connection.connection.cursor()
+
+    try:
+        cursor.copy_expert(
+            f"COPY users_import ({', '.join(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+    result = connection.execute(text(
+        f"INSERT INTO users ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM users_import "
+        "ON CONFLICT DO NOTHING"))
+
+    return result.rowcount
+
+
+def _copy_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, AuthType):
+        # SQLAlchemy persists python enums by member name
+        return value.name
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value)
+
+
+def load_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+
+    with open(path) as checkpoint:
+        return int(json.load(checkpoint).get("line", 0))
+
+
+def save_checkpoint(path: str, source: str, line_no: int) -> None:
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as checkpoint:
+        json.dump({"input": source, "line": line_no}, checkpoint)
+
+    os.replace(tmp_path, path)
+
+
+def run(args: argparse.Namespace) -> Stats:
+    fmt = args.format or (
+        "csv" if args.input.endswith(".csv") else "ndjson")
+    checkpoint = args.checkpoint or f"{args.input}.checkpoint"
+    resume_after = load_checkpoint(checkpoint) if args.resume else 0
+
+    engine = create_engine(args.database_url)
+
+    if args.copy and engine.dialect.name != "postgresql":
+        raise SystemExit("--copy requires PostgreSQL")
+
+    load = copy_batch if args.copy else insert_batch
+    stats = Stats()
+
+    pending: List[Tuple[SignUp, bool]] = []
+    last_line = resume_after
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        def flush() -> None:
+            plain = [u.password for u, hashed in pending if not hashed]
+            hashes = iter(pool.map(get_password_hash, plain,
+                                   chunksize=max(1, len(plain) //
+                                                 (args.workers * 4))))
+
+            rows = [
+                build_user(user_info, user_info.password if hashed
+                           else next(hashes))
+                for user_info, hashed in pending
+            ]
+
+            with engine.begin() as connection:
+                inserted = load(connection, rows)
+
+            stats.inserted += inserted
+            stats.duplicates += len(rows) - inserted
+
+            save_checkpoint(checkpoint, args.input, last_line)
+            pending.clear()
+
+            print(stats.line(), file=sys.stderr)
+
+        for line_no, row in read_rows(args.input, fmt):
+            if line_no <= resume_after:
+                continue
+
+            stats.read += 1
+            last_line = line_no
+
+            try:
+                user_info = validate(row)
+            except (ValidationError, ValueError, TypeError) as e:
+                stats.invalid += 1
+
+                if args.verbose:
+                    print(f"line {line_no}: {e}", file=sys.stderr)
+                continue
+
+            pending.append((user_info, isinstance(user_info, PreHashedSignUp)))
+
+            if len(pending) >= args.batch_size:
+                flush()
+
+        if pending:
+            flush()
+        elif last_line > resume_after:
+            save_checkpoint(checkpoint, args.input, last_line)
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import users")
+    parser.add_argument("input", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="password hashing processes")
+    parser.add_argument("--copy", action="store_true",
+                        help="load batches with COPY (PostgreSQL only)")
+    parser.add_argument("--checkpoint",
+                        help="defaults to <input>.checkpoint")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip lines committed by a previous run")
+    parser.add_argument("--database-url", default=configs.DATABASE_URI)
+    parser.add_argument("--verbose", action="store_true",
+                        help="print each rejected row")
+
+    stats = run(parser.parse_args(argv))
+
+    print(f"done: {stats.line()}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ from sqlmodel import SQLModel
 
 from app.core.config import configs
 from app.model.user import User
+from app.model.sms_code import SmsCode
+from app.model.user_session import UserSession
 
 cmd_kwargs = context.get_x_argument(as_dictionary=True)
 if "ENV" in cmd_kwargs:
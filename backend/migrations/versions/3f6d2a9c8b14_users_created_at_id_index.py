@@ -0,0 +1,31 @@
+"""users (created_at, id) index
+
+Revision ID: 3f6d2a9c8b14
+Revises: 8c1e5b7f3a92
+Create Date: 2026-10-18 13:58:06.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6d2a9c8b14'
+down_revision = '8c1e5b7f3a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # built without blocking writes on a large users table
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_created_at_id', 'users',
+                        ['created_at', 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users',
+                      postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""sessions
+
+Revision ID: 8c1e5b7f3a92
+Revises: f271ca63cc40
+Create Date: 2026-10-18 13:20:41.208335
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e5b7f3a92'
+down_revision = 'f271ca63cc40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sessions',
+                    sa.Column('id', sqlmodel.sql.sqltypes.GUID(),
+                              nullable=False),
+                    sa.Column('user_id', sqlmodel.sql.sqltypes.GUID(),
+                              nullable=False),
+                    sa.Column('device', sa.String(
+                        length=255), nullable=True),
+                    sa.Column('is_otp_verified', sa.Boolean(),
+                              nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=False),
+                    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+                    sa.Column('expires_at', sa.DateTime(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'],
+                                            ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index(op.f('ix_sessions_user_id'), 'sessions',
+                    ['user_id'], unique=False)
+    op.create_index(op.f('ix_sessions_expires_at'), 'sessions',
+                    ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_sessions_expires_at'), table_name='sessions')
+    op.drop_index(op.f('ix_sessions_user_id'), table_name='sessions')
+    op.drop_table('sessions')
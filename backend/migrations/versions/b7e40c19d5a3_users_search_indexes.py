@@ -0,0 +1,58 @@
+"""users search indexes
+
+Revision ID: b7e40c19d5a3
+Revises: 3f6d2a9c8b14
+Create Date: 2026-10-18 14:31:52.903417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e40c19d5a3'
+down_revision = '3f6d2a9c8b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        # SQLite (tests): plain btrees, substring search scans
+        op.create_index('ix_users_email_pattern', 'users', ['email'])
+        op.create_index('ix_users_phone_no_pattern', 'users', ['phone_no'])
+        return
+
+    # needs CREATE privilege on the database, or the extension installed
+    # beforehand by a superuser
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email_pattern', 'users', ['email'],
+                        postgresql_ops={'email': 'text_pattern_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_users_phone_no_pattern', 'users', ['phone_no'],
+                        postgresql_ops={'phone_no': 'text_pattern_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_users_email_trgm', 'users', ['email'],
+                        postgresql_using='gin',
+                        postgresql_ops={'email': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_users_phone_no_trgm', 'users', ['phone_no'],
+                        postgresql_using='gin',
+                        postgresql_ops={'phone_no': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index('ix_users_phone_no_pattern', table_name='users')
+        op.drop_index('ix_users_email_pattern', table_name='users')
+        return
+
+    with op.get_context().autocommit_block():
+        for name in ('ix_users_phone_no_trgm', 'ix_users_email_trgm',
+                     'ix_users_phone_no_pattern', 'ix_users_email_pattern'):
+            op.drop_index(name, table_name='users',
+                          postgresql_concurrently=True)
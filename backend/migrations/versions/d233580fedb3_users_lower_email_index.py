@@ -0,0 +1,54 @@
+"""users lower(email) index
+
+Revision ID: d233580fedb3
+Revises: 5a4ce8f85bb6
+Create Date: 2026-10-18 09:12:41.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'd233580fedb3'
+down_revision = '5a4ce8f85bb6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the UPDATE below would hit UNIQUE(email) halfway through on two rows
+    # differing only by case; name them up front instead
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT lower(trim(email)), count(*) FROM users "
+        "GROUP BY lower(trim(email)) HAVING count(*) > 1 "
+        "ORDER BY 1")).all()
+
+    if duplicates:
+        listed = ", ".join(f"{email} ({count} rows)"
+                           for email, count in duplicates[:20])
+        more = f" and {len(duplicates) - 20} more" \
+            if len(duplicates) > 20 else ""
+
+        raise RuntimeError(
+            "users has emails that differ only by case or surrounding "
+            f"spaces: {listed}{more}. Merge or rename those accounts, then "
+            "run the migration again.")
+
+    # emails are normalised at signup from now on; bring existing rows in
+    # line so the unique index below can be built
+    op.execute("UPDATE users SET email = lower(trim(email)) "
+               "WHERE email <> lower(trim(email))")
+
+    # built without blocking writes on a large users table
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email_lower', 'users',
+                        [sa.text('lower(email)')], unique=True,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_lower', table_name='users',
+                      postgresql_concurrently=True)
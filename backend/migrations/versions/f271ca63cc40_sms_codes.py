@@ -0,0 +1,38 @@
+"""sms codes
+
+Revision ID: f271ca63cc40
+Revises: d233580fedb3
+Create Date: 2026-10-18 11:02:17.554120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'f271ca63cc40'
+down_revision = 'd233580fedb3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sms_codes',
+                    sa.Column('user_id', sqlmodel.sql.sqltypes.GUID(),
+                              nullable=False),
+                    sa.Column('code_hash', sa.String(
+                        length=64), nullable=False),
+                    sa.Column('expires_at', sa.DateTime(), nullable=False),
+                    sa.Column('attempts', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'],
+                                            ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('user_id')
+                    )
+    op.create_index(op.f('ix_sms_codes_expires_at'), 'sms_codes',
+                    ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_sms_codes_expires_at'), table_name='sms_codes')
+    op.drop_table('sms_codes')
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# File: conftest.py
+"""Test fixtures
+
+The settings are read from the environment when ``app.core.config`` is
+imported, so they are set here first: one SQLite file for the whole run,
+and otherwise the defaults.
+"""
+
+
+import os
+import tempfile
+import time
+from itertools import count
+
+_database = os.path.join(tempfile.mkdtemp(prefix="2fa-tests-"), "test.db")
+
+os.environ.update({
+    "ENV": "test",
+    "DATABASE_URI": f"sqlite:///{_database}",
+    "SECRET_KEY": "test-secret-key",
+    "ADMIN_EMAILS": "admin@example.com",
+    "INTROSPECTION_CLIENT_SECRETS": "introspection-secret",
+    "OTP_GATEWAY_SECRETS": "gateway-secret",
+    "METRICS_SECRETS": "metrics-secret",
+})
+
+import pyotp  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.main import app, app_creator  # noqa: E402
+from app.model.sms_code import SmsCode  # noqa: E402,F401
+from app.model.user_session import UserSession  # noqa: E402,F401
+
+PASSWORD = "Passw0rd!"
+
+ADMIN = "admin@example.com"
+
+_emails = count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    SQLModel.metadata.create_all(app_creator.db._engine)
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def container():
+    return app_creator.container
+
+
+@pytest.fixture(scope="session")
+def admin(client, container):
+    """Bearer headers of a verified session of the one admin"""
+    register(client, ADMIN)
+    headers = login(client, ADMIN)
+    response = client.post("/auth/otp/verify",
+                           json={"email": ADMIN,
+                                 "otp": totp_now(container, ADMIN)},
+                           headers=headers)
+    assert response.status_code == 200, response.text
+
+    return headers
+
+
+@pytest.fixture
+def email():
+    """An address no other test has registered"""
+    return f"user{next(_emails)}@example.com"
+
+
+def register(client, email: str, authentication_type: str = "authenticator"):
+    response = client.post("/auth/register", json={
+        "email": email, "password": PASSWORD, "first_name": "Test",
+        "last_name": "User", "phone_no": "+15550000",
+        "authentication_type": authentication_type,
+    })
+    assert response.status_code == 201, response.text
+
+    return response.json()
+
+
+def login(client, email: str, device: str = "pytest") -> dict:
+    """Sign in and return the bearer headers of the new session"""
+    response = client.post("/auth/login",
+                           json={"email": email, "password": PASSWORD},
+                           headers={"user-agent": device})
+    assert response.status_code == 200, response.text
+
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def totp_now(container, email: str, step: int = 0) -> str:
+    """The user's current TOTP code, or the one ``step`` periods away; a
+    neighbouring code gets past the replay check within the valid window"""
+    user = container.user_repository().get_by_email(email)
+    totp = pyotp.TOTP(user.otp_secret)
+
+    return totp.at(time.time() + step * totp.interval)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# File: test_admin_users.py
+"""GET /admin/users"""
+
+
+import pytest
+
+from conftest import login, register
+
+
+@pytest.fixture(scope="module")
+def listed(client):
+    """Five users sharing an email prefix, oldest first"""
+    emails = [f"listed{n}@example.com" for n in range(5)]
+
+    for email in emails:
+        register(client, email)
+
+    return emails
+
+
+def test_listing_is_for_admins_only(client, email):
+    register(client, email)
+
+    assert client.get("/admin/users",
+                      headers=login(client, email)).status_code == 403
+
+
+def test_pages_follow_the_cursor_newest_first(client, admin, listed):
+    seen, cursor = [], None
+
+    while True:
+        params = {"email": "listed", "page_size": 2}
+
+        if cursor:
+            params["cursor"] = cursor
+
+        response = client.get("/admin/users", params=params, headers=admin)
+        assert response.status_code == 200, response.text
+        page = response.json()
+
+        assert len(page["founds"]) <= 2
+        seen += [user["email"] for user in page["founds"]]
+        cursor = page["search_options"]["next_cursor"]
+
+        if cursor is None:
+            break
+
+    assert seen == listed[::-1]
+
+
+def test_rejects_a_forged_cursor(client, admin):
+    response = client.get("/admin/users", params={"cursor": "zzz"},
+                          headers=admin)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# File: test_metrics.py
+"""GET /metrics"""
+
+
+def test_requires_a_metrics_secret(client):
+    assert client.get("/metrics").status_code == 401
+
+    response = client.get("/metrics",
+                          headers={"Authorization": "Bearer metrics-secret"})
+
+    assert response.status_code == 200
+    assert "counters" in response.json()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# File: test_otp_replay.py
+"""OTP replay protection"""
+
+
+import warnings
+
+import pytest
+
+from app.core.otp_replay import MemoryReplayStore, build_replay_store
+
+
+def test_a_step_is_accepted_once():
+    store = MemoryReplayStore(ttl=90)
+
+    assert store.check_and_record("user", 10)
+    assert not store.check_and_record("user", 10)
+    assert not store.check_and_record("user", 9)
+    assert store.check_and_record("user", 11)
+
+
+def test_memory_store_warns_outside_dev_and_test():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+
+        for env in ("dev", "test"):
+            build_replay_store("memory", 90, 10, None, env=env)
+
+    with pytest.warns(RuntimeWarning):
+        build_replay_store("memory", 90, 10, None, env="prod")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# File: test_sessions.py
+"""Per-device login sessions"""
+
+
+from datetime import timedelta
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.core import sessions
+from app.core.sessions import DatabaseSessionStore, MemorySessionStore
+from app.model.user import User
+from app.schema.auth_schema import OTPPayload
+from conftest import login, register, totp_now
+
+
+def _stored_otp_flag(container, email: str) -> bool:
+    with container.db().session() as session:
+        return session.execute(
+            select(User.is_otp_verified).where(User.email == email)
+        ).scalar_one()
+
+
+def _verify(client, container, email: str, headers: dict, step: int = 0):
+    response = client.post("/auth/otp/verify",
+                           json={"email": email,
+                                 "otp": totp_now(container, email, step)},
+                           headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["is_otp_verified"] is True
+
+
+def test_verify_marks_only_the_signed_in_device(client, container, email):
+    register(client, email)
+    phone = login(client, email, device="phone")
+    # the first verification also finishes the 2fa setup
+    _verify(client, container, email, phone)
+
+    laptop = login(client, email, device="laptop")
+    tablet = login(client, email, device="tablet")
+    _verify(client, container, email, laptop, step=1)
+
+    assert client.get("/user", headers=laptop).json()["is_otp_verified"]
+    assert not client.get("/user", headers=tablet).json()["is_otp_verified"]
+    # the flag lives on the login session, not on the user's row
+    assert not _stored_otp_flag(container, email)
+
+
+def test_verified_user_is_not_flushed_by_a_later_write(
+        client, container, email):
+    register(client, email)
+    _verify(client, container, email, login(client, email))
+    repository = container.user_repository()
+    user = repository.get_by_email(email)
+    laptop = repository.create_session(user.id, "laptop")
+
+    with container.db().unit_of_work() as work:
+        verified = repository.verify_otp(
+            OTPPayload(email=email, otp=totp_now(container, email, 1)),
+            str(laptop.id))
+        repository.create_session(user.id, "tablet")
+        work.finish(True)
+
+    assert not _stored_otp_flag(container, email)
+    assert verified.is_otp_verified
+
+
+def test_user_verify_keeps_the_row_untouched(client, container, email):
+    register(client, email)
+    headers = login(client, email)
+
+    response = client.post("/user/otp/verify",
+                           json={"otp": totp_now(container, email)},
+                           headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert client.get("/user", headers=headers).json()["is_otp_verified"]
+    assert not _stored_otp_flag(container, email)
+
+
+def test_logout_revokes_only_that_device(client, email):
+    register(client, email)
+    phone = login(client, email, device="phone")
+    laptop = login(client, email, device="laptop")
+
+    assert client.post("/auth/logout", headers=phone).json() is True
+
+    assert client.get("/user", headers=phone).status_code == 403
+    assert client.get("/user", headers=laptop).status_code == 200
+    assert client.post("/auth/logout", headers=phone).status_code == 403
+
+
+def test_database_store_is_the_default(container):
+    assert isinstance(container.session_store(), DatabaseSessionStore)
+
+
+def test_memory_store_keeps_at_most_max_sessions():
+    store = MemorySessionStore(ttl=60, max_sessions=2)
+    user_id = uuid4()
+    first, second, third = (store.create(None, user_id, None)
+                            for _ in range(3))
+
+    assert store.get(None, first.id) is None
+    assert store.get(None, second.id) is second
+    assert store.latest(None, user_id) is third
+
+
+def test_memory_store_sweeps_on_reads(monkeypatch):
+    store = MemorySessionStore(ttl=60)
+    user_id = uuid4()
+    state = store.create(None, user_id, None)
+    later = state.expires_at + timedelta(seconds=1)
+    monkeypatch.setattr(sessions, "_utcnow", lambda: later)
+
+    assert store.latest(None, user_id) is None
+    assert store.get(None, state.id) is None
+    assert store.sweep() == 0
+
+
+def test_request_auth_reads_and_touches_only_when_due(
+        client, container, email, monkeypatch):
+    register(client, email)
+    login(client, email)
+    repository = container.user_repository()
+    user = repository.get_by_email(email)
+    sid = str(repository.create_session(user.id, "reader").id)
+    reads, touches = [], []
+
+    def read_session(key=None):
+        reads.append(key)
+        return container.db().read_session(key)
+
+    store = container.session_store()
+    touch = store.touch
+    monkeypatch.setattr(repository, "read_session_factory", read_session)
+    monkeypatch.setattr(store, "touch",
+                        lambda *args: touches.append(args) or touch(*args))
+
+    found = repository.get_session_user(str(user.id), sid)
+
+    assert found.email == email
+    assert reads == [user.id] and touches == []
+
+    monkeypatch.setattr(store, "touch_interval", 0)
+    repository.get_session_user(str(user.id), sid)
+
+    assert len(reads) == 2 and len(touches) == 1
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# File: test_sign_up.py
+"""POST /auth/register"""
+
+
+from conftest import PASSWORD, register
+
+
+def test_email_is_unique_whatever_its_case(client, email):
+    register(client, email)
+
+    for taken in (email, email.upper()):
+        response = client.post("/auth/register", json={
+            "email": taken, "password": PASSWORD, "first_name": "Test",
+            "last_name": "User", "phone_no": "+15550000",
+            "authentication_type": "authenticator",
+        })
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Account exists!"
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# File: test_sms.py
+"""Outbound SMS"""
+
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.sms_codes import DatabaseSMSCodeStore
+from app.util.sms import FakeSMSProvider, SMSMessage, build_sms_provider
+from conftest import login, register
+
+
+def test_dev_and_test_fall_back_to_the_fake_provider():
+    assert isinstance(build_sms_provider(""), FakeSMSProvider)
+    assert isinstance(build_sms_provider("", env="test"), FakeSMSProvider)
+
+    with pytest.raises(ValueError):
+        build_sms_provider("sns", env="dev")
+
+
+def test_deploys_need_a_real_provider():
+    for env in ("stage", "prod"):
+        with pytest.raises(ValueError):
+            build_sms_provider("", env=env)
+
+        with pytest.warns(RuntimeWarning):
+            assert isinstance(build_sms_provider("fake", env=env),
+                              FakeSMSProvider)
+
+
+def test_the_fake_provider_keeps_only_the_latest_messages():
+    provider = FakeSMSProvider(max_sent=2)
+
+    asyncio.run(provider.send(
+        [SMSMessage(f"+1555000{n}", "code") for n in range(3)]))
+
+    assert [message.to for message in provider.sent] == \
+        ["+15550001", "+15550002"]
+    assert provider.last_to("+15550000") is None
+    assert provider.last_to("+15550002") is not None
+
+
+def test_database_code_store_is_the_default(container):
+    assert isinstance(container.sms_code_store(), DatabaseSMSCodeStore)
+
+
+def test_sms_code_is_delivered_and_verifies(client, container, email):
+    register(client, email, authentication_type="sms")
+    headers = login(client, email)
+    provider = container.sms_dispatcher().provider
+    previous = provider.last_to("+15550000")
+
+    response = client.post("/user/otp/sms", headers=headers)
+    assert response.status_code == 200, response.text
+
+    # the dispatcher's workers deliver on the app's event loop
+    for _ in range(200):
+        message = provider.last_to("+15550000")
+
+        if message is not previous:
+            break
+
+        time.sleep(0.01)
+
+    assert message is not previous
+    code = message.body.rsplit(" ", 1)[-1]
+
+    response = client.post("/auth/otp/verify",
+                           json={"email": email, "otp": code},
+                           headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["is_otp_verified"]
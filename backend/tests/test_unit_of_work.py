@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# File: test_unit_of_work.py
+"""Request-scoped unit of work"""
+
+
+import os
+import tempfile
+
+from sqlalchemy import select, text
+
+from app.core.database import Database
+from app.core.metrics import metrics
+from app.model.sms_code import SmsCode
+from conftest import login, register
+
+
+def _counters() -> dict:
+    counters = metrics.snapshot()["counters"]
+
+    return {name: counters.get(f"db.unit_of_work.{name}", 0)
+            for name in ("opened", "committed", "rolled_back")}
+
+
+def test_handled_error_commits_and_releases_the_connection(client, email):
+    register(client, email)
+    headers = login(client, email)
+    before = _counters()
+
+    response = client.post("/auth/otp/verify",
+                           json={"email": email, "otp": "000000"},
+                           headers=headers)
+    assert response.status_code == 403
+
+    after = _counters()
+    assert after["opened"] - before["opened"] == \
+        after["committed"] - before["committed"]
+
+    # the next write in another request is not blocked by a leftover
+    # transaction
+    response = client.post("/auth/logout", headers=headers)
+    assert response.status_code == 200 and response.json() is True
+    assert client.get("/user", headers=headers).status_code == 403
+
+
+def test_failed_sms_attempt_is_kept(client, container, email):
+    register(client, email, authentication_type="sms")
+    headers = login(client, email)
+    user = container.user_repository().get_by_email(email)
+    container.user_repository().issue_sms_code(user.id)
+
+    response = client.post("/auth/otp/verify",
+                           json={"email": email, "otp": "not-it"},
+                           headers=headers)
+    assert response.status_code == 403
+
+    with container.db().session() as session:
+        attempts = session.execute(
+            select(SmsCode.attempts).where(SmsCode.user_id == user.id)
+        ).scalar_one()
+
+    assert attempts == 1
+
+
+def test_unexpected_error_rolls_back(container):
+    db = container.db()
+    before = _counters()
+
+    try:
+        with db.unit_of_work() as work:
+            with db.session() as session:
+                session.execute(text(
+                    "CREATE TABLE IF NOT EXISTS uow_probe (x INTEGER)"))
+                session.commit()
+            work.finish(True)
+
+            with db.unit_of_work() as work:
+                with db.session() as session:
+                    session.execute(text("INSERT INTO uow_probe VALUES (1)"))
+                    session.commit()
+                raise RuntimeError
+    except RuntimeError:
+        work.finish(False)
+
+    with db.session() as session:
+        rows = session.execute(text("SELECT x FROM uow_probe")).all()
+
+    assert rows == []
+    assert _counters()["rolled_back"] - before["rolled_back"] == 1
+
+
+def test_sign_in_checks_the_password_before_the_work_opens(
+        client, container, email, monkeypatch):
+    register(client, email)
+    hasher = container.password_hasher()
+    opened = []
+
+    def verify(*args, **kwargs):
+        opened.append(_counters()["opened"])
+        return type(hasher).verify(hasher, *args, **kwargs)
+
+    async def averify(*args, **kwargs):
+        opened.append(_counters()["opened"])
+        return await type(hasher).averify(hasher, *args, **kwargs)
+
+    monkeypatch.setattr(hasher, "verify", verify)
+    monkeypatch.setattr(hasher, "averify", averify)
+    before = _counters()["opened"]
+
+    login(client, email)
+
+    assert opened == [before]
+    assert _counters()["opened"] == before + 1
+
+
+def test_reads_keep_replica_routing_in_a_unit_of_work():
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'replica.db')}"
+    db = Database(url, replica_urls=[url])
+
+    with db.unit_of_work() as work:
+        with db.read_session() as session:
+            session.execute(text("SELECT 1"))
+            assert not work.is_open
+
+        with db.session() as session:
+            shared = session
+
+        with db.read_session() as session:
+            assert session is not shared
+
+        db.record_write("key")
+
+        with db.read_session("key") as session:
+            assert session is shared
+
+        work.finish(True)
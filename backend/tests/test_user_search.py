@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# File: test_user_search.py
+"""GET /admin/users/search"""
+
+
+import pytest
+
+from conftest import register
+
+
+@pytest.fixture(scope="module")
+def found(client):
+    emails = [f"found{n}@example.com" for n in range(3)]
+
+    for email in emails:
+        register(client, email)
+
+    return emails
+
+
+def _search(client, admin, q: str, **params) -> list:
+    response = client.get("/admin/users/search", params={"q": q, **params},
+                          headers=admin)
+    assert response.status_code == 200, response.text
+
+    return sorted(user["email"] for user in response.json())
+
+
+def test_prefix_is_the_default_and_ignores_case(client, admin, found):
+    assert _search(client, admin, "FOUND") == found
+    assert _search(client, admin, "und1") == []
+
+
+def test_contains_and_exact(client, admin, found):
+    assert _search(client, admin, "und1", match="contains") == [found[1]]
+    assert _search(client, admin, found[2], match="exact") == [found[2]]
+
+
+def test_wildcards_match_literally(client, admin, found):
+    assert _search(client, admin, "found_", match="contains") == []
+    assert _search(client, admin, "%", match="contains") == []
+    assert _search(client, admin, "f%", match="prefix") == []